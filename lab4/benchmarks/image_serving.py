@@ -0,0 +1,139 @@
+"""
+Concurrent product image downloads through the images route versus a naive `FileResponse` route.
+
+Run from the lab4 directory:
+    uv run python -m benchmarks.image_serving --files 200 --concurrency 64 --requests 20000
+
+Writes --files content-addressed images (a mix of small WebP variants and larger originals) to a temporary
+IMAGES_DIR and serves them from a uvicorn subprocess on two routes: `/images/...`, and `/naive/...`, which
+returns `FileResponse(path)` the way a plain static route would. --concurrency clients then download random
+images; --revalidate of the requests carry the ETag a browser already holds and --ranges ask for a byte
+range. Requests/sec, MB/s, p50/p99 latency and the server's CPU time per request are reported per route.
+Under a server that offers `http.response.pathsend` or `http.response.zerocopy` (uvicorn offers neither) the
+images route hands whole bodies to the server without reading them in Python at all.
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("TOKEN_SECRET_KEY", "benchmark")
+os.environ.setdefault("POSTGRESQL_DB_URL", "postgresql+asyncpg://benchmark@localhost/benchmark")
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import FileResponse
+
+from src.config import settings
+from src.routers import images
+from src.service.product_images import image_path
+
+app = FastAPI()
+app.include_router(images.router)
+
+
+@app.get('/naive/{product_id}/{filename}')
+async def naive_image(product_id: int, filename: str):
+    return FileResponse(image_path(filename))
+
+
+@app.get('/cpu')
+async def server_cpu() -> float:
+    return time.process_time()
+
+
+def write_images(count: int, large_share: float, rng: random.Random) -> list[str]:
+    filenames = []
+    for i in range(count):
+        large = rng.random() < large_share
+        data = rng.randbytes(rng.randint(300_000, 2_000_000) if large else rng.randint(8_000, 60_000))
+        digest = hashlib.sha256(data).hexdigest()
+        filename = f"{digest}.jpg" if large else f"{digest}_256.webp"
+        path = image_path(filename)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        filenames.append(filename)
+    return filenames
+
+
+async def run(client: httpx.AsyncClient, prefix: str, filenames: list[str], args) -> dict:
+    rng = random.Random(args.seed)
+    plan = [(rng.choice(filenames), rng.random() < args.revalidate, rng.random() < args.ranges)
+            for _ in range(args.requests)]
+    latencies, received = [], 0
+    cpu_before = float((await client.get('/cpu')).text)
+
+    async def worker(share: list):
+        nonlocal received
+        for filename, revalidate, ranged in share:
+            headers = {}
+            if revalidate:
+                headers['If-None-Match'] = f'"{filename.rsplit(".", 1)[0]}"'
+            if ranged:
+                headers['Range'] = 'bytes=0-65535'
+            started = time.perf_counter()
+            response = await client.get(f'{prefix}/1/{filename}', headers=headers)
+            latencies.append(time.perf_counter() - started)
+            assert response.status_code in (200, 206, 304), response.status_code
+            received += len(response.content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(plan[i::args.concurrency]) for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    cpu = float((await client.get('/cpu')).text) - cpu_before
+
+    quantiles = statistics.quantiles(latencies, n=100)
+    return {'rps': len(plan) / elapsed, 'mbps': received / elapsed / 1e6, 'p50': quantiles[49] * 1000,
+            'p99': quantiles[98] * 1000, 'cpu_us': cpu / len(plan) * 1e6}
+
+
+async def benchmark(filenames: list[str], port: int, args):
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+        for _ in range(100):
+            try:
+                await client.get('/cpu')
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        for name, prefix in (('naive FileResponse', '/naive'), ('images route', '/images')):
+            await run(client, prefix, filenames, args)  # warm-up: page cache, connections
+            result = await run(client, prefix, filenames, args)
+            print(f"{name:>18}: {result['rps']:8.0f} req/s {result['mbps']:8.1f} MB/s  "
+                  f"p50 {result['p50']:6.2f} ms  p99 {result['p99']:7.2f} ms  "
+                  f"server CPU {result['cpu_us']:7.1f} us/request")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--large-share", type=float, default=0.1, help="share of 0.3-2 MB originals")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=20_000)
+    parser.add_argument("--revalidate", type=float, default=0.3, help="share of requests with If-None-Match")
+    parser.add_argument("--ranges", type=float, default=0.05, help="share of requests with a Range")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.environ["IMAGES_DIR"] = directory
+        settings.IMAGES_DIR = directory
+        filenames = write_images(args.files, args.large_share, random.Random(args.seed))
+        server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'benchmarks.image_serving:app',
+                                   '--port', str(args.port), '--log-level', 'warning', '--no-access-log'])
+        try:
+            asyncio.run(benchmark(filenames, args.port, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+CPU cost of authenticating a request with and without the verified-JWT cache.
+
+Run from the lab4 directory:
+    uv run python -m benchmarks.jwt_cache --clients 2000 --rps 1500
+
+Simulates --clients users who each reuse one access token, picked at random per request, and measures the
+CPU time `get_user_id_from_jwt` spends per request with an empty cache (a full jose decode and HMAC check
+every time) and with a warm cache. The per-request difference is then scaled to --rps to show the CPU saved
+per second of traffic.
+"""
+import argparse
+import os
+import random
+import time
+from datetime import timedelta
+
+os.environ.setdefault("TOKEN_SECRET_KEY", "benchmark")
+os.environ.setdefault("POSTGRESQL_DB_URL", "postgresql+asyncpg://benchmark@localhost/benchmark")
+
+from src.utils import create_jwt_token, get_user_id_from_jwt, jwt_cache, _verify_jwt
+
+
+def cpu_us_per_call(func, tokens: list[str], requests: int) -> float:
+    started = time.process_time()
+    for token in tokens[:requests]:
+        func(token)
+    return (time.process_time() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=2000, help="distinct access tokens in circulation")
+    parser.add_argument("--requests", type=int, default=200_000)
+    parser.add_argument("--rps", type=float, default=1500, help="authenticated requests per second to scale to")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tokens = [create_jwt_token(user_id=i, expires_in=timedelta(hours=1)) for i in range(1, args.clients + 1)]
+    traffic = [rng.choice(tokens) for _ in range(args.requests)]
+
+    uncached_us = cpu_us_per_call(_verify_jwt, traffic, args.requests)
+    jwt_cache.clear()
+    for token in tokens:
+        get_user_id_from_jwt(token)
+    cached_us = cpu_us_per_call(get_user_id_from_jwt, traffic, args.requests)
+
+    saved_ms_per_second = (uncached_us - cached_us) * args.rps / 1000
+    print(f"full verification: {uncached_us:7.2f} us CPU/request")
+    print(f"      warm cache: {cached_us:7.2f} us CPU/request ({uncached_us / cached_us:.1f}x less)")
+    print(f"at {args.rps:.0f} req/s: {saved_ms_per_second:.1f} ms of CPU saved per second "
+          f"({saved_ms_per_second / 10:.2f}% of one core); cache stats {jwt_cache.stats()}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+"""
+Measures how argon2 login traffic affects the latency of unrelated endpoints.
+
+Run from the lab4 directory:
+    uv run python -m benchmarks.password_hashing --logins 200 --login-concurrency 32
+
+Two throwaway apps are driven in-process over ASGI: one verifies passwords on the event loop
+(the old behaviour), the other goes through the async `verify_password` from `src.utils`.
+While logins are hammered, a probe keeps calling a trivial `/ping` route and records its latency,
+measured from the moment the call was due so that time spent waiting for a blocked loop counts.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("TOKEN_SECRET_KEY", "benchmark")
+os.environ.setdefault("POSTGRESQL_DB_URL", "postgresql+asyncpg://benchmark@localhost/benchmark")
+
+import httpx
+from fastapi import FastAPI
+
+from src.utils import pwd_context, verify_password
+
+PASSWORD = "benchmark-password"
+
+
+def build_app(hashed: str, blocking: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.post('/login')
+    async def login():
+        if blocking:
+            return {"ok": pwd_context.verify(PASSWORD, hashed)}
+        return {"ok": await verify_password(PASSWORD, hashed)}
+
+    @app.get('/ping')
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def percentile(samples: list[float], p: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p))]
+
+
+async def run(app: FastAPI, logins: int, login_concurrency: int, probe_interval: float) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        semaphore = asyncio.Semaphore(login_concurrency)
+        done = asyncio.Event()
+        probe_latencies = []
+
+        async def login():
+            async with semaphore:
+                await client.post('/login')
+
+        async def probe():
+            while not done.is_set():
+                due = time.perf_counter() + probe_interval
+                await asyncio.sleep(probe_interval)
+                await client.get('/ping')
+                probe_latencies.append((time.perf_counter() - due) * 1000)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    return {
+        "logins_per_sec": logins / elapsed,
+        "ping_samples": len(probe_latencies),
+        "ping_p50_ms": statistics.median(probe_latencies),
+        "ping_p99_ms": percentile(probe_latencies, 0.99),
+        "ping_max_ms": max(probe_latencies),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--login-concurrency", type=int, default=16)
+    parser.add_argument("--probe-interval", type=float, default=0.005, help="seconds between /ping calls")
+    args = parser.parse_args()
+
+    hashed = pwd_context.hash(PASSWORD)
+    for name, blocking in (("on event loop", True), ("off event loop", False)):
+        result = await run(build_app(hashed, blocking), args.logins, args.login_concurrency, args.probe_interval)
+        print(f"{name:>15}: {result['logins_per_sec']:7.1f} logins/s | "
+              f"/ping p50 {result['ping_p50_ms']:7.2f} ms, p99 {result['ping_p99_ms']:7.2f} ms, "
+              f"max {result['ping_max_ms']:7.2f} ms over {result['ping_samples']} samples")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
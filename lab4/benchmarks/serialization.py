@@ -0,0 +1,74 @@
+"""
+Per-page cost of the list-response serialization fast path.
+
+Run from the lab4 directory:
+    uv run python -m benchmarks.serialization --page-size 100
+
+For catalog pages, order pages and order-summary pages built from in-memory rows, compares the previous path
+(`response_model` validation from attributes, field serializers, pydantic `dump_json`) with `src.serialization`,
+and checks that both produce the same bytes.
+"""
+import argparse
+import os
+import timeit
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+os.environ.setdefault("TOKEN_SECRET_KEY", "benchmark")
+os.environ.setdefault("POSTGRESQL_DB_URL", "postgresql+asyncpg://benchmark@localhost/benchmark")
+
+from pydantic import TypeAdapter
+
+from src.custom_types import OrderStatus
+from src.db.models import Product, Order
+from src.schemas.item import Item
+from src.schemas.order import OrderOut, OrderSummaryOut
+from src.schemas.product import ProductOut
+from src.serialization import dump_products, dump_orders, dump_order_summaries
+
+
+def build_rows(page_size: int, items_per_order: int):
+    products = [Product(id=i, title=f"Product {i}", description="A fairly ordinary product description " * 4,
+                        quantity=i, full_price=1000 + i * 37, discount=i % 30, images=[])
+                for i in range(1, page_size + 1)]
+    orders = []
+    for i in range(1, page_size + 1):
+        order = Order(user_id=1, items=[Item(product_id=j, quantity=2, total_price=2 * (1000 + j * 37))
+                                        for j in range(1, items_per_order + 1)])
+        order.id = i
+        order.status = OrderStatus.PENDING
+        order.created_at = datetime(2025, 1, 1) + timedelta(minutes=i, microseconds=i)
+        orders.append(order)
+    summaries = [SimpleNamespace(id=o.id, status=o.status, created_at=o.created_at,
+                                 item_count=len(o.items), total_price=o.total_price) for o in orders]
+    return products, orders, summaries
+
+
+def pydantic_path(model):
+    adapter = TypeAdapter(list[model])
+    return lambda rows: adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--items-per-order", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    products, orders, summaries = build_rows(args.page_size, args.items_per_order)
+    cases = (
+        ("products", products, pydantic_path(ProductOut), dump_products),
+        ("orders", orders, pydantic_path(OrderOut), dump_orders),
+        ("order summaries", summaries, pydantic_path(OrderSummaryOut), dump_order_summaries),
+    )
+    for name, rows, old, new in cases:
+        assert old(rows) == new(rows), f"{name}: fast path output differs"
+        old_us = min(timeit.repeat(lambda: old(rows), number=args.repeat, repeat=3)) / args.repeat * 1e6
+        new_us = min(timeit.repeat(lambda: new(rows), number=args.repeat, repeat=3)) / args.repeat * 1e6
+        print(f"{name:>16}: pydantic {old_us:8.1f} us/page | fast path {new_us:8.1f} us/page | "
+              f"{old_us / new_us:4.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+import asyncio
+
+from alembic import context
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.models import Base
+from src.db.partitions import PARTITION_NAME
+
+target_metadata = Base.metadata
+
+
+# Partitions are created and dropped at runtime by src.db.partitions, not by migrations; neither they nor the
+# per-partition copies PostgreSQL makes of foreign keys into a partitioned table are part of the models.
+def include_name(name, type_, parent_names) -> bool:
+    return not (type_ == 'table' and PARTITION_NAME.fullmatch(name))
+
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    return not (type_ == 'foreign_key_constraint' and reflected
+                and PARTITION_NAME.fullmatch(object.referred_table.name))
+
+
+def do_run_migrations(connection: Connection):
+    context.configure(connection=connection, target_metadata=target_metadata, compare_type=True,
+                      include_name=include_name, include_object=include_object)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations():
+    from src.config import settings
+
+    engine = create_async_engine(settings.POSTGRESQL_DB_URL)
+    async with engine.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await engine.dispose()
+
+
+def run_migrations_offline():
+    from src.config import settings
+
+    context.configure(url=settings.POSTGRESQL_DB_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+elif (connection := context.config.attributes.get('connection')) is not None:
+    # Programmatic use (src.db.db_init.run_migrations) hands over an already open connection.
+    do_run_migrations(connection)
+else:
+    asyncio.run(run_async_migrations())
@@ -0,0 +1,115 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 07:56:51.153650
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BASELINE_TABLES = {'users', 'products', 'cart_items', 'orders', 'order_items', 'refresh_tokens', 'recovery_tokens'}
+
+
+def _create_indexes():
+    op.create_index('ix_products_is_active_id', 'products', ['is_active', 'id'], unique=False)
+    op.create_index('ix_orders_created_at_id', 'orders', ['created_at', 'id'], unique=False)
+    op.create_index('ix_orders_status_created_at', 'orders', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_orders_user_id', 'orders', ['user_id'], unique=False)
+
+
+def upgrade() -> None:
+    existing = BASELINE_TABLES & set(sa.inspect(op.get_bind()).get_table_names())
+    if existing == BASELINE_TABLES:
+        # Created by `Base.metadata.create_all` before the schema was migrated: those tables are exactly the
+        # ones below, so they are adopted as they are and only the indexes are added.
+        _create_indexes()
+        return
+    if existing:
+        raise RuntimeError(f"Found only part of the baseline schema ({', '.join(sorted(existing))}); "
+                           "cannot adopt it")
+
+    op.create_table('products',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('title', sa.String(length=30), nullable=False),
+    sa.Column('description', sa.String(length=1000), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.Column('full_price', sa.Integer(), nullable=False),
+    sa.Column('discount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('images', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('password', sa.String(), nullable=True),
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('is_admin', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_table('cart_items',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id', 'product_id')
+    )
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'CONFIRMED', 'SHIPPED', 'DELIVERED', 'CANCELLED', name='orderstatus'), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('is_paid', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table('recovery_tokens',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('refresh_tokens',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('token', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('order_items',
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('total_price', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('order_id', 'product_id')
+    )
+    _create_indexes()
+
+
+def downgrade() -> None:
+    op.drop_table('order_items')
+    op.drop_table('refresh_tokens')
+    op.drop_table('recovery_tokens')
+    op.drop_index('ix_orders_user_id', table_name='orders')
+    op.drop_index('ix_orders_status_created_at', table_name='orders')
+    op.drop_index('ix_orders_created_at_id', table_name='orders')
+    op.drop_table('orders')
+    op.drop_table('cart_items')
+    op.drop_table('users')
+    op.drop_index('ix_products_is_active_id', table_name='products')
+    op.drop_table('products')
+    sa.Enum(name='orderstatus').drop(op.get_bind(), checkfirst=True)
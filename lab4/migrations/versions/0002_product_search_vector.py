@@ -0,0 +1,33 @@
+"""product search vector
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 08:10:52.024141
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A stored generated column rewrites the table once; afterwards PostgreSQL keeps it in sync on every write.
+    op.add_column('products', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("setweight(to_tsvector('english', title), 'A') || "
+                    "setweight(to_tsvector('english', description), 'B')", persisted=True),
+        nullable=False,
+    ))
+    op.create_index('ix_products_search_vector', 'products', ['search_vector'], unique=False, postgresql_using='gin')
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_search_vector', table_name='products', postgresql_using='gin')
+    op.drop_column('products', 'search_vector')
@@ -0,0 +1,33 @@
+"""product final price
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 10:42:17.518230
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('products', sa.Column(
+        'final_price',
+        sa.Integer(),
+        sa.Computed('full_price * (100 - discount) / 100', persisted=True),
+        nullable=False,
+    ))
+    op.create_index('ix_products_is_active_final_price_id', 'products', ['is_active', 'final_price', 'id'],
+                    unique=False)
+    op.create_index('ix_products_is_active_discount_id', 'products', ['is_active', 'discount', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_is_active_discount_id', table_name='products')
+    op.drop_index('ix_products_is_active_final_price_id', table_name='products')
+    op.drop_column('products', 'final_price')
@@ -0,0 +1,41 @@
+"""hashed expiring tokens
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 08:27:59.146538
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TOKEN_TABLES = ('refresh_tokens', 'recovery_tokens')
+
+
+def upgrade() -> None:
+    for table in TOKEN_TABLES:
+        op.add_column(table, sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+        op.add_column(table, sa.Column('expires_at', sa.TIMESTAMP(), nullable=True))
+        # Tokens already issued keep working. Their real expiry lives inside the JWT and is still checked when
+        # they are decoded, so the longest refresh lifetime is a safe upper bound for sweeping them.
+        op.execute(f"UPDATE {table} SET token_hash = sha256(convert_to(token, 'UTF8')), "
+                   f"expires_at = (now() AT TIME ZONE 'UTC') + interval '15 days'")
+        op.alter_column(table, 'token_hash', nullable=False)
+        op.alter_column(table, 'expires_at', nullable=False)
+        op.create_index(f'ix_{table}_expires_at', table, ['expires_at'], unique=False)
+        op.drop_column(table, 'token')
+
+
+def downgrade() -> None:
+    for table in TOKEN_TABLES:
+        # Digests cannot be turned back into tokens, so every session has to log in again.
+        op.execute(f"DELETE FROM {table}")
+        op.add_column(table, sa.Column('token', sa.VARCHAR(), autoincrement=False, nullable=False))
+        op.drop_index(f'ix_{table}_expires_at', table_name=table)
+        op.drop_column(table, 'expires_at')
+        op.drop_column(table, 'token_hash')
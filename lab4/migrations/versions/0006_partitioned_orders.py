@@ -0,0 +1,136 @@
+"""partitioned orders
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:05:41.602219
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ORDER_STATUS = postgresql.ENUM('PENDING', 'CONFIRMED', 'SHIPPED', 'DELIVERED', 'CANCELLED', name='orderstatus',
+                               create_type=False)
+ORDER_INDEXES = (
+    ('ix_orders_created_at_id', ['created_at', 'id']),
+    ('ix_orders_status_created_at', ['status', 'created_at', 'id']),
+    ('ix_orders_user_id', ['user_id']),
+)
+
+
+def _next_month(month):
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def _move_aside(suffix: str):
+    for name, _ in ORDER_INDEXES:
+        op.drop_index(name, table_name='orders')
+    for table in ('order_items', 'orders'):
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_{suffix}")
+        op.execute(f"ALTER TABLE {table}_{suffix} RENAME CONSTRAINT {table}_pkey TO {table}_{suffix}_pkey")
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY NONE")
+
+
+def _create_indexes():
+    for name, columns in ORDER_INDEXES:
+        op.create_index(name, 'orders', columns, unique=False)
+    op.execute("ALTER SEQUENCE orders_id_seq OWNED BY orders.id")
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.server_version_info < (15,):
+        # Before 15 an UPDATE that moves a referenced order to another partition runs as a delete on the source
+        # partition, which would cascade to the order's items instead of moving them along.
+        raise RuntimeError("Partitioned orders need PostgreSQL 15 or newer")
+
+    _move_aside('unpartitioned')
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('orders_id_seq')"), nullable=False),
+    sa.Column('status', ORDER_STATUS, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('is_paid', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.Column('is_archived', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id', 'created_at', 'is_archived'),
+    postgresql_partition_by='LIST (is_archived)'
+    )
+    _create_indexes()
+    op.create_table('order_items',
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('order_created_at', sa.TIMESTAMP(), nullable=False),
+    sa.Column('order_is_archived', sa.Boolean(), nullable=False),
+    sa.Column('total_price', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id', 'order_created_at', 'order_is_archived'],
+                            ['orders.id', 'orders.created_at', 'orders.is_archived'],
+                            onupdate='CASCADE', ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('order_id', 'order_created_at', 'order_is_archived', 'product_id'),
+    postgresql_partition_by='LIST (order_is_archived)'
+    )
+
+    from src.config import settings
+
+    # Hot monthly partitions from the oldest order to a few months ahead; src.db.partitions keeps extending them.
+    first, last = op.get_bind().execute(sa.text(f"""
+        SELECT date_trunc('month', coalesce(min(created_at), now() AT TIME ZONE 'UTC')),
+               date_trunc('month', now() AT TIME ZONE 'UTC') + interval '{settings.ORDER_PARTITION_MONTHS_AHEAD} months'
+        FROM orders_unpartitioned
+    """)).one()
+    for table, column in (('orders', 'created_at'), ('order_items', 'order_created_at')):
+        for tier, archived in (('hot', 'false'), ('cold', 'true')):
+            op.execute(f"CREATE TABLE {table}_{tier} PARTITION OF {table} FOR VALUES IN ({archived}) "
+                       f"PARTITION BY RANGE ({column})")
+            op.execute(f"CREATE TABLE {table}_{tier}_default PARTITION OF {table}_{tier} DEFAULT")
+        month = first
+        while month <= last:
+            following = _next_month(month)
+            op.execute(f"CREATE TABLE {table}_hot_{month:%Y_%m} PARTITION OF {table}_hot "
+                       f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')")
+            month = following
+
+    op.execute("INSERT INTO orders (id, status, user_id, is_paid, created_at, is_archived) "
+               "SELECT id, status, user_id, is_paid, created_at, false FROM orders_unpartitioned")
+    op.execute("INSERT INTO order_items (order_id, order_created_at, order_is_archived, total_price, product_id, "
+               "quantity) "
+               "SELECT i.order_id, o.created_at, false, i.total_price, i.product_id, i.quantity "
+               "FROM order_items_unpartitioned i JOIN orders_unpartitioned o ON o.id = i.order_id")
+    op.drop_table('order_items_unpartitioned')
+    op.drop_table('orders_unpartitioned')
+
+
+def downgrade() -> None:
+    _move_aside('partitioned')
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), server_default=sa.text("nextval('orders_id_seq')"), nullable=False),
+    sa.Column('status', ORDER_STATUS, nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('is_paid', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.TIMESTAMP(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    _create_indexes()
+    op.create_table('order_items',
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('total_price', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('quantity', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('order_id', 'product_id')
+    )
+    op.execute("INSERT INTO orders (id, status, user_id, is_paid, created_at) "
+               "SELECT id, status, user_id, is_paid, created_at FROM orders_partitioned")
+    op.execute("INSERT INTO order_items (order_id, total_price, product_id, quantity) "
+               "SELECT order_id, total_price, product_id, quantity FROM order_items_partitioned")
+    op.drop_table('order_items_partitioned')
+    op.drop_table('orders_partitioned')
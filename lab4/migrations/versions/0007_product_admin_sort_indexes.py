@@ -0,0 +1,24 @@
+"""product admin sort indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:20:08.331947
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_products_final_price_id', 'products', ['final_price', 'id'], unique=False)
+    op.create_index('ix_products_discount_id', 'products', ['discount', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_products_discount_id', table_name='products')
+    op.drop_index('ix_products_final_price_id', table_name='products')
@@ -0,0 +1,41 @@
+import argparse
+import asyncio
+from pathlib import Path
+
+from src.db.db import SessionLocal
+from src.crud import ProductCRUD
+from src.service.product_import import ProductImportService
+
+
+async def import_products(path: Path, fmt: str):
+    async with SessionLocal() as db:
+        with path.open(encoding='utf-8-sig', newline='') as file:
+            report = await ProductImportService(ProductCRUD(db)).import_products(file, fmt)
+        await db.commit()
+
+    for chunk in report.chunks:
+        print(f"chunk {chunk.chunk} (lines {chunk.first_line}-{chunk.last_line}): "
+              f"{chunk.inserted} inserted, {chunk.updated} updated, {chunk.failed} failed")
+        for error in chunk.errors:
+            print(f"  line {error.line}: {error.detail}")
+    print(f"total: {report.inserted} inserted, {report.updated} updated, {report.failed} failed")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m src.cli')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    import_parser = commands.add_parser('import-products', help='bulk import a CSV or JSONL product feed')
+    import_parser.add_argument('path', type=Path)
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'],
+                               help='defaults to the file extension')
+
+    args = parser.parse_args()
+    if args.command == 'import-products':
+        if (fmt := args.format or args.path.suffix.lstrip('.').lower()) not in ('csv', 'jsonl'):
+            parser.error("cannot infer the feed format from the file extension, pass --format")
+        asyncio.run(import_products(args.path, fmt))
+
+
+if __name__ == '__main__':
+    main()
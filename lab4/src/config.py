@@ -15,8 +15,76 @@ class Settings(BaseSettings):
     SAME_SITE_COOKIE: Literal['strict', 'lax', 'none'] = "strict"
 
     TOKEN_SECRET_KEY: str
+    # 'memory' keeps refresh and recovery tokens in the process, which only suits a single worker.
+    TOKEN_STORE_BACKEND: Literal['sql', 'memory'] = 'sql'
+    TOKEN_SWEEP_INTERVAL_SECONDS: float = 300
+    TOKEN_SWEEP_BATCH_SIZE: int = 1000
+
+    # Delivered and cancelled orders older than the retention window move to the cold order partitions.
+    ORDER_ARCHIVE_INTERVAL_SECONDS: float = 3600
+    ORDER_RETENTION_DAYS: int = 180
+    ORDER_ARCHIVE_BATCH_SIZE: int = 1000
+    ORDER_PARTITION_MONTHS_AHEAD: int = 3
 
     POSTGRESQL_DB_URL: str
+    # Read-only endpoints are served from this replica when set; the primary is used otherwise.
+    POSTGRESQL_REPLICA_DB_URL: str | None = None
+    REPLICA_RETRY_AFTER_SECONDS: float = 5
+
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT_SECONDS: float = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_PRE_PING: bool = False
+    # asyncpg prepared statements kept per connection; set to 0 behind pgbouncer in transaction mode.
+    DB_PREPARED_STATEMENT_CACHE_SIZE: int = 500
+
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_SHARDS: int = 16
+    RATE_LIMIT_MAX_KEYS_PER_SHARD: int = 10_000
+    # Token-bucket budgets per client: a burst, refilled at the given rate.
+    RATE_LIMIT_AUTH_BURST: int = 5
+    RATE_LIMIT_AUTH_PER_MINUTE: float = 10
+    RATE_LIMIT_CART_BURST: int = 30
+    RATE_LIMIT_CART_PER_MINUTE: float = 120
+
+    OUTBOX_ENABLED: bool = True
+    OUTBOX_WORKERS: int = 2
+    OUTBOX_BATCH_SIZE: int = 50
+    # Handler calls in flight across all outbox workers.
+    OUTBOX_MAX_CONCURRENCY: int = 20
+    OUTBOX_POLL_INTERVAL_SECONDS: float = 1
+    OUTBOX_HANDLER_TIMEOUT_SECONDS: float = 30
+    OUTBOX_MAX_ATTEMPTS: int = 10
+    OUTBOX_RETRY_BASE_SECONDS: float = 2
+    OUTBOX_RETRY_MAX_SECONDS: float = 600
+
+    PASSWORD_HASHING_WORKERS: int = 2
+    # Hashes allowed into the executor at once; defaults to the worker count so bursts wait on the semaphore.
+    # Setting it higher lets up to the difference queue on the executor as well.
+    PASSWORD_HASHING_MAX_CONCURRENCY: int | None = None
+
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 60
+
+    JWT_CACHE_MAX_SIZE: int = 10_000
+    JWT_CACHE_TTL_SECONDS: float = 300
+
+    CATALOG_CACHE_MAX_SIZE: int = 1024
+    CATALOG_CACHE_TTL_SECONDS: float = 30
+
+    PRODUCT_SEARCH_MAX_CANDIDATES: int = 1000
+
+    # Product image URLs are this prefix followed by "<product id>/<file name>".
+    IMAGES_BASE_URL: str = "/images/"
+    IMAGES_DIR: str = "media/images"
+    IMAGE_MAX_SIZE_BYTES: int = 10 * 1024 * 1024
+    IMAGE_MAX_PIXELS: int = 40_000_000
+    IMAGE_VARIANT_WIDTHS: list[int] = [256, 1024]
+    IMAGE_PROCESS_WORKERS: int = 2
+
+    PRODUCT_IMPORT_CHUNK_SIZE: int = 5000
+    PRODUCT_IMPORT_MAX_ERRORS_PER_CHUNK: int = 50
 
 
 settings = Settings()
@@ -3,3 +3,4 @@ from .users import UserCRUD
 from .carts import CartItemCRUD
 from .orders import OrderCRUD
 from .tokens import RecoveryTokenCRUD, RefreshTokenCRUD
+from .outbox import OutboxCRUD
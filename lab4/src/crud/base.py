@@ -1,11 +1,16 @@
+import base64
+import binascii
+import json
 import re
+from datetime import datetime
 from typing import Literal, Callable, Any
 
-from sqlalchemy import select
+from sqlalchemy import select, exists, tuple_, Select
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.custom_exceptions import ResourceDoesNotExistError, ResourceAlreadyExistsError, DependentEntityExistsError
+from src.custom_exceptions import ResourceDoesNotExistError, ResourceAlreadyExistsError, DependentEntityExistsError, \
+    InvalidCursorError
 from src.db.models import Base
 from src.logger import logger
 from src.schemas.base import ObjUpdate
@@ -15,6 +20,7 @@ from src.schemas.filtration import PaginationParams
 class _CRUDBase:
     model = None
     key = None
+    cursor_key: tuple = None
 
     def __init__(self, db: AsyncSession):
         self.db: AsyncSession = db
@@ -27,15 +33,36 @@ class _CRUDBase:
                        criteria,
                        pagination: PaginationParams = None,
                        order_by=None,
-                       for_update: bool = False):
-        q = (select(self.__class__.model)
-             .filter(criteria)
-             .order_by(order_by)
-             .limit(pagination and pagination.limit)
-             .offset(pagination and pagination.offset))
+                       for_update: bool = False,
+                       cursor_key: tuple = None,
+                       descending: bool = False):
+        q = self._paginate(select(self.__class__.model).filter(criteria), pagination, order_by, cursor_key, descending)
         result = await self.db.execute(q.with_for_update() if for_update else q)
         return result.scalars().all()
 
+    def _paginate(self, q: Select, pagination: PaginationParams = None, order_by=None,
+                  cursor_key: tuple = None, descending: bool = False) -> Select:
+        if pagination is not None and pagination.cursor is not None:
+            cursor_key = cursor_key or self._get_cursor_key()
+            last_values = tuple_(*_decode_cursor(pagination.cursor, cursor_key))
+            return (q.filter(tuple_(*cursor_key) < last_values if descending else tuple_(*cursor_key) > last_values)
+                    .order_by(*(column.desc() if descending else column for column in cursor_key))
+                    .limit(pagination.limit))
+
+        return (q.order_by(*(order_by if isinstance(order_by, tuple) else (order_by,)))
+                .limit(pagination and pagination.limit)
+                .offset(pagination and pagination.offset))
+
+    def next_cursor(self, entities, pagination: PaginationParams = None, cursor_key: tuple = None) -> str | None:
+        if pagination is None or not entities or len(entities) < pagination.limit:
+            return None
+        return _encode_cursor([getattr(entities[-1], column.key) for column in cursor_key or self._get_cursor_key()])
+
+    def _get_cursor_key(self) -> tuple:
+        if self.__class__.cursor_key is None:
+            raise InvalidCursorError(f"{self.__class__.model.__name__} does not support cursor pagination")
+        return self.__class__.cursor_key
+
     def __init_subclass__(cls, **kwargs):
         if cls.__base__ is not _CRUDBase:
             if cls.model is None or cls.key is None:
@@ -68,10 +95,18 @@ class Creatable(_CRUDBase):
 class Retrievable(_CRUDBase):
     async def get(self, key, *, on_not_found: Literal['raise-error', 'return-none'] = 'raise-error'):
         if (entity := await self._get_one(self.__class__.key == key)) is None and on_not_found == 'raise-error':
-            raise ResourceDoesNotExistError(
-                f"{self.__class__.model.__name__} with the given {str(self.__class__.key).split('.')[-1]} does not exist.")
+            raise self._does_not_exist_error()
         return entity
 
+    async def ensure_exists(self, key):
+        """Raises like `get` does, without loading the entity into the session."""
+        if not await self.db.scalar(select(exists().where(self.__class__.key == key))):
+            raise self._does_not_exist_error()
+
+    def _does_not_exist_error(self) -> ResourceDoesNotExistError:
+        return ResourceDoesNotExistError(
+            f"{self.__class__.model.__name__} with the given {str(self.__class__.key).split('.')[-1]} does not exist.")
+
 
 class Updatable(_CRUDBase):
 
@@ -117,6 +152,22 @@ class Deletable(_CRUDBase):
                     logger.error(f"Unexpected IntegrityError: {e}")
 
 
+def _encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor: str, columns: tuple) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [datetime.fromisoformat(v) if column.type.python_type is datetime else column.type.python_type(v)
+                for v, column in zip(values, columns)]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursorError("The pagination cursor is malformed")
+
+
 def _craft_already_exists_error_message(model: Base, raw_sql_error_msg: str) -> str:
     err_msg = f"{model.__name__} with the given attributes already exists"
 
@@ -1,4 +1,5 @@
-from sqlalchemy import and_
+from sqlalchemy import and_, select, delete, update, exists, literal, union_all, Row, Select, CTE
+from sqlalchemy.dialects.postgresql import insert
 
 from src.crud.base import Creatable
 from src.db import models
@@ -16,14 +17,62 @@ class CartItemCRUD(Creatable):
     async def get_all_by_user_id(self, user_id: int) -> list[CartItem]:
         return await self._get_all(self.__class__.model.user_id == user_id)
 
+    async def get_lines(self, user_id: int) -> list[Row]:
+        model = self.__class__.model
+        lines = select(model.product_id, model.quantity).where(model.user_id == user_id).subquery()
+        return list((await self.db.execute(_priced_lines(lines))).all())
+
+    async def add_returning_lines(self, user_id: int, product_id: int, quantity: int) -> list[Row]:
+        model = self.__class__.model
+        stmt = insert(model).from_select(
+            ['user_id', 'product_id', 'quantity'],
+            select(literal(user_id), literal(product_id), literal(quantity))
+            .where(exists().where(models.Product.id == product_id))
+        )
+        changed = (stmt
+                   .on_conflict_do_update(index_elements=[model.user_id, model.product_id],
+                                          set_={'quantity': model.quantity + stmt.excluded.quantity})
+                   .returning(model.product_id, model.quantity)
+                   .cte('changed'))
+        return await self._get_lines_with(user_id, product_id, changed)
+
+    async def remove_returning_lines(self, user_id: int, product_id: int, quantity: int) -> list[Row]:
+        model = self.__class__.model
+        item_criteria = and_(model.user_id == user_id, model.product_id == product_id)
+        deleted = (delete(model)
+                   .where(item_criteria, model.quantity <= quantity)
+                   .returning(model.product_id)
+                   .cte('deleted'))
+        changed = (update(model)
+                   .where(item_criteria, model.quantity > quantity)
+                   .values(quantity=model.quantity - quantity)
+                   .returning(model.product_id, model.quantity)
+                   .cte('changed'))
+        return await self._get_lines_with(user_id, product_id, changed, deleted)
+
+    async def _get_lines_with(self, user_id: int, product_id: int, changed: CTE, *ctes: CTE) -> list[Row]:
+        # A data-modifying CTE is invisible to the rest of its statement, so the changed line is
+        # taken from its RETURNING clause and the untouched lines from the table itself.
+        model = self.__class__.model
+        lines = union_all(
+            select(model.product_id, model.quantity).where(model.user_id == user_id, model.product_id != product_id),
+            select(changed.c.product_id, changed.c.quantity),
+        ).subquery()
+        return list((await self.db.execute(_priced_lines(lines).add_cte(*ctes))).all())
+
     async def delete_all_by_user_id(self, user_id: int):
-        items = await self._get_all(self.__class__.model.user_id == user_id)
-        for item in items:
-            await self.db.delete(item)
-        await self.db.flush()
+        await self.db.execute(delete(self.__class__.model).where(self.__class__.model.user_id == user_id))
 
     async def delete(self, user_id: int, product_id: int):
         item = await self.get(user_id, product_id)
         if item:
             await self.db.delete(item)
             await self.db.flush()
+
+
+def _priced_lines(lines) -> Select:
+    return (select(lines.c.product_id,
+                   lines.c.quantity,
+                   (models.Product.final_price * lines.c.quantity).label('total_price'))
+            .join(models.Product, models.Product.id == lines.c.product_id)
+            .order_by(lines.c.product_id))
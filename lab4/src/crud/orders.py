@@ -1,13 +1,31 @@
-from sqlalchemy import and_
+from datetime import datetime
+
+from sqlalchemy import and_, insert, select, update, func, literal, Row, Integer
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm.attributes import set_committed_value
 
 from src.crud.base import Retrievable, Creatable, Deletable
+from src.custom_types import OrderStatus
 from src.db import models
 from src.schemas.filtration import PaginationParams, OrderFilter
+from src.schemas.item import Item
 
 
 class OrderCRUD(Creatable, Retrievable, Deletable):
     model = models.Order
     key = models.Order.id
+    cursor_key = (models.Order.created_at, models.Order.id)
+
+    async def create_with_items(self, user_id: int, items: list[Item]) -> models.Order:
+        order = self.__class__.model(user_id=user_id, items=[])
+        self.db.add(order)
+        await self.db.flush()
+
+        rows = [{'order_id': order.id, 'order_created_at': order.created_at, 'order_is_archived': order.is_archived,
+                 **item.model_dump()} for item in items]
+        await self.db.execute(insert(models.OrderItem).values(rows))
+        set_committed_value(order, 'items', [models.OrderItem(**row) for row in rows])
+        return order
 
     async def get_by_user(self, user_id: int) -> list[models.Order] | None:
         return await self._get_all(self.__class__.model.user_id == user_id)
@@ -16,10 +34,115 @@ class OrderCRUD(Creatable, Retrievable, Deletable):
                       pagination: PaginationParams = None,
                       filter: OrderFilter = None) -> list[models.Order] | None:
         return await self._get_all(
-            and_(
-                (self.__class__.model.status == filter.status) if filter.status is not None else True,
-                (self.__class__.model.created_at >= filter.created_after) if filter.created_after is not None else True
-            ) if filter is not None else True,
-            order_by=self.__class__.model.created_at,
+            _filter_criteria(filter),
+            order_by=self.__class__.cursor_key,
             pagination=pagination,
         )
+
+    async def get_summaries(self,
+                            pagination: PaginationParams = None,
+                            filter: OrderFilter = None,
+                            user_id: int = None) -> list[Row]:
+        model = self.__class__.model
+        # Page over orders first so the keyset/offset walk stays on the orders indexes,
+        # then aggregate items for that page only.
+        page = self._paginate(
+            select(model.id, model.status, model.created_at, model.is_archived)
+            .filter(_filter_criteria(filter),
+                    (model.user_id == user_id) if user_id is not None else True),
+            pagination,
+            order_by=self.__class__.cursor_key,
+        ).subquery('page')
+        q = (select(page.c.id,
+                    page.c.status,
+                    page.c.created_at,
+                    func.count(models.OrderItem.product_id).label('item_count'),
+                    func.coalesce(func.sum(models.OrderItem.total_price), 0).label('total_price'))
+             .outerjoin(models.OrderItem, and_(models.OrderItem.order_id == page.c.id,
+                                               models.OrderItem.order_created_at == page.c.created_at,
+                                               models.OrderItem.order_is_archived == page.c.is_archived))
+             .group_by(page.c.id, page.c.status, page.c.created_at)
+             .order_by(page.c.created_at, page.c.id))
+        result = await self.db.execute(q)
+        return list(result.all())
+
+    async def change_status(self, ids: list[int], status: OrderStatus,
+                            allowed_from: list[OrderStatus]) -> list[Row]:
+        """
+        Moves the orders among `ids` whose status is in `allowed_from` to `status` in one statement.
+        Returns `(id, previous_status, updated)` for every requested id in id order; `previous_status` is
+        None for ids that match no order.
+        """
+        model = self.__class__.model
+        requested = literal(sorted(set(ids)), ARRAY(Integer))
+        # Locking in id order keeps overlapping bulk changes from deadlocking on each other.
+        movable = (select(model.id)
+                   .filter(model.id == func.any(requested), model.status.in_(allowed_from))
+                   .order_by(model.id)
+                   .with_for_update())
+        updated = (update(model)
+                   .filter(model.id.in_(movable.scalar_subquery()))
+                   .values(status=status)
+                   .returning(model.id)
+                   .cte('updated'))
+        requested_ids = func.unnest(requested).table_valued('id').render_derived('requested')
+        # The outer query reads the snapshot from before the UPDATE, so unchanged rows show why they were skipped.
+        q = (select(requested_ids.c.id, model.status, updated.c.id.is_not(None))
+             .select_from(requested_ids
+                          .outerjoin(model, model.id == requested_ids.c.id)
+                          .outerjoin(updated, updated.c.id == requested_ids.c.id))
+             .order_by(requested_ids.c.id))
+        result = await self.db.execute(q)
+        return list(result.all())
+
+    async def change_status_matching(self, filter: OrderFilter, status: OrderStatus,
+                                     allowed_from: list[OrderStatus], limit: int) -> list[int]:
+        """
+        Moves up to `limit` orders matching `filter` whose status is in `allowed_from` to `status` and returns
+        their ids. Orders locked by another transaction are left for a later call.
+        """
+        model = self.__class__.model
+        movable = (select(model.id)
+                   .filter(_filter_criteria(filter), model.status.in_(allowed_from))
+                   .order_by(model.id)
+                   .limit(limit)
+                   .with_for_update(skip_locked=True))
+        result = await self.db.execute(update(model)
+                                       .filter(model.id.in_(movable.scalar_subquery()))
+                                       .values(status=status)
+                                       .returning(model.id)
+                                       .execution_options(synchronize_session=False))
+        return sorted(result.scalars())
+
+    async def oldest_active_created_at(self) -> datetime | None:
+        model = self.__class__.model
+        return await self.db.scalar(select(func.min(model.created_at)).filter(model.is_archived.is_(False)))
+
+    async def archive(self, created_before: datetime, limit: int) -> int:
+        """
+        Moves up to `limit` delivered or cancelled orders created before `created_before` into the cold partitions;
+        their items follow through the cascading foreign key. Returns how many were moved.
+        """
+        model = self.__class__.model
+        criteria = (model.is_archived.is_(False),
+                    model.status.in_([OrderStatus.DELIVERED, OrderStatus.CANCELLED]),
+                    model.created_at < created_before)
+        batch = (select(model.id)
+                 .filter(*criteria)
+                 .order_by(model.created_at, model.id)
+                 .limit(limit)
+                 .with_for_update(skip_locked=True))
+        # Repeating the criteria on the UPDATE itself lets it prune to the hot partitions being drained.
+        result = await self.db.execute(update(model)
+                                       .filter(*criteria, model.id.in_(batch.scalar_subquery()))
+                                       .values(is_archived=True)
+                                       .execution_options(synchronize_session=False))
+        return result.rowcount
+
+
+def _filter_criteria(filter: OrderFilter = None):
+    return and_(
+        (models.Order.status == filter.status) if filter.status is not None else True,
+        (models.Order.created_at >= filter.created_after) if filter.created_after is not None else True,
+        (models.Order.is_archived.is_(filter.archived)) if filter.archived is not None else True
+    ) if filter is not None else True
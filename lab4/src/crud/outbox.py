@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import insert, select, update, delete
+
+from src.crud.base import Creatable, Retrievable
+from src.custom_types import OutboxTopic
+from src.db import models
+
+
+class OutboxCRUD(Creatable, Retrievable):
+    model = models.OutboxEvent
+    key = models.OutboxEvent.id
+
+    async def add(self, events: list[tuple[OutboxTopic, dict]]):
+        """Queues events in the caller's transaction, so they exist exactly when its other writes do."""
+        await self.db.execute(insert(self.__class__.model).values(
+            [{'topic': topic.value, 'payload': payload} for topic, payload in events]))
+
+    async def claim(self, limit: int, now: datetime, lease_until: datetime) -> list[models.OutboxEvent]:
+        """
+        Takes up to `limit` due events and hides them from other workers until `lease_until`, when they become due
+        again unless the claimer has settled them by then.
+        """
+        model = self.__class__.model
+        due = (select(model.id)
+               .filter(model.failed_at.is_(None), model.available_at <= now)
+               .order_by(model.available_at, model.id)
+               .limit(limit)
+               .with_for_update(skip_locked=True))
+        result = await self.db.execute(
+            update(model)
+            .filter(model.id.in_(due.scalar_subquery()))
+            .values(available_at=lease_until, attempts=model.attempts + 1)
+            .returning(model)
+            .execution_options(synchronize_session=False)
+        )
+        return sorted(result.scalars().all(), key=lambda event: (event.created_at, event.id))
+
+    async def complete(self, ids: list[int]):
+        model = self.__class__.model
+        await self.db.execute(delete(model).filter(model.id.in_(ids)))
+
+    async def reschedule(self, event_id: int, available_at: datetime, error: str):
+        model = self.__class__.model
+        await self.db.execute(update(model).filter(model.id == event_id)
+                              .values(available_at=available_at, last_error=error))
+
+    async def fail(self, event_id: int, now: datetime, error: str):
+        model = self.__class__.model
+        await self.db.execute(update(model).filter(model.id == event_id).values(failed_at=now, last_error=error))
@@ -1,20 +1,175 @@
-from sqlalchemy import and_
+import re
+from datetime import datetime, UTC
 
-from src.crud.base import Retrievable, Updatable, Deletable, Creatable
+from sqlalchemy import (and_, update, values, column, Integer, String, Table, Column, MetaData, delete, insert, select,
+                        literal, exists, func, tuple_, Row, REAL)
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import aliased, undefer
+from sqlalchemy.schema import CreateTable
+
+from src.crud.base import Retrievable, Updatable, Deletable, Creatable, _encode_cursor, _decode_cursor
+from src.custom_types import ProductSort
 from src.db import models
-from src.schemas.filtration import PaginationParams
+from src.schemas.filtration import PaginationParams, ProductFilter
+
+_import_staging = Table(
+    'products_import',
+    MetaData(),
+    Column('line', Integer),
+    Column('id', Integer),
+    Column('title', String),
+    Column('description', String),
+    Column('full_price', Integer),
+    Column('quantity', Integer),
+    prefixes=['TEMPORARY'],
+    postgresql_on_commit='DROP',
+)
+
+# Each sort is a keyset over an (is_active, ..., id) index, or an (..., id) one when is_active is not filtered,
+# so every page is an index range scan.
+_SORT_KEYS = {
+    ProductSort.ID: ((models.Product.id,), False),
+    ProductSort.PRICE: ((models.Product.final_price, models.Product.id), False),
+    ProductSort.PRICE_DESC: ((models.Product.final_price, models.Product.id), True),
+    ProductSort.DISCOUNT: ((models.Product.discount, models.Product.id), False),
+    ProductSort.DISCOUNT_DESC: ((models.Product.discount, models.Product.id), True),
+}
 
 
 class ProductCRUD(Creatable, Retrievable, Updatable, Deletable):
     model = models.Product
     key = models.Product.id
+    cursor_key = (models.Product.id,)
 
     async def get_all(self, ids: list[int] = None, *,
                       pagination: PaginationParams = None,
                       is_active: bool | None = None,
+                      filter: ProductFilter = None,
                       order_by=None,
                       for_update=False) -> list[models.Product] | None:
+        sort_key, descending = _SORT_KEYS[filter.sort if filter is not None else ProductSort.ID]
         return await self._get_all(and_(
             models.Product.id.in_(ids) if ids is not None else True,
-            models.Product.is_active == is_active if is_active is not None else True
-        ), pagination=pagination, order_by=order_by or self.__class__.key, for_update=for_update)
+            models.Product.is_active == is_active if is_active is not None else True,
+            _filter_criteria(filter)
+        ), pagination=pagination,
+            order_by=order_by or tuple(column.desc() if descending else column for column in sort_key),
+            for_update=for_update, cursor_key=sort_key, descending=descending)
+
+    def next_cursor(self, entities, pagination: PaginationParams = None, filter: ProductFilter = None) -> str | None:
+        return super().next_cursor(entities, pagination,
+                                   _SORT_KEYS[filter.sort if filter is not None else ProductSort.ID][0])
+
+    async def search(self, query: str, pagination: PaginationParams, max_candidates: int = None) -> list[Row]:
+        """
+        Active products whose title or description contain every word of `query` as a prefix, best match first,
+        as (Product, rank) rows. Only the `max_candidates` matches with the lowest ids are ranked, which bounds
+        the cost of very broad queries: their candidates come from walking the (is_active, id) index until
+        enough rows match, rarer terms from the GIN index. The candidate set is the same for every page, so the
+        (rank, id) cursor neither skips nor repeats products.
+        """
+        if (tsquery_text := _prefix_tsquery(query)) is None:
+            return []
+
+        model = self.__class__.model
+        tsquery = func.to_tsquery(models.PRODUCT_SEARCH_CONFIG, tsquery_text)
+        candidates = aliased(model, (select(model)
+                                     .options(undefer(model.search_vector))
+                                     .filter(model.is_active, model.search_vector.bool_op('@@')(tsquery))
+                                     .order_by(model.id)
+                                     .limit(max_candidates)
+                                     .subquery('candidates')))
+        rank = func.ts_rank(candidates.search_vector, tsquery, type_=REAL)
+        q = (select(candidates, rank.label('rank'))
+             .order_by(rank.desc(), candidates.id)
+             .limit(pagination.limit))
+        if pagination.cursor is not None:
+            last_rank, last_id = _decode_cursor(pagination.cursor, (rank, candidates.id))
+            q = q.filter(tuple_(-rank, candidates.id) > tuple_(-last_rank, last_id))
+        else:
+            q = q.offset(pagination.offset)
+        return list((await self.db.execute(q)).all())
+
+    @staticmethod
+    def next_search_cursor(rows: list[Row], pagination: PaginationParams) -> str | None:
+        if not rows or len(rows) < pagination.limit:
+            return None
+        return _encode_cursor([rows[-1].rank, rows[-1][0].id])
+
+    async def decrement_stock(self, quantities: dict[int, int]) -> set[int]:
+        """Takes the requested quantities off stock in one guarded UPDATE and returns the ids that had enough."""
+        return await self._adjust_stock(quantities, -1)
+
+    async def increment_stock(self, quantities: dict[int, int]) -> set[int]:
+        return await self._adjust_stock(quantities, 1)
+
+    async def _adjust_stock(self, quantities: dict[int, int], sign: int) -> set[int]:
+        model = self.__class__.model
+        requested = (values(column('id', Integer), column('quantity', Integer), name='requested')
+                     .data(sorted(quantities.items())))
+        q = (update(model)
+             .where(model.id == requested.c.id)
+             .values(quantity=model.quantity + sign * requested.c.quantity)
+             .returning(model.id))
+        if sign < 0:
+            q = q.where(model.quantity >= requested.c.quantity)
+        result = await self.db.execute(q, execution_options={'synchronize_session': 'fetch'})
+        return set(result.scalars())
+
+    async def prepare_import(self):
+        await self.db.execute(CreateTable(_import_staging, if_not_exists=True))
+
+    async def import_chunk(self, records: list[tuple]) -> tuple[int, int, list[int]]:
+        """
+        COPYs (line, id, title, description, full_price, quantity) records into the staging table and merges them:
+        records with an id update that product, the rest are inserted. Returns the inserted and updated counts
+        and the lines whose id matched no product.
+        """
+        model, staged = self.__class__.model, _import_staging.c
+        await self.db.execute(delete(_import_staging))
+
+        connection = await (await self.db.connection()).get_raw_connection()
+        await connection.driver_connection.copy_records_to_table(
+            _import_staging.name, records=records, columns=[c.name for c in _import_staging.columns]
+        )
+
+        updated = (update(model)
+                   .where(model.id == staged.id)
+                   .values(title=staged.title, description=staged.description,
+                           full_price=staged.full_price, quantity=staged.quantity)
+                   .returning(model.id)
+                   .cte('updated'))
+        inserted = (insert(model)
+                    .from_select(['title', 'description', 'full_price', 'quantity',
+                                  'discount', 'is_active', 'images', 'created_at'],
+                                 select(staged.title, staged.description, staged.full_price, staged.quantity,
+                                        literal(0), literal(True), literal([], JSONB),
+                                        literal(datetime.now(UTC).replace(tzinfo=None)))
+                                 .where(staged.id.is_(None)))
+                    .returning(model.id)
+                    .cte('inserted'))
+        missing = (select(func.array_agg(staged.line))
+                   .where(staged.id.is_not(None), ~exists().where(model.id == staged.id))
+                   .scalar_subquery())
+
+        result = await self.db.execute(select(select(func.count()).select_from(inserted).scalar_subquery(),
+                                              select(func.count()).select_from(updated).scalar_subquery(),
+                                              missing))
+        inserted_count, updated_count, missing_lines = result.one()
+        return inserted_count, updated_count, sorted(missing_lines or [])
+
+
+def _prefix_tsquery(query: str) -> str | None:
+    # Only word characters reach to_tsquery, so user input can never inject tsquery operators.
+    words = re.findall(r'\w+', query)
+    return ' & '.join(f"{word}:*" for word in words) if words else None
+
+
+def _filter_criteria(filter: ProductFilter = None):
+    return and_(
+        (models.Product.final_price >= round(filter.min_price * 100)) if filter.min_price is not None else True,
+        (models.Product.final_price <= round(filter.max_price * 100)) if filter.max_price is not None else True,
+        (models.Product.discount >= filter.min_discount) if filter.min_discount is not None else True,
+        (models.Product.discount <= filter.max_discount) if filter.max_discount is not None else True,
+        (models.Product.quantity > 0) == filter.in_stock if filter.in_stock is not None else True,
+    ) if filter is not None else True
@@ -1,3 +1,8 @@
+from datetime import datetime
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects.postgresql import insert
+
 from src.crud.base import Retrievable, Deletable, Creatable
 from src.db import models
 
@@ -6,13 +11,45 @@ class TokenCRUD(Creatable, Retrievable, Deletable):
     model = models.TokenBase
     key = models.TokenBase.user_id
 
-    async def upsert(self, user_id: int, token: str):
-        if existing_token := await self.get(user_id, on_not_found='return-none'):
-            existing_token.token = token
-        else:
-            await self.create(
-                self.__class__.model(user_id=user_id, token=token)
-            )
+    async def upsert(self, user_id: int, token_hash: bytes, expires_at: datetime):
+        model = self.__class__.model
+        q = insert(model).values(user_id=user_id, token_hash=token_hash, expires_at=expires_at)
+        await self.db.execute(q.on_conflict_do_update(
+            index_elements=[model.user_id],
+            set_={'token_hash': q.excluded.token_hash, 'expires_at': q.excluded.expires_at},
+        ))
+
+    async def exists_valid(self, user_id: int, token_hash: bytes, now: datetime) -> bool:
+        model = self.__class__.model
+        result = await self.db.execute(select(model.user_id).filter(
+            model.user_id == user_id, model.token_hash == token_hash, model.expires_at > now))
+        return result.first() is not None
+
+    async def replace_valid(self, user_id: int, token_hash: bytes, new_token_hash: bytes,
+                            expires_at: datetime, now: datetime) -> bool:
+        """Swaps a still valid token for a new one in a single statement; False if the old one did not match."""
+        model = self.__class__.model
+        result = await self.db.execute(
+            update(model)
+            .filter(model.user_id == user_id, model.token_hash == token_hash, model.expires_at > now)
+            .values(token_hash=new_token_hash, expires_at=expires_at)
+            .returning(model.user_id)
+        )
+        return result.first() is not None
+
+    async def delete_by_user(self, user_id: int):
+        model = self.__class__.model
+        await self.db.execute(delete(model).filter(model.user_id == user_id))
+
+    async def delete_expired(self, now: datetime, limit: int) -> int:
+        """Deletes at most `limit` expired tokens, skipping rows other transactions are rotating right now."""
+        model = self.__class__.model
+        expired = (select(model.user_id)
+                   .filter(model.expires_at <= now)
+                   .limit(limit)
+                   .with_for_update(skip_locked=True))
+        result = await self.db.execute(delete(model).filter(model.user_id.in_(expired.scalar_subquery())))
+        return result.rowcount
 
 
 class RecoveryTokenCRUD(TokenCRUD):
@@ -63,3 +63,7 @@ class PaymentGatewayError(PetStoreApiError):
 
 class EmptyCartError(PetStoreApiError):
     pass
+
+
+class InvalidCursorError(PetStoreApiError):
+    pass
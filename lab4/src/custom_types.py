@@ -7,3 +7,25 @@ class OrderStatus(Enum):
     SHIPPED = "Shipped"
     DELIVERED = "Delivered"
     CANCELLED = "Cancelled"
+
+
+class OrderStatusOutcome(Enum):
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+    INVALID_TRANSITION = "invalid_transition"
+    NOT_FOUND = "not_found"
+
+
+class ProductSort(Enum):
+    ID = "id"
+    PRICE = "price"
+    PRICE_DESC = "-price"
+    DISCOUNT = "discount"
+    DISCOUNT_DESC = "-discount"
+
+
+class OutboxTopic(Enum):
+    PAYMENT_CAPTURE = "payment.capture"
+    PAYMENT_RELEASE = "payment.release"
+    ORDER_CONFIRMATION_EMAIL = "email.order_confirmation"
+    ORDER_CANCELLATION_EMAIL = "email.order_cancellation"
@@ -1,12 +1,70 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import time
+
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncEngine
+
 from src.config import settings
+from src.logger import logger
+from src.metrics import instrument_engine, InstrumentedAsyncPool
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    new_engine = create_async_engine(
+        url,
+        poolclass=InstrumentedAsyncPool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={'prepared_statement_cache_size': settings.DB_PREPARED_STATEMENT_CACHE_SIZE},
+    )
+    instrument_engine(new_engine)
+    return new_engine
 
-engine = create_async_engine(settings.POSTGRESQL_DB_URL)
+
+engine = _create_engine(settings.POSTGRESQL_DB_URL)
+replica_engine = _create_engine(settings.POSTGRESQL_REPLICA_DB_URL) if settings.POSTGRESQL_REPLICA_DB_URL else None
 
 SessionLocal = async_sessionmaker(bind=engine, autoflush=False, autocommit=False, expire_on_commit=False)
+ReadOnlySessionLocal = async_sessionmaker(bind=engine.execution_options(postgresql_readonly=True),
+                                          autoflush=False, autocommit=False, expire_on_commit=False)
+ReplicaSessionLocal = async_sessionmaker(bind=replica_engine.execution_options(postgresql_readonly=True),
+                                         autoflush=False, autocommit=False,
+                                         expire_on_commit=False) if replica_engine else None
+
+_replica_down_until = 0.0
 
 
 async def get_db():
     async with SessionLocal() as db:
         yield db
         await db.commit()
+
+
+async def get_read_db():
+    """Read-only session for endpoints that never write; uses the replica when it is configured and reachable."""
+    global _replica_down_until
+
+    if ReplicaSessionLocal is not None and time.monotonic() >= _replica_down_until:
+        db = ReplicaSessionLocal()
+        try:
+            # Connect up front so an unreachable replica falls back to the primary before the handler runs.
+            await db.connection()
+        except (OSError, DBAPIError, PoolTimeoutError) as e:
+            await db.close()
+            _replica_down_until = time.monotonic() + settings.REPLICA_RETRY_AFTER_SECONDS
+            logger.warning(f"Replica is unavailable, reading from the primary: {e}")
+        else:
+            async with db:
+                yield db
+            return
+
+    async with ReadOnlySessionLocal() as db:
+        yield db
+
+
+async def get_primary_read_db():
+    """Read-only session on the primary, for reads that must see every committed write."""
+    async with ReadOnlySessionLocal() as db:
+        yield db
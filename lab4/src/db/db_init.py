@@ -1,13 +1,39 @@
-from sqlalchemy import text
+from pathlib import Path
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine
 
-import src.db.models
+ALEMBIC_CONFIG_PATH = Path(__file__).resolve().parents[2] / 'alembic.ini'
+
+
+def get_alembic_config() -> Config:
+    return Config(str(ALEMBIC_CONFIG_PATH))
+
+
+def _upgrade(connection: Connection, config: Config):
+    config.attributes['connection'] = connection
+    command.upgrade(config, 'head')
+
+
+def _current_heads(connection: Connection) -> set[str]:
+    return set(MigrationContext.configure(connection).get_current_heads())
 
 
-async def create_models(engine: AsyncEngine):
+async def run_migrations(engine: AsyncEngine):
     async with engine.begin() as conn:
-        await conn.run_sync(src.db.models.Base.metadata.create_all)
+        await conn.run_sync(_upgrade, get_alembic_config())
 
 
 async def init_db(engine: AsyncEngine):
-    await create_models(engine)
+    # Schema changes are applied by `alembic upgrade head` before the app starts;
+    # on boot we only compare the stored revision with the latest migration script.
+    expected = set(ScriptDirectory.from_config(get_alembic_config()).get_heads())
+    async with engine.connect() as conn:
+        current = await conn.run_sync(_current_heads)
+    if current != expected:
+        raise RuntimeError(f"Database schema is at revision {sorted(current) or 'none'}, "
+                           f"expected {sorted(expected)}; run `alembic upgrade head`")
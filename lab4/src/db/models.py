@@ -1,8 +1,9 @@
 from datetime import datetime, UTC
 from typing import Optional
 
-from sqlalchemy import Integer, String, TIMESTAMP, ForeignKey, Boolean
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy import (Integer, BigInteger, String, TIMESTAMP, ForeignKey, ForeignKeyConstraint, Boolean, Index,
+                        select, func, Computed, LargeBinary, text)
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import Mapped, declared_attr, DeclarativeBase
@@ -14,6 +15,10 @@ from src.custom_types import OrderStatus
 from src.schemas.item import Item
 
 
+# Text search configuration of the products search vector; queries must use the same one to match it.
+PRODUCT_SEARCH_CONFIG = 'english'
+
+
 class Base(AsyncAttrs, DeclarativeBase):
     pass
 
@@ -33,7 +38,9 @@ class User(Base):
 class TokenBase(Base):
     __abstract__ = True
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'), primary_key=True)
-    token: Mapped[str] = mapped_column(String)
+    # SHA-256 of the issued token; the token itself is never stored.
+    token_hash: Mapped[bytes] = mapped_column(LargeBinary(32))
+    expires_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False), index=True)
 
 
 class RefreshToken(TokenBase):
@@ -62,21 +69,50 @@ class CartItem(ItemBase):
     def total_price(self):
         return self.product.final_price * self.quantity
 
+    @total_price.inplace.expression
+    @classmethod
+    def _total_price_expression(cls):
+        return (select(Product.final_price * cls.quantity)
+                .where(Product.id == cls.product_id)
+                .correlate_except(Product)
+                .scalar_subquery())
+
 
 class OrderItem(ItemBase):
     __tablename__ = 'order_items'
-    order_id: Mapped[int] = mapped_column(ForeignKey('orders.id', ondelete='CASCADE'), primary_key=True)
+    __table_args__ = (
+        ForeignKeyConstraint(['order_id', 'order_created_at', 'order_is_archived'],
+                             ['orders.id', 'orders.created_at', 'orders.is_archived'],
+                             ondelete='CASCADE', onupdate='CASCADE'),
+        {'postgresql_partition_by': 'LIST (order_is_archived)'},
+    )
+    order_id: Mapped[int] = mapped_column(primary_key=True)
+    # The order's partition key, kept in step by the cascading foreign key so items move with their order.
+    order_created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False), primary_key=True)
+    order_is_archived: Mapped[bool] = mapped_column(primary_key=True, default=False)
     total_price: Mapped[int]
 
+    # The price is stored on the item itself, so the product is only loaded when explicitly awaited.
+    product: Mapped["Product"] = relationship('Product', lazy='select', uselist=False)
+
 
 class Order(Base):
     __tablename__ = 'orders'
-    id: Mapped[int] = mapped_column(primary_key=True)
+    __table_args__ = (
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+        Index('ix_orders_status_created_at', 'status', 'created_at', 'id'),
+        Index('ix_orders_user_id', 'user_id'),
+        # Partitions are laid out and maintained by src.db.partitions.
+        {'postgresql_partition_by': 'LIST (is_archived)'},
+    )
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     status: Mapped[OrderStatus] = mapped_column(default=OrderStatus.PENDING)
     user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
     is_paid: Mapped[bool] = mapped_column(default=False)
-    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False),
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False), primary_key=True,
                                                  default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    # Set once the order is finished and past the retention window; it then lives in the cold partitions.
+    is_archived: Mapped[bool] = mapped_column(primary_key=True, default=False)
 
     items: Mapped[list["OrderItem"]] = relationship('OrderItem', lazy='selectin', cascade="all, delete-orphan")
 
@@ -84,6 +120,15 @@ class Order(Base):
     def total_price(self):
         return sum(item.total_price for item in self.items)
 
+    @total_price.inplace.expression
+    @classmethod
+    def _total_price_expression(cls):
+        return (select(func.coalesce(func.sum(OrderItem.total_price), 0))
+                .where(OrderItem.order_id == cls.id, OrderItem.order_created_at == cls.created_at,
+                       OrderItem.order_is_archived == cls.is_archived)
+                .correlate_except(OrderItem)
+                .scalar_subquery())
+
     def __init__(self, user_id: int, items: list[Item]):
         super().__init__()
         self.user_id = user_id
@@ -92,18 +137,52 @@ class Order(Base):
 
 class Product(Base):
     __tablename__ = 'products'
+    __table_args__ = (
+        Index('ix_products_is_active_id', 'is_active', 'id'),
+        Index('ix_products_is_active_final_price_id', 'is_active', 'final_price', 'id'),
+        Index('ix_products_is_active_discount_id', 'is_active', 'discount', 'id'),
+        # For the admin listing across active and inactive products.
+        Index('ix_products_final_price_id', 'final_price', 'id'),
+        Index('ix_products_discount_id', 'discount', 'id'),
+        Index('ix_products_search_vector', 'search_vector', postgresql_using='gin'),
+    )
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     title: Mapped[str] = mapped_column(String(rules.MAX_PRODUCT_TITLE_LENGTH))
     description: Mapped[str] = mapped_column(String(rules.MAX_PRODUCT_DESCRIPTION_LENGTH))
     quantity: Mapped[int]
     full_price: Mapped[int]
     discount: Mapped[int] = mapped_column(default=0)
+    # Stored so the catalog can be filtered and sorted by the price customers see through an index.
+    final_price: Mapped[int] = mapped_column(Computed('full_price * (100 - discount) / 100', persisted=True))
     created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False),
                                                  default=lambda: datetime.now(UTC).replace(tzinfo=None))
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
 
     images: Mapped[list[str]] = mapped_column(JSONB, default=list)
 
-    @hybrid_property
-    def final_price(self):
-        return int(self.full_price * (1 - self.discount / 100))
+    search_vector: Mapped[str] = mapped_column(
+        TSVECTOR,
+        Computed(f"setweight(to_tsvector('{PRODUCT_SEARCH_CONFIG}', title), 'A') || "
+                 f"setweight(to_tsvector('{PRODUCT_SEARCH_CONFIG}', description), 'B')", persisted=True),
+        deferred=True,
+    )
+
+
+class OutboxEvent(Base):
+    """A side effect to run after the transaction that wrote it commits; deleted once it has been handled."""
+    __tablename__ = 'outbox_events'
+    __table_args__ = (
+        Index('ix_outbox_events_pending', 'available_at', 'id', postgresql_where=text('failed_at IS NULL')),
+    )
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    topic: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[dict] = mapped_column(JSONB)
+    attempts: Mapped[int] = mapped_column(default=0)
+    last_error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False),
+                                                 default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    # Earliest time a worker may pick the event up; pushed forward while it is claimed and on every retry.
+    available_at: Mapped[datetime] = mapped_column(TIMESTAMP(timezone=False),
+                                                   default=lambda: datetime.now(UTC).replace(tzinfo=None))
+    # Set when the event ran out of attempts; such events stay for inspection and are never retried.
+    failed_at: Mapped[Optional[datetime]] = mapped_column(TIMESTAMP(timezone=False), nullable=True)
@@ -0,0 +1,137 @@
+"""
+Partition layout of `orders` and `order_items`. Each is split by LIST on its archived flag into a hot and a cold
+tier, and each tier by RANGE on the order's `created_at`: the hot tier per month, the cold tier per year. Every
+tier also has a DEFAULT partition, so an insert never fails for want of a range. `order_items` is partitioned
+on the columns copied from its order, so an order and its items always sit in partitions with the same bounds.
+"""
+import re
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+# Table -> (archived flag column, created_at column) it is partitioned on.
+PARTITIONED_TABLES = {
+    'orders': ('is_archived', 'created_at'),
+    'order_items': ('order_is_archived', 'order_created_at'),
+}
+PARTITION_NAME = re.compile(
+    r'(?P<table>orders|order_items)_(?P<tier>hot|cold)(?:_(?P<suffix>default|\d{4}(?:_\d{2})?))?')
+# Partition DDL briefly locks the parent; waiting behind a long transaction would stall every query queued after it.
+DDL_LOCK_TIMEOUT = '5s'
+_MAINTENANCE_LOCK = 0x6F726465  # pg_advisory_xact_lock key shared by every instance that maintains partitions
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def hot_partition(table: str, month: datetime) -> str:
+    return f"{table}_hot_{month:%Y_%m}"
+
+
+def cold_partition(table: str, year: int) -> str:
+    return f"{table}_cold_{year}"
+
+
+async def lock_partition_maintenance(db: AsyncSession) -> bool:
+    """Takes the transaction-scoped maintenance lock; False if another instance is already maintaining."""
+    await db.execute(text(f"SET LOCAL lock_timeout = '{DDL_LOCK_TIMEOUT}'"))
+    return await db.scalar(text("SELECT pg_try_advisory_xact_lock(:key)"), {'key': _MAINTENANCE_LOCK})
+
+
+async def ensure_partitions(db: AsyncSession, months: list[datetime], years: list[int]) -> list[str]:
+    """Creates whichever of the tiers, the hot partitions of `months` and the cold ones of `years` are missing."""
+    existing = await _existing_partitions(db)
+    created = []
+    for table, (flag, column) in PARTITIONED_TABLES.items():
+        for tier, archived in (('hot', 'false'), ('cold', 'true')):
+            for name, definition in ((f"{table}_{tier}", f"PARTITION OF {table} FOR VALUES IN ({archived}) "
+                                                         f"PARTITION BY RANGE ({column})"),
+                                     (f"{table}_{tier}_default", f"PARTITION OF {table}_{tier} DEFAULT")):
+                if name not in existing:
+                    await db.execute(text(f"CREATE TABLE {name} {definition}"))
+                    existing.add(name)
+                    created.append(name)
+    for month in months:
+        created += await _ensure_range(db, existing, 'hot', {table: hot_partition(table, month)
+                                                             for table in PARTITIONED_TABLES},
+                                       month, add_months(month, 1))
+    for year in years:
+        created += await _ensure_range(db, existing, 'cold', {table: cold_partition(table, year)
+                                                              for table in PARTITIONED_TABLES},
+                                       datetime(year, 1, 1), datetime(year + 1, 1, 1))
+    return created
+
+
+async def _ensure_range(db: AsyncSession, existing: set[str], tier: str, names: dict[str, str],
+                        start: datetime, end: datetime) -> list[str]:
+    missing = {table: name for table, name in names.items() if name not in existing}
+    bounds = f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+    in_range = {'start': start, 'end': end}
+
+    stranded = False
+    for table in missing:
+        column = PARTITIONED_TABLES[table][1]
+        stranded |= await db.scalar(text(f"SELECT EXISTS (SELECT FROM {table}_{tier}_default "
+                                         f"WHERE {column} >= :start AND {column} < :end)"), in_range)
+    if not stranded:
+        for table, name in missing.items():
+            await db.execute(text(f"CREATE TABLE {name} PARTITION OF {table}_{tier} {bounds}"))
+    else:
+        # The range already has rows in the DEFAULT partition (maintenance was down for longer than it creates
+        # ahead), which a new partition of that range may not overlap. The rows are moved into standalone
+        # tables that are then attached: items first out of the default, so deleting their orders from it
+        # cascades to nothing, and orders first back in, so the items' foreign key finds them.
+        for table in ('order_items', 'orders'):
+            if table in missing:
+                column = PARTITIONED_TABLES[table][1]
+                await db.execute(text(f"CREATE TABLE {missing[table]} (LIKE {table}_{tier} INCLUDING DEFAULTS)"))
+                await db.execute(text(f"""
+                    WITH moved AS (
+                        DELETE FROM {table}_{tier}_default WHERE {column} >= :start AND {column} < :end RETURNING *
+                    )
+                    INSERT INTO {missing[table]} SELECT * FROM moved
+                """), in_range)
+        for table in ('orders', 'order_items'):
+            if table in missing:
+                await db.execute(text(f"ALTER TABLE {table}_{tier} ATTACH PARTITION {missing[table]} {bounds}"))
+    existing.update(missing.values())
+    return list(missing.values())
+
+
+async def hot_months(db: AsyncSession) -> list[datetime]:
+    """Months that have a hot `orders` partition, oldest first."""
+    months = {datetime.strptime(match['suffix'], '%Y_%m') for name in await _existing_partitions(db)
+              if (match := PARTITION_NAME.fullmatch(name)) and match['table'] == 'orders' and match['tier'] == 'hot'
+              and match['suffix'] not in (None, 'default')}
+    return sorted(months)
+
+
+async def drop_hot_month_if_empty(db: AsyncSession, month: datetime) -> bool:
+    """Drops the hot partitions of `month` if no order or item is left in them."""
+    names = {table: hot_partition(table, month) for table in PARTITIONED_TABLES}
+    for name in names.values():
+        if await db.scalar(text(f"SELECT EXISTS (SELECT FROM {name})")):
+            return False
+    # Items first: detaching an `orders` partition checks that nothing references it any more.
+    for table in ('order_items', 'orders'):
+        await db.execute(text(f"ALTER TABLE {table}_hot DETACH PARTITION {names[table]}"))
+        await db.execute(text(f"DROP TABLE {names[table]}"))
+    return True
+
+
+async def _existing_partitions(db: AsyncSession) -> set[str]:
+    result = await db.execute(text("""
+        SELECT c.relname
+        FROM pg_partition_tree('orders') t JOIN pg_class c ON c.oid = t.relid
+        UNION ALL
+        SELECT c.relname
+        FROM pg_partition_tree('order_items') t JOIN pg_class c ON c.oid = t.relid
+    """))
+    return set(result.scalars())
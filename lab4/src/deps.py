@@ -4,14 +4,20 @@ from fastapi import Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.crud import CartItemCRUD, ProductCRUD, OrderCRUD, RefreshTokenCRUD, RecoveryTokenCRUD
+from src.config import settings
+from src.crud import CartItemCRUD, ProductCRUD, OrderCRUD, OutboxCRUD
 from src.crud.users import UserCRUD
-from src.db import models
-from src.db.db import get_db
+from src.custom_exceptions import NotEnoughRightsError
+from src.db.db import get_db, get_read_db, get_primary_read_db
+from src.rate_limit import RateLimit, Budget
+from src.schemas.user import CurrentUser
 from src.service.cart import CartService
 from src.service.order import OrderService
 from src.service.product import ProductService
+from src.service.product_images import ProductImageService
+from src.service.product_import import ProductImportService
 from src.service.token import TokenService
+from src.service.token_store import get_token_stores
 from src.service.user import UserService
 from src.utils import get_user_id_from_jwt
 
@@ -19,8 +25,19 @@ oauth2_schema = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 TokenDep = Annotated[str, Depends(oauth2_schema)]
 
+# Route-level `dependencies=[...]` run before everything else the route depends on.
+auth_rate_limit = Depends(RateLimit('auth', Budget(settings.RATE_LIMIT_AUTH_BURST,
+                                                   settings.RATE_LIMIT_AUTH_PER_MINUTE)))
+cart_rate_limit = Depends(RateLimit('cart', Budget(settings.RATE_LIMIT_CART_BURST,
+                                                   settings.RATE_LIMIT_CART_PER_MINUTE)))
+
 SessionDep = Annotated[AsyncSession, Depends(get_db)]
 
+# Never committed and possibly served by a lagging replica: only for endpoints that do not
+# need to see the caller's own just-committed writes.
+ReadOnlySessionDep = Annotated[AsyncSession, Depends(get_read_db)]
+PrimaryReadOnlySessionDep = Annotated[AsyncSession, Depends(get_primary_read_db)]
+
 
 def get_cart_service(db: SessionDep):
     return CartService(CartItemCRUD(db), ProductCRUD(db))
@@ -30,12 +47,19 @@ CartServiceDep = Annotated[CartService, Depends(get_cart_service)]
 
 
 def get_order_service(db: SessionDep):
-    return OrderService(OrderCRUD(db), CartItemCRUD(db), ProductCRUD(db))
+    return OrderService(OrderCRUD(db), CartItemCRUD(db), ProductCRUD(db), OutboxCRUD(db))
 
 
 OrderServiceDep = Annotated[OrderService, Depends(get_order_service)]
 
 
+def get_order_read_service(db: ReadOnlySessionDep):
+    return OrderService(OrderCRUD(db), CartItemCRUD(db), ProductCRUD(db), OutboxCRUD(db))
+
+
+OrderReadServiceDep = Annotated[OrderService, Depends(get_order_read_service)]
+
+
 def get_product_service(db: SessionDep):
     return ProductService(ProductCRUD(db))
 
@@ -43,6 +67,36 @@ def get_product_service(db: SessionDep):
 ProductServiceDep = Annotated[ProductService, Depends(get_product_service)]
 
 
+def get_product_read_service(db: ReadOnlySessionDep):
+    return ProductService(ProductCRUD(db))
+
+
+ProductReadServiceDep = Annotated[ProductService, Depends(get_product_read_service)]
+
+
+def get_catalog_service(db: PrimaryReadOnlySessionDep):
+    # Catalog pages are cached until the next product commit; filling the cache from a lagging replica
+    # right after that commit would keep serving the old rows for the whole TTL.
+    return ProductService(ProductCRUD(db))
+
+
+CatalogServiceDep = Annotated[ProductService, Depends(get_catalog_service)]
+
+
+def get_product_import_service(db: SessionDep):
+    return ProductImportService(ProductCRUD(db))
+
+
+ProductImportServiceDep = Annotated[ProductImportService, Depends(get_product_import_service)]
+
+
+def get_product_image_service(db: SessionDep):
+    return ProductImageService(ProductCRUD(db))
+
+
+ProductImageServiceDep = Annotated[ProductImageService, Depends(get_product_image_service)]
+
+
 def get_user_service(db: SessionDep):
     return UserService(UserCRUD(db))
 
@@ -51,7 +105,7 @@ UserServiceDep = Annotated[UserService, Depends(get_user_service)]
 
 
 def get_token_service(db: SessionDep):
-    return TokenService(RefreshTokenCRUD(db), RecoveryTokenCRUD(db))
+    return TokenService(*get_token_stores(db))
 
 
 TokenServiceDep = Annotated[TokenService, Depends(get_token_service)]
@@ -59,7 +113,23 @@ TokenServiceDep = Annotated[TokenService, Depends(get_token_service)]
 
 async def get_current_user(token: TokenDep, user_service: UserServiceDep):
     user_id = get_user_id_from_jwt(token)
-    return await user_service.get_user_by_id(user_id)
+    return await user_service.get_current_user(user_id)
+
+
+CurrentUserDep = Annotated[CurrentUser, Depends(get_current_user)]
+
+
+def get_current_admin(user: CurrentUserDep) -> CurrentUser:
+    if not user.is_admin:
+        raise NotEnoughRightsError("User is not an admin")
+    return user
+
+
+CurrentAdminDep = Annotated[CurrentUser, Depends(get_current_admin)]
+
+
+def get_current_user_id(token: TokenDep) -> int:
+    return get_user_id_from_jwt(token)
 
 
-CurrentUserDep = Annotated[models.User, Depends(get_current_user)]
+CurrentUserIdDep = Annotated[int, Depends(get_current_user_id)]
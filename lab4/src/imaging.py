@@ -0,0 +1,53 @@
+"""
+Image helpers that run inside the image process pool. Kept free of application imports so that spawned
+workers only load Pillow.
+"""
+from pathlib import Path
+
+from PIL import Image, ImageOps
+
+# Leading bytes of every accepted format and the extension stored files get.
+_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+SNIFF_BYTES = 12
+
+
+def sniff_image_type(header: bytes) -> str | None:
+    """Extension for the format the first `SNIFF_BYTES` bytes belong to, or None if it is not an accepted image."""
+    if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+        return 'webp'
+    return next((extension for signature, extension in _SIGNATURES if header.startswith(signature)), None)
+
+
+def variant_name(filename: str, width: int) -> str:
+    return f"{filename.rsplit('.', 1)[0]}_{width}.webp"
+
+
+def render_variants(source: str, directory: str, filename: str, widths: list[int], max_pixels: int) -> list[str]:
+    """
+    Decodes `source` fully and writes a WebP variant no wider than each of `widths` into `directory`.
+    Raises ValueError if the file is not a decodable image.
+    """
+    Image.MAX_IMAGE_PIXELS = max_pixels
+    written = []
+    try:
+        with Image.open(source) as image:
+            image.load()
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'A' in image.getbands() or 'transparency' in image.info else 'RGB')
+            for width in widths:
+                variant = image.copy()
+                variant.thumbnail((width, width * 4))
+                path = Path(directory) / variant_name(filename, width)
+                variant.save(path, 'WEBP', quality=80, method=4)
+                written.append(path.name)
+    except (OSError, Image.DecompressionBombError, SyntaxError) as e:
+        for name in written:
+            (Path(directory) / name).unlink(missing_ok=True)
+        raise ValueError(str(e)) from None
+    return written
@@ -1,4 +1,5 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,7 +8,13 @@ from fastapi.responses import JSONResponse
 from src.config import settings
 from src.db.db import engine
 from src.db.db_init import init_db
-from src.routers import auth, users, orders, products, cart
+from src.metrics import RequestMetricsMiddleware
+from src.service import outbox
+from src.service.order_archive import OrderArchiver
+from src.service.outbox import OutboxWorker
+from src.service.product_images import shutdown_image_executor
+from src.service.token_store import TokenSweeper
+from src.routers import auth, users, orders, products, images, cart, internal, metrics
 from src.custom_exceptions import (
     PetStoreApiError,
     ResourceDoesNotExistError,
@@ -24,14 +31,28 @@ from src.custom_exceptions import (
     EmailNotConfirmedError,
     DependentEntityExistsError,
     PaymentGatewayError,
-    EmptyCartError
+    EmptyCartError,
+    InvalidCursorError
 )
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db(engine)
+    background = [asyncio.create_task(
+        TokenSweeper(settings.TOKEN_SWEEP_INTERVAL_SECONDS, settings.TOKEN_SWEEP_BATCH_SIZE).run()),
+        asyncio.create_task(OrderArchiver(settings.ORDER_ARCHIVE_INTERVAL_SECONDS, settings.ORDER_RETENTION_DAYS,
+                                          settings.ORDER_PARTITION_MONTHS_AHEAD,
+                                          settings.ORDER_ARCHIVE_BATCH_SIZE).run())]
+    if settings.OUTBOX_ENABLED:
+        background.append(asyncio.create_task(OutboxWorker(outbox.outbox_handler).run()))
     yield
+    for task in background:
+        task.cancel()
+    for task in background:
+        with suppress(asyncio.CancelledError):
+            await task
+    shutdown_image_executor()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -42,13 +63,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing", "Retry-After"],
 )
+app.add_middleware(RequestMetricsMiddleware)
 
 app.include_router(auth.router)
 app.include_router(users.router)
 app.include_router(orders.router)
 app.include_router(products.router)
+app.include_router(images.router)
 app.include_router(cart.router)
+app.include_router(internal.router)
+app.include_router(metrics.router)
 
 
 def create_exception_handler(status_code, initial_detail):
@@ -69,7 +95,7 @@ exception_handlers = [
     (InvalidCredentialsError, status.HTTP_401_UNAUTHORIZED, "Invalid credentials"),
     (FileTooLargeError, status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "File is too large"),
     (NotSupportedFileTypeError, status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "File type is not allowed"),
-    (LimitExceededError, status.HTTP_409_CONFLICT, "Limit exceeded"),
+    (LimitExceededError, status.HTTP_429_TOO_MANY_REQUESTS, "Limit exceeded"),
     (InvalidConfirmationCodeError, status.HTTP_401_UNAUTHORIZED, "Invalid confirmation code"),
     (InsufficientStockError, status.HTTP_409_CONFLICT, "Out of stock"),
     (InvalidOrderStatusError, status.HTTP_409_CONFLICT, "Invalid order status"),
@@ -77,6 +103,7 @@ exception_handlers = [
     (DependentEntityExistsError, status.HTTP_409_CONFLICT, "Dependent entity exists"),
     (PaymentGatewayError, status.HTTP_500_INTERNAL_SERVER_ERROR, "Payment gateway error"),
     (EmptyCartError, status.HTTP_409_CONFLICT, "Cart is empty"),
+    (InvalidCursorError, status.HTTP_400_BAD_REQUEST, "Invalid pagination cursor"),
 ]
 
 for exc, code, message in exception_handlers:
@@ -0,0 +1,210 @@
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_seconds')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar('request_stats', default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    def __init__(self, name: str, help: str, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.series: dict[tuple, Histogram] = {}
+
+    def observe(self, labels: tuple, value: float):
+        if (histogram := self.series.get(labels)) is None:
+            histogram = self.series[labels] = Histogram(self.buckets)
+        histogram.observe(value)
+
+    def render(self, label_names: tuple) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, histogram in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, '+Inf'), histogram.counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_labels((*label_names, 'le'), (*labels, bound))} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(label_names, labels)} {histogram.sum}")
+            lines.append(f"{self.name}_count{_labels(label_names, labels)} {histogram.count}")
+        return lines
+
+
+class CounterFamily:
+    def __init__(self, name: str, help: str):
+        self.name = name
+        self.help = help
+        self.series: dict[tuple, int] = {}
+
+    def inc(self, labels: tuple):
+        self.series[labels] = self.series.get(labels, 0) + 1
+
+    def render(self, label_names: tuple) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self.series.items()):
+            lines.append(f"{self.name}{_labels(label_names, labels)} {value}")
+        return lines
+
+
+ROUTE_LABELS = ('method', 'route')
+
+requests_total = CounterFamily('http_requests_total', 'HTTP requests by route and status code.')
+request_duration = HistogramFamily('http_request_duration_seconds', 'Time to the end of the response body.',
+                                   LATENCY_BUCKETS)
+request_db_queries = HistogramFamily('http_request_db_queries', 'SQL statements executed per request.',
+                                     QUERY_COUNT_BUCKETS)
+request_db_duration = HistogramFamily('http_request_db_duration_seconds', 'Time spent in SQL per request.',
+                                      LATENCY_BUCKETS)
+pool_wait = HistogramFamily('db_pool_wait_seconds', 'Time spent waiting for a pooled connection.', POOL_WAIT_BUCKETS)
+pool_checkouts = CounterFamily('db_pool_checkouts_total', 'Connections handed out by the pool.')
+pool_timeouts = CounterFamily('db_pool_timeouts_total', 'Checkouts that gave up after the pool timeout.')
+
+_pools: list[Pool] = []
+
+
+class InstrumentedAsyncPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited for a free connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_timeouts.inc(())
+            raise
+        pool_wait.observe((), time.perf_counter() - started)
+        return connection
+
+
+def render_metrics() -> str:
+    lines = [
+        *requests_total.render((*ROUTE_LABELS, 'status')),
+        *request_duration.render(ROUTE_LABELS),
+        *request_db_queries.render(ROUTE_LABELS),
+        *request_db_duration.render(ROUTE_LABELS),
+        *pool_wait.render(()),
+        *pool_checkouts.render(()),
+        *pool_timeouts.render(()),
+        *_render_pool_gauges(),
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _render_pool_gauges() -> list[str]:
+    gauges = (
+        ('db_pool_size', 'Configured number of persistent connections.', lambda pool: pool.size()),
+        ('db_pool_checked_out', 'Connections currently in use.', lambda pool: pool.checkedout()),
+        ('db_pool_idle', 'Connections idle in the pool.', lambda pool: pool.checkedin()),
+        ('db_pool_overflow', 'Connections open beyond the pool size.', lambda pool: max(pool.overflow(), 0)),
+    )
+    lines = []
+    for name, help, read in gauges:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge"]
+        lines += [f"{name}{_labels(('pool',), (str(i),))} {read(pool)}" for i, pool in enumerate(_pools)
+                  if isinstance(pool, AsyncAdaptedQueuePool)]
+    return lines
+
+
+def instrument_engine(engine: AsyncEngine):
+    # The asyncio greenlets SQLAlchemy runs cursor calls in inherit the request's context,
+    # so the stats of the current request are reachable from the sync engine events.
+    @event.listens_for(engine.sync_engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info['query_started'] = time.perf_counter()
+
+    @event.listens_for(engine.sync_engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if (stats := _request_stats.get()) is not None:
+            stats.queries += 1
+            stats.db_seconds += time.perf_counter() - conn.info.pop('query_started')
+
+    @event.listens_for(engine.sync_engine, 'handle_error')
+    def handle_error(exception_context):
+        if (stats := _request_stats.get()) is not None and exception_context.connection is not None:
+            stats.queries += 1
+            stats.db_seconds += time.perf_counter() - exception_context.connection.info.pop('query_started', 0)
+
+    @event.listens_for(engine.sync_engine.pool, 'checkout')
+    def checkout(dbapi_connection, connection_record, connection_proxy):
+        pool_checkouts.inc(())
+
+    _pools.append(engine.sync_engine.pool)
+    pool_checkouts.series.setdefault((), 0)
+    pool_timeouts.series.setdefault((), 0)
+
+
+class RequestMetricsMiddleware:
+    """Counts the SQL issued per request, reports it in `Server-Timing` and feeds the `/metrics` histograms."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_timing(message: Message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                total_ms = (time.perf_counter() - started) * 1000
+                header = (f'db;dur={stats.db_seconds * 1000:.2f};desc="{stats.queries} queries", '
+                          f'app;dur={total_ms:.2f}')
+                message['headers'] = [*message.get('headers', ()), (b'server-timing', header.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_stats.reset(token)
+            route = scope.get('route')
+            labels = (scope['method'], route.path if route is not None else 'unmatched')
+            requests_total.inc((*labels, str(status_code)))
+            request_duration.observe(labels, time.perf_counter() - started)
+            request_db_queries.observe(labels, stats.queries)
+            request_db_duration.observe(labels, stats.db_seconds)
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(str(v))}"' for k, v in zip(names, values)) + '}'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
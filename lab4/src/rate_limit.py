@@ -0,0 +1,115 @@
+import math
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Hashable
+
+from fastapi import Request
+
+from src.config import settings
+from src.custom_exceptions import LimitExceededError
+from src.utils import get_cached_user_id_from_jwt
+
+
+class Budget:
+    """Token bucket: up to `burst` requests at once, refilled at `per_minute` requests a minute."""
+
+    __slots__ = ('burst', 'per_second')
+
+    def __init__(self, burst: int, per_minute: float):
+        self.burst = burst
+        self.per_second = per_minute / 60
+
+
+class RateLimitStore(ABC):
+    """Where the buckets live; a store shared between workers makes the limits global instead of per process."""
+
+    @abstractmethod
+    async def acquire(self, key: Hashable, budget: Budget) -> float:
+        """Takes one token from the bucket under `key`. Returns 0 if it was taken, else seconds until one is."""
+
+
+class _Shard:
+    __slots__ = ('lock', 'buckets')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # key -> [tokens, updated_at, full_at], least recently used first.
+        self.buckets: OrderedDict[Hashable, list] = OrderedDict()
+
+
+class ShardedMemoryRateLimitStore(RateLimitStore):
+    """
+    Per-process buckets spread over independently locked shards. A bucket that has refilled completely is the
+    same as no bucket, so each call drops up to two such buckets from the cold end of its shard; the store never
+    needs a sweep and stays O(1) per check. `max_keys_per_shard` bounds memory when many clients show up at once.
+    """
+
+    def __init__(self, shards: int = 16, max_keys_per_shard: int = 10_000):
+        self.shards = [_Shard() for _ in range(shards)]
+        self.max_keys_per_shard = max_keys_per_shard
+
+    async def acquire(self, key: Hashable, budget: Budget) -> float:
+        shard = self.shards[hash(key) % len(self.shards)]
+        now = time.monotonic()
+        with shard.lock:
+            buckets = shard.buckets
+            if (bucket := buckets.get(key)) is None:
+                tokens = budget.burst
+            else:
+                tokens = min(budget.burst, bucket[0] + (now - bucket[1]) * budget.per_second)
+                buckets.move_to_end(key)
+
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / budget.per_second
+            buckets[key] = [tokens, now, now + (budget.burst - tokens) / budget.per_second]
+
+            for _ in range(2):
+                oldest_key, oldest = next(iter(buckets.items()))
+                if oldest[2] > now and len(buckets) <= self.max_keys_per_shard:
+                    break
+                del buckets[oldest_key]
+            return wait
+
+    def __len__(self):
+        return sum(len(shard.buckets) for shard in self.shards)
+
+
+rate_limit_store: RateLimitStore = ShardedMemoryRateLimitStore(settings.RATE_LIMIT_SHARDS,
+                                                               settings.RATE_LIMIT_MAX_KEYS_PER_SHARD)
+
+
+def set_rate_limit_store(store: RateLimitStore):
+    global rate_limit_store
+    rate_limit_store = store
+
+
+class RateLimit:
+    """
+    Dependency that spends one token of the route's budget per request. Clients are told apart by user id when
+    the request carries a bearer token already verified by an earlier request and by IP otherwise. It runs before
+    any other dependency of the route, so a rejected request never reaches the database or the password hasher.
+    """
+
+    def __init__(self, name: str, budget: Budget):
+        self.name = name
+        self.budget = budget
+
+    async def __call__(self, request: Request):
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        if wait := await rate_limit_store.acquire((self.name, _client_key(request)), self.budget):
+            raise LimitExceededError("Too many requests, slow down", {"Retry-After": str(math.ceil(wait))})
+
+
+def _client_key(request: Request) -> tuple:
+    # Only tokens already verified by an earlier request count: a lookup in the JWT cache is all a rejected
+    # request may cost, so a forged or not yet cached token is limited by IP instead.
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token and (user_id := get_cached_user_id_from_jwt(token)) is not None:
+        return 'user', user_id
+    return 'ip', request.client.host if request.client else None
@@ -10,7 +10,7 @@ from src.custom_exceptions import (
     InvalidTokenError,
 
 )
-from src.deps import TokenDep, TokenServiceDep, UserServiceDep
+from src.deps import TokenDep, TokenServiceDep, UserServiceDep, auth_rate_limit
 from src.schemas.message import Message
 from src.schemas.token import Token
 from src.schemas.user import UserIn, UserOut
@@ -23,28 +23,34 @@ router = APIRouter(
 )
 
 
-async def _handle_user_tokens(user_id: int, response: Response, token_service: TokenService):
+def _issue_tokens(user_id: int, response: Response) -> tuple[dict, str, datetime]:
     access_token = create_jwt_token(user_id=user_id,
                                     expires_in=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRATION_MINUTES))
     refresh_token = create_jwt_token(user_id=user_id,
                                      expires_in=timedelta(days=settings.REFRESH_TOKEN_EXPIRATION_DAYS))
-    await token_service.upsert_refresh_token(user_id, refresh_token)
+    refresh_expires_at = datetime.now(UTC) + timedelta(days=settings.REFRESH_TOKEN_EXPIRATION_DAYS)
 
     response.set_cookie(key="refresh_token",
                         value=refresh_token,
                         httponly=True,
                         secure=False,  # should be True in production
-                        expires=datetime.now(UTC) + timedelta(days=settings.REFRESH_TOKEN_EXPIRATION_DAYS),
+                        expires=refresh_expires_at,
                         samesite=settings.SAME_SITE_COOKIE)
-    return {'access_token': access_token, "token_type": "bearer"}
+    return {'access_token': access_token, "token_type": "bearer"}, refresh_token, refresh_expires_at
+
+
+async def _handle_user_tokens(user_id: int, response: Response, token_service: TokenService):
+    body, refresh_token, refresh_expires_at = _issue_tokens(user_id, response)
+    await token_service.upsert_refresh_token(user_id, refresh_token, refresh_expires_at)
+    return body
 
 
-@router.post('/register', status_code=status.HTTP_200_OK, response_model=UserOut)
+@router.post('/register', status_code=status.HTTP_200_OK, response_model=UserOut, dependencies=[auth_rate_limit])
 async def register(user: UserIn, user_service: UserServiceDep):
     return await user_service.register_user(user)
 
 
-@router.post('/login', status_code=status.HTTP_200_OK, response_model=Token)
+@router.post('/login', status_code=status.HTTP_200_OK, response_model=Token, dependencies=[auth_rate_limit])
 async def login(user_credentials: Annotated[OAuth2PasswordRequestForm, Depends()],
                 res: Response,
                 user_service: UserServiceDep,
@@ -53,7 +59,7 @@ async def login(user_credentials: Annotated[OAuth2PasswordRequestForm, Depends()
     if user is not None and user.password is None:
         raise InvalidCredentialsError("Account is registered with an external provider")
 
-    if not (user and verify_password(user_credentials.password, user.password)):
+    if not (user and await verify_password(user_credentials.password, user.password)):
         raise InvalidCredentialsError("No account with the given email exists or the password is wrong")
 
     return await _handle_user_tokens(user.id, res, token_service)
@@ -66,10 +72,12 @@ async def refresh(req: Request, res: Response, token_service: TokenServiceDep):
         raise InvalidTokenError("No token found")
     user_id = get_user_id_from_jwt(token)
 
-    if not (await token_service.is_refresh_token_valid(user_id, token)):
+    # Checking the presented token and storing its replacement is one keyed UPDATE.
+    body, refresh_token, refresh_expires_at = _issue_tokens(user_id, res)
+    if not (await token_service.rotate_refresh_token(user_id, token, refresh_token, refresh_expires_at)):
         raise InvalidTokenError("Invalid refresh token")
 
-    return await _handle_user_tokens(user_id, res, token_service)
+    return body
 
 
 @router.post('/logout', status_code=status.HTTP_200_OK, response_model=Message)
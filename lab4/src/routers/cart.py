@@ -1,10 +1,11 @@
-from typing import Optional
+from typing import Optional, Annotated
 
-from fastapi import APIRouter, status
+from fastapi import APIRouter, status, Header, Response
 
-from src.schemas.cart import CartOut
+from src.schemas.cart import CartOut, Cart
 from src.schemas.item import ItemIn
-from src.deps import CurrentUserDep, CartServiceDep
+from src.deps import CurrentUserIdDep, CartServiceDep, cart_rate_limit
+from src.utils import make_etag, etag_matches
 
 router = APIRouter(
     prefix='/cart',
@@ -12,24 +13,37 @@ router = APIRouter(
 )
 
 
+def _cart_etag(cart: Cart) -> str:
+    return make_etag(';'.join(f'{i.product_id}:{i.quantity}:{i.total_price}' for i in cart.items).encode())
+
+
 @router.get('', response_model=CartOut, status_code=status.HTTP_200_OK)
-async def get_my_cart(user: CurrentUserDep, cart_service: CartServiceDep):
-    return await cart_service.get_cart(user.id)
+async def get_my_cart(user_id: CurrentUserIdDep,
+                      cart_service: CartServiceDep,
+                      response: Response,
+                      if_none_match: Annotated[str | None, Header()] = None):
+    cart = await cart_service.get_cart(user_id)
+    headers = {'ETag': _cart_etag(cart), 'Cache-Control': 'private, no-cache'}
+
+    if etag_matches(if_none_match, headers['ETag']):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return cart
 
 
-@router.post('/items', response_model=Optional[CartOut], status_code=status.HTTP_200_OK)
-async def add_item_to_cart(user: CurrentUserDep, item: ItemIn, cart_service: CartServiceDep):
-    await cart_service.add_item(user.id, item)
-    return await cart_service.get_cart(user.id)
+@router.post('/items', response_model=Optional[CartOut], status_code=status.HTTP_200_OK,
+             dependencies=[cart_rate_limit])
+async def add_item_to_cart(user_id: CurrentUserIdDep, item: ItemIn, cart_service: CartServiceDep):
+    return await cart_service.add_item(user_id, item)
 
 
-@router.delete('/items', response_model=Optional[CartOut], status_code=status.HTTP_200_OK)
-async def remove_item_from_cart(user: CurrentUserDep, item: ItemIn, cart_service: CartServiceDep):
-    await cart_service.remove_item(user.id, item)
-    return await cart_service.get_cart(user.id)
+@router.delete('/items', response_model=Optional[CartOut], status_code=status.HTTP_200_OK,
+               dependencies=[cart_rate_limit])
+async def remove_item_from_cart(user_id: CurrentUserIdDep, item: ItemIn, cart_service: CartServiceDep):
+    return await cart_service.remove_item(user_id, item)
 
 
 @router.post('/clear', response_model=CartOut, status_code=status.HTTP_200_OK)
-async def clear_cart(user: CurrentUserDep, cart_service: CartServiceDep):
-    await cart_service.clear_cart(user.id)
-    return await cart_service.get_cart(user.id)
+async def clear_cart(user_id: CurrentUserIdDep, cart_service: CartServiceDep):
+    return await cart_service.clear_cart(user_id)
@@ -0,0 +1,41 @@
+import os
+import re
+from typing import Annotated
+from urllib.parse import urlsplit
+
+from fastapi import APIRouter, Header, Response, status
+
+from src.config import settings
+from src.custom_exceptions import ResourceDoesNotExistError
+from src.service.product_images import image_path
+from src.static_files import ImmutableFileResponse, IMMUTABLE_CACHE_CONTROL
+from src.utils import etag_matches
+
+router = APIRouter(
+    prefix=urlsplit(settings.IMAGES_BASE_URL).path.rstrip('/'),
+    tags=['images']
+)
+
+# Stored originals are `<sha256>.<ext>`, their variants `<sha256>_<width>.webp`.
+_FILENAME = re.compile(r'([0-9a-f]{64}(?:_\d+)?)\.(jpg|png|gif|webp)')
+_MEDIA_TYPES = {'jpg': 'image/jpeg', 'png': 'image/png', 'gif': 'image/gif', 'webp': 'image/webp'}
+
+
+@router.api_route('/{product_id}/{filename}', methods=['GET', 'HEAD'], status_code=status.HTTP_200_OK,
+                  responses={200: {'content': {'image/*': {'schema': {'type': 'string', 'format': 'binary'}}}}})
+async def get_image(product_id: int, filename: str, if_none_match: Annotated[str | None, Header()] = None):
+    # Files are shared by every product that uploaded the same bytes, so serving one needs no database
+    # round trip; the product id only keeps the URL layout of `ProductOut.images`.
+    if (match := _FILENAME.fullmatch(filename)) is None:
+        raise ResourceDoesNotExistError("Image not found")
+    etag = f'"{match[1]}"'
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={'ETag': etag, 'Cache-Control': IMMUTABLE_CACHE_CONTROL})
+
+    path = image_path(filename)
+    try:
+        size = os.stat(path).st_size
+    except FileNotFoundError:
+        raise ResourceDoesNotExistError("Image not found")
+    return ImmutableFileResponse(path, size, etag, _MEDIA_TYPES[match[2]])
@@ -0,0 +1,16 @@
+from fastapi import APIRouter, status, Depends
+
+from src.cache import caches
+from src.deps import get_current_admin
+
+router = APIRouter(
+    prefix='/internal',
+    tags=['internal'],
+    # Cache sizes and hit rates give away how busy the service is.
+    dependencies=[Depends(get_current_admin)]
+)
+
+
+@router.get('/caches', status_code=status.HTTP_200_OK)
+async def get_cache_stats() -> dict[str, dict]:
+    return {name: cache.stats() for name, cache in caches.items()}
@@ -3,8 +3,9 @@ from fastapi import APIRouter, status, Depends
 from src.custom_types import OrderStatus
 from src.schemas.filtration import PaginationParams, OrderFilter
 from src.schemas.message import Message
-from src.schemas.order import OrderOut
-from src.deps import CurrentUserDep, CartServiceDep, OrderServiceDep
+from src.schemas.order import OrderOut, OrderSummaryOut, OrderStatusChangeIn, OrderStatusChangeOut
+from src.serialization import dump_orders, dump_order_summaries, json_list_response
+from src.deps import CurrentUserIdDep, CartServiceDep, OrderServiceDep, OrderReadServiceDep
 from src.custom_exceptions import (
     EmptyCartError, NotEnoughRightsError,
 )
@@ -16,23 +17,23 @@ router = APIRouter(
 
 
 @router.post('', status_code=status.HTTP_201_CREATED, response_model=OrderOut)
-async def create_order(user: CurrentUserDep, order_service: OrderServiceDep, cart_service: CartServiceDep):
-    cart = await cart_service.get_cart(user.id)
+async def create_order(user_id: CurrentUserIdDep, order_service: OrderServiceDep, cart_service: CartServiceDep):
+    cart = await cart_service.get_cart(user_id)
 
     if len(cart.items) == 0:
         raise EmptyCartError("The user's cart is empty")
 
-    order = await order_service.create_order(user.id, cart)
+    order = await order_service.create_order(user_id, cart)
 
-    await cart_service.clear_cart(user.id)
+    await cart_service.clear_cart(user_id)
 
     return order
 
 
 @router.post('/{order_id}/cancel', status_code=status.HTTP_204_NO_CONTENT)
-async def cancel_order(order_id: int, user: CurrentUserDep, order_service: OrderServiceDep):
+async def cancel_order(order_id: int, user_id: CurrentUserIdDep, order_service: OrderServiceDep):
     order = await order_service.get_order(order_id)
-    if order.user_id != user.id:
+    if order.user_id != user_id:
         raise NotEnoughRightsError("User is not the order owner")
     await order_service.cancel_order(order_id)
 
@@ -44,8 +45,31 @@ async def change_order_status(order_id: int, new_status: OrderStatus, order_serv
     return Message(message=f"The order status updated to {new_status.value}")
 
 
+@router.patch('/status', status_code=status.HTTP_200_OK, response_model=OrderStatusChangeOut)
+async def change_order_statuses(change: OrderStatusChangeIn, order_service: OrderServiceDep):
+    return await order_service.change_statuses(change)
+
+
 @router.get('/', response_model=list[OrderOut], status_code=status.HTTP_200_OK)
-async def get_orders(order_service: OrderServiceDep,
+async def get_orders(order_service: OrderReadServiceDep,
                      filter: OrderFilter = Depends(),
                      pagination: PaginationParams = Depends()):
-    return await order_service.get_orders(filter=filter, pagination=pagination)
+    orders = await order_service.get_orders(filter=filter, pagination=pagination)
+    return json_list_response(dump_orders(orders), order_service.get_next_cursor(orders, pagination))
+
+
+@router.get('/summary', response_model=list[OrderSummaryOut], status_code=status.HTTP_200_OK)
+async def get_order_summaries(order_service: OrderReadServiceDep,
+                              filter: OrderFilter = Depends(),
+                              pagination: PaginationParams = Depends()):
+    orders = await order_service.get_order_summaries(filter=filter, pagination=pagination)
+    return json_list_response(dump_order_summaries(orders), order_service.get_next_cursor(orders, pagination))
+
+
+@router.get('/{order_id}', response_model=OrderOut, status_code=status.HTTP_200_OK)
+async def get_order(order_id: int, user_id: CurrentUserIdDep, order_service: OrderServiceDep):
+    # On the primary: clients fetch an order right after placing it, before a replica may have it.
+    order = await order_service.get_order(order_id)
+    if order.user_id != user_id:
+        raise NotEnoughRightsError("User is not the order owner")
+    return order
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, status, Depends
+import io
+from typing import Annotated
 
-from src.deps import ProductServiceDep
-from src.schemas.filtration import PaginationParams
-from src.schemas.product import ProductIn, ProductOut, ProductUpdate
+from fastapi import APIRouter, status, Depends, Response, Header, UploadFile, Query, Request
+
+from src.config import settings
+from src.custom_exceptions import NotSupportedFileTypeError
+from src.deps import (ProductServiceDep, ProductReadServiceDep, CatalogServiceDep, ProductImportServiceDep,
+                      ProductImageServiceDep)
+from src.schemas.filtration import PaginationParams, ProductFilter
+from src.schemas.product import ProductIn, ProductOut, ProductUpdate, CatalogPage, ProductImportReport
+from src.serialization import dump_products, json_list_response
+from src.service.product_import import ImportFormat
+from src.utils import etag_matches
 
 router = APIRouter(
     prefix='/products',
@@ -10,16 +19,46 @@ router = APIRouter(
 )
 
 
+def _catalog_response(page: CatalogPage, if_none_match: str | None) -> Response:
+    headers = {'ETag': page.etag, 'Cache-Control': 'no-cache'}
+    if page.next_cursor:
+        headers['X-Next-Cursor'] = page.next_cursor
+
+    if etag_matches(if_none_match, page.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    # The page is already serialized as list[ProductOut], so it is sent as is instead of being re-validated.
+    return Response(content=page.content, media_type='application/json', headers=headers)
+
+
 @router.get('', status_code=status.HTTP_200_OK, response_model=list[ProductOut])
-async def get_products(product_service: ProductServiceDep, pagination: PaginationParams = Depends()):
-    return await product_service.get_products(pagination=pagination, is_active=True)
+async def get_products(product_service: CatalogServiceDep,
+                       if_none_match: Annotated[str | None, Header()] = None,
+                       filter: ProductFilter = Depends(),
+                       pagination: PaginationParams = Depends()):
+    page = await product_service.get_catalog_page(pagination=pagination, is_active=True, filter=filter)
+    return _catalog_response(page, if_none_match)
+
+
+@router.get('/search', status_code=status.HTTP_200_OK, response_model=list[ProductOut],
+            description="Active products whose title or description contain every word of `q` as a prefix, "
+                        "best match first; page on with the X-Next-Cursor header. Only the "
+                        f"{settings.PRODUCT_SEARCH_MAX_CANDIDATES} matching products with the lowest ids are "
+                        "ranked, so a very broad query may miss better matches beyond them.")
+async def search_products(product_service: ProductReadServiceDep,
+                          q: Annotated[str, Query(min_length=1, max_length=200)],
+                          pagination: PaginationParams = Depends()):
+    products, next_cursor = await product_service.search_products(q, pagination)
+    return json_list_response(dump_products(products), next_cursor)
 
 
 @router.get('/all', status_code=status.HTTP_200_OK, response_model=list[ProductOut])
-async def get_products_admin(product_service: ProductServiceDep,
+async def get_products_admin(product_service: CatalogServiceDep,
+                             if_none_match: Annotated[str | None, Header()] = None,
+                             filter: ProductFilter = Depends(),
                              pagination: PaginationParams = Depends(),
                              is_active: bool = None):
-    return await product_service.get_products(pagination=pagination, is_active=is_active)
+    page = await product_service.get_catalog_page(pagination=pagination, is_active=is_active, filter=filter)
+    return _catalog_response(page, if_none_match)
 
 
 @router.post('', status_code=status.HTTP_201_CREATED, response_model=ProductOut)
@@ -27,6 +66,28 @@ async def create_product(product: ProductIn, product_service: ProductServiceDep)
     return await product_service.create_product(product)
 
 
+@router.post('/import', status_code=status.HTTP_200_OK, response_model=ProductImportReport)
+async def import_products(file: UploadFile,
+                          product_import_service: ProductImportServiceDep,
+                          format: ImportFormat = None):
+    # UploadFile spools to disk past a small threshold, so the feed is never held in memory as a whole.
+    if (fmt := format or (file.filename or '').rsplit('.', 1)[-1].lower()) not in ('csv', 'jsonl'):
+        raise NotSupportedFileTypeError("Only CSV and JSONL product feeds are supported")
+    text = io.TextIOWrapper(file.file, encoding='utf-8-sig', newline='')
+    return await product_import_service.import_products(text, fmt)
+
+
+@router.post('/{product_id}/images', status_code=status.HTTP_201_CREATED, response_model=ProductOut,
+             openapi_extra={'requestBody': {'required': True, 'content': {
+                 'image/*': {'schema': {'type': 'string', 'format': 'binary'}}}}})
+async def upload_product_image(product_id: int,
+                               request: Request,
+                               product_image_service: ProductImageServiceDep,
+                               content_length: Annotated[int | None, Header()] = None):
+    # The raw body is the image; reading it as a stream lets oversized or non-image uploads be cut off early.
+    return await product_image_service.add_image(product_id, request.stream(), content_length)
+
+
 @router.patch('/{product_id}', status_code=status.HTTP_200_OK, response_model=ProductOut)
 async def update_product(product_id: int, product_update: ProductUpdate, product_service: ProductServiceDep):
     return await product_service.update_product(product_id, product_update)
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, status
+from fastapi import APIRouter, status, Depends
 
-from src.schemas.order import OrderOut
+from src.schemas.filtration import PaginationParams, OrderFilter
+from src.schemas.order import OrderOut, OrderSummaryOut
 from src.schemas.user import UserOut
-from src.deps import CurrentUserDep, OrderServiceDep
+from src.serialization import dump_orders, dump_order_summaries, json_list_response
+from src.deps import CurrentUserDep, CurrentUserIdDep, OrderServiceDep
 
 router = APIRouter(
     prefix='/users',
@@ -16,5 +18,14 @@ async def get_me(user: CurrentUserDep):
 
 
 @router.get('/me/orders', response_model=list[OrderOut], status_code=status.HTTP_200_OK)
-async def get_my_orders(user: CurrentUserDep, order_service: OrderServiceDep):
-    return await order_service.get_by_user(user.id)
+async def get_my_orders(user_id: CurrentUserIdDep, order_service: OrderServiceDep):
+    return json_list_response(dump_orders(await order_service.get_by_user(user_id)))
+
+
+@router.get('/me/orders/summary', response_model=list[OrderSummaryOut], status_code=status.HTTP_200_OK)
+async def get_my_order_summaries(user_id: CurrentUserIdDep,
+                                 order_service: OrderServiceDep,
+                                 filter: OrderFilter = Depends(),
+                                 pagination: PaginationParams = Depends()):
+    orders = await order_service.get_order_summaries(filter=filter, pagination=pagination, user_id=user_id)
+    return json_list_response(dump_order_summaries(orders), order_service.get_next_cursor(orders, pagination))
@@ -7,6 +7,7 @@ class Rules(BaseSettings):
     MIN_PASSWORD_LENGTH: int = 8
     MAX_PRODUCT_TITLE_LENGTH: int = 30
     MAX_PRODUCT_DESCRIPTION_LENGTH: int = 1000
+    MAX_BULK_ORDER_STATUS_CHANGES: int = 10_000
 
 
 rules = Rules()
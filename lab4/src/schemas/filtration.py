@@ -2,14 +2,25 @@ from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel, Field
 
-from src.custom_types import OrderStatus
+from src.custom_types import OrderStatus, ProductSort
 
 
 class PaginationParams(BaseModel):
     limit: int = Field(50, gt=0, le=100)
     offset: int = Field(0, ge=0)
+    cursor: Optional[str] = Field(None, description="Opaque cursor from the X-Next-Cursor header; overrides offset")
 
 
 class OrderFilter(BaseModel):
     status: Optional[OrderStatus] = Field(None)
     created_after: Optional[datetime] = Field(None)
+    archived: Optional[bool] = Field(None, description="false keeps to the hot partitions, true to the archive")
+
+
+class ProductFilter(BaseModel):
+    min_price: Optional[float] = Field(None, ge=0)
+    max_price: Optional[float] = Field(None, ge=0)
+    min_discount: Optional[int] = Field(None, ge=0, le=100)
+    max_discount: Optional[int] = Field(None, ge=0, le=100)
+    in_stock: Optional[bool] = Field(None)
+    sort: ProductSort = Field(ProductSort.ID)
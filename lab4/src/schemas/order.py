@@ -1,8 +1,11 @@
 from datetime import datetime
+from typing import Optional
 
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer, model_validator
 
-from src.custom_types import OrderStatus
+from src.custom_types import OrderStatus, OrderStatusOutcome
+from src.rules import rules
+from src.schemas.filtration import OrderFilter
 from src.schemas.item import ItemOut, ItemIn
 
 
@@ -20,3 +23,40 @@ class OrderOut(BaseModel):
     @field_serializer('total_price')
     def convert_price_to_float(self, v: int) -> float:
         return round(v / 100, 2)
+
+
+class OrderSummaryOut(BaseModel):
+    id: int
+    status: OrderStatus
+    created_at: datetime
+    item_count: int
+    total_price: int
+
+    @field_serializer('total_price')
+    def convert_price_to_float(self, v: int) -> float:
+        return round(v / 100, 2)
+
+
+class OrderStatusChangeIn(BaseModel):
+    """Either explicit `ids` or a `filter`; a filter moves at most `limit` of the matching orders per call."""
+    status: OrderStatus
+    ids: Optional[list[int]] = Field(None, min_length=1, max_length=rules.MAX_BULK_ORDER_STATUS_CHANGES)
+    filter: Optional[OrderFilter] = None
+    limit: int = Field(1000, gt=0, le=rules.MAX_BULK_ORDER_STATUS_CHANGES)
+
+    @model_validator(mode='after')
+    def check_ids_or_filter(self):
+        if (self.ids is None) == (self.filter is None):
+            raise ValueError("Exactly one of ids and filter must be given")
+        return self
+
+
+class OrderStatusChangeResult(BaseModel):
+    id: int
+    outcome: OrderStatusOutcome
+    status: Optional[OrderStatus]
+
+
+class OrderStatusChangeOut(BaseModel):
+    updated: int
+    results: list[OrderStatusChangeResult]
@@ -48,3 +48,35 @@ class ProductUpdate(ObjUpdate):
     @field_serializer('full_price')
     def convert_price_to_int(self, v: float) -> int:
         return v and int(v * 100)
+
+
+class CatalogPage(BaseModel):
+    content: bytes
+    etag: str
+    next_cursor: Optional[str] = None
+
+
+class ProductImportRow(ProductIn):
+    id: Optional[int] = Field(default=None, gt=0)
+
+
+class ImportRowError(BaseModel):
+    line: int
+    detail: str
+
+
+class ImportChunkReport(BaseModel):
+    chunk: int
+    first_line: int
+    last_line: int
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list[ImportRowError] = []
+
+
+class ProductImportReport(BaseModel):
+    inserted: int = 0
+    updated: int = 0
+    failed: int = 0
+    chunks: list[ImportChunkReport] = []
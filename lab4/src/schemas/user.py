@@ -1,7 +1,6 @@
-from pydantic import BaseModel, EmailStr, field_validator, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
 
 from src.rules import rules
-from src.utils import hash_pass
 
 
 class UserIn(BaseModel):
@@ -9,13 +8,17 @@ class UserIn(BaseModel):
     password: str = Field(min_length=rules.MIN_PASSWORD_LENGTH)
     name: str = Field(min_length=rules.MIN_USERNAME_LENGTH, max_length=rules.MAX_USERNAME_LENGTH)
 
-    @field_validator('password', mode='after')
-    @classmethod
-    def hash_password(cls, password) -> str:
-        return hash_pass(password)
-
 
 class UserOut(BaseModel):
     id: int
     email: EmailStr
     name: str
+
+
+class CurrentUser(BaseModel):
+    model_config = ConfigDict(from_attributes=True, frozen=True)
+
+    id: int
+    email: EmailStr
+    name: str
+    is_admin: bool
@@ -0,0 +1,67 @@
+"""
+Fast path for large list responses: rows are turned into plain dicts by encoders compiled once per schema and
+encoded with orjson, skipping pydantic validation. The output is byte-identical to dumping the same rows through
+the schema's TypeAdapter; tests/serialization_test.py keeps the two in lockstep.
+"""
+import operator
+from typing import Any, Callable, Iterable
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from src.config import settings
+from src.schemas.item import ItemOut
+from src.schemas.order import OrderOut, OrderSummaryOut
+from src.schemas.product import ProductOut
+
+
+def compile_row_encoder(model: type[BaseModel], **fields: Callable[[Any], Any]) -> Callable[[Any], dict]:
+    """Builds `row -> dict` with the keys in `model`'s field order; `fields` override how a value is computed."""
+    if unknown := set(fields) - set(model.model_fields):
+        raise TypeError(f"{model.__name__} has no fields {sorted(unknown)}")
+    getters = tuple((name, fields.get(name) or operator.attrgetter(name)) for name in model.model_fields)
+
+    def encode(row) -> dict:
+        return {name: get(row) for name, get in getters}
+
+    return encode
+
+
+def _price(value: int) -> float:
+    return round(value / 100, 2)
+
+
+_item_row = compile_row_encoder(ItemOut, total_price=lambda item: _price(item.total_price))
+
+_product_row = compile_row_encoder(
+    ProductOut,
+    final_price=lambda product: _price(product.final_price),
+    full_price=lambda product: _price(product.full_price),
+    images=lambda product: [f"{settings.IMAGES_BASE_URL}{product.id}/{filename}" for filename in product.images],
+)
+
+_order_row = compile_row_encoder(
+    OrderOut,
+    total_price=lambda order: _price(order.total_price),
+    items=lambda order: [_item_row(item) for item in order.items],
+)
+
+_order_summary_row = compile_row_encoder(OrderSummaryOut, total_price=lambda row: _price(row.total_price))
+
+
+def dump_products(products: Iterable) -> bytes:
+    return orjson.dumps([_product_row(product) for product in products])
+
+
+def dump_orders(orders: Iterable) -> bytes:
+    return orjson.dumps([_order_row(order) for order in orders])
+
+
+def dump_order_summaries(rows: Iterable) -> bytes:
+    return orjson.dumps([_order_summary_row(row) for row in rows])
+
+
+def json_list_response(content: bytes, next_cursor: str | None = None) -> Response:
+    headers = {'X-Next-Cursor': next_cursor} if next_cursor else None
+    return Response(content=content, media_type='application/json', headers=headers)
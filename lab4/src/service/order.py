@@ -1,37 +1,47 @@
-from src.crud import OrderCRUD, CartItemCRUD, ProductCRUD
+from src.crud import OrderCRUD, CartItemCRUD, ProductCRUD, OutboxCRUD
 from src.custom_exceptions import ResourceDoesNotExistError, InsufficientStockError, NotEnoughRightsError, \
     InvalidOrderStatusError
-from src.custom_types import OrderStatus
+from src.custom_types import OrderStatus, OutboxTopic, OrderStatusOutcome
 from src.db.models import Order
 from src.schemas.cart import Cart
+from src.schemas.order import OrderStatusChangeIn, OrderStatusChangeOut, OrderStatusChangeResult
+from src.service.product import mark_catalog_changed
+
+# Target status -> statuses fulfilment may move an order to it from. Cancelling restores stock and releases
+# the payment, so it only happens through `cancel_order`.
+FULFILMENT_TRANSITIONS = {
+    OrderStatus.CONFIRMED: [OrderStatus.PENDING],
+    OrderStatus.SHIPPED: [OrderStatus.CONFIRMED],
+    OrderStatus.DELIVERED: [OrderStatus.SHIPPED],
+}
 
 
 class OrderService:
-    def __init__(self, order_crud: OrderCRUD, cart_item_crud: CartItemCRUD, product_crud: ProductCRUD):
+    def __init__(self, order_crud: OrderCRUD, cart_item_crud: CartItemCRUD, product_crud: ProductCRUD,
+                 outbox_crud: OutboxCRUD):
         self.order_crud = order_crud
         self.cart_item_crud = cart_item_crud
         self.product_crud = product_crud
+        self.outbox_crud = outbox_crud
 
     async def create_order(self, user_id: int, cart: Cart):
-        product_ids = list(map(lambda i: i.product_id, cart.items))
-        products = {product.id: product for product in (await self.product_crud.get_all(product_ids, for_update=True))}
-
-        for item in cart.items:
-            product = products.get(item.product_id, None)
-
-            if product is None:
-                raise ResourceDoesNotExistError(f"Product with id {item.product_id} does not exist")
-
-            if product.quantity < item.quantity:
-                raise InsufficientStockError(f"Insufficient stock for product ID {item.product_id}")
-
-            product.quantity -= item.quantity
-
-        order = await self.order_crud.create(Order(
-            items=cart.items,
-            user_id=user_id
-        ))
-
+        updated = await self.product_crud.decrement_stock({item.product_id: item.quantity for item in cart.items})
+        # The bulk stock UPDATE skips the Product mapper events, and in_stock catalog pages depend on it.
+        mark_catalog_changed(self.product_crud.db.sync_session)
+
+        if len(updated) != len(cart.items):
+            # Nothing is committed when this raises, so the partial decrement is rolled back with the request.
+            failed_id = next(item.product_id for item in cart.items if item.product_id not in updated)
+
+            if await self.product_crud.get(failed_id, on_not_found='return-none') is None:
+                raise ResourceDoesNotExistError(f"Product with id {failed_id} does not exist")
+            raise InsufficientStockError(f"Insufficient stock for product ID {failed_id}")
+
+        order = await self.order_crud.create_with_items(user_id, cart.items)
+        # Payment capture and the confirmation email run from the outbox once this transaction commits.
+        payload = {'order_id': order.id, 'user_id': user_id, 'amount': order.total_price}
+        await self.outbox_crud.add([(OutboxTopic.PAYMENT_CAPTURE, payload),
+                                    (OutboxTopic.ORDER_CONFIRMATION_EMAIL, payload)])
         return order
 
     async def cancel_order(self, order_id: int):
@@ -40,20 +50,36 @@ class OrderService:
         if order.status != OrderStatus.PENDING:
             raise InvalidOrderStatusError("Order cannot be cancelled")
 
-        product_ids = list(map(lambda i: i.product_id, order.items))
-        products = {product.id: product for product in (await self.product_crud.get_all(product_ids, for_update=True))}
-        for item in order.items:
-            products[item.product_id].quantity += item.quantity
+        await self.product_crud.increment_stock({item.product_id: item.quantity for item in order.items})
+        mark_catalog_changed(self.product_crud.db.sync_session)
 
         order.status = OrderStatus.CANCELLED
+        payload = {'order_id': order.id, 'user_id': order.user_id, 'amount': order.total_price}
+        await self.outbox_crud.add([(OutboxTopic.PAYMENT_RELEASE, payload),
+                                    (OutboxTopic.ORDER_CANCELLATION_EMAIL, payload)])
+
+    async def change_statuses(self, change: OrderStatusChangeIn) -> OrderStatusChangeOut:
+        if (allowed_from := FULFILMENT_TRANSITIONS.get(change.status)) is None:
+            raise InvalidOrderStatusError(f"Orders cannot be moved to {change.status.value} in bulk")
+
+        if change.ids is None:
+            ids = await self.order_crud.change_status_matching(change.filter, change.status, allowed_from,
+                                                               change.limit)
+            results = [OrderStatusChangeResult(id=order_id, outcome=OrderStatusOutcome.UPDATED, status=change.status)
+                       for order_id in ids]
+        else:
+            rows = await self.order_crud.change_status(change.ids, change.status, allowed_from)
+            results = [_status_change_result(order_id, previous, updated, change.status)
+                       for order_id, previous, updated in rows]
+
+        updated = sum(result.outcome == OrderStatusOutcome.UPDATED for result in results)
+        return OrderStatusChangeOut(updated=updated, results=results)
 
     async def withdraw_order(self, order_id: int):
         order = await self.order_crud.get(order_id)
 
-        product_ids = list(map(lambda i: i.product_id, order.items))
-        products = {product.id: product for product in (await self.product_crud.get_all(product_ids, for_update=True))}
-        for item in order.items:
-            products[item.product_id].quantity += item.quantity
+        await self.product_crud.increment_stock({item.product_id: item.quantity for item in order.items})
+        mark_catalog_changed(self.product_crud.db.sync_session)
         return await self.order_crud.delete(order_id)
 
     async def get_order(self, order_id: int):
@@ -62,5 +88,24 @@ class OrderService:
     async def get_orders(self, filter=None, pagination=None):
         return await self.order_crud.get_all(filter=filter, pagination=pagination)
 
+    async def get_order_summaries(self, filter=None, pagination=None, user_id: int = None):
+        return await self.order_crud.get_summaries(filter=filter, pagination=pagination, user_id=user_id)
+
+    def get_next_cursor(self, orders: list[Order], pagination=None) -> str | None:
+        return self.order_crud.next_cursor(orders, pagination)
+
     async def get_by_user(self, user_id: int):
         return await self.order_crud.get_by_user(user_id)
+
+
+def _status_change_result(order_id: int, previous: OrderStatus | None, updated: bool,
+                          target: OrderStatus) -> OrderStatusChangeResult:
+    if previous is None:
+        outcome, status = OrderStatusOutcome.NOT_FOUND, None
+    elif updated:
+        outcome, status = OrderStatusOutcome.UPDATED, target
+    elif previous == target:
+        outcome, status = OrderStatusOutcome.UNCHANGED, previous
+    else:
+        outcome, status = OrderStatusOutcome.INVALID_TRANSITION, previous
+    return OrderStatusChangeResult(id=order_id, outcome=outcome, status=status)
@@ -0,0 +1,70 @@
+import asyncio
+from datetime import datetime, timedelta, UTC
+
+from src.crud import OrderCRUD
+from src.db import partitions
+from src.db.db import SessionLocal
+from src.logger import logger
+
+
+class OrderArchiver:
+    """
+    Keeps the order partitions ahead of time and moves delivered and cancelled orders older than the retention
+    window to the cold tier, one short transaction per bounded batch. Hot monthly partitions left empty behind
+    the window are dropped, so the hot tier stays a few months of recent orders.
+    """
+
+    def __init__(self, interval_seconds: float, retention_days: int, months_ahead: int, batch_size: int,
+                 session_factory=SessionLocal):
+        self.interval_seconds = interval_seconds
+        self.retention_days = retention_days
+        self.months_ahead = months_ahead
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+
+    async def maintain(self, now: datetime = None) -> int:
+        now = now or datetime.now(UTC).replace(tzinfo=None)
+        cutoff = now - timedelta(days=self.retention_days)
+
+        async with self.session_factory() as db:
+            if not await partitions.lock_partition_maintenance(db):
+                return 0
+            oldest = await OrderCRUD(db).oldest_active_created_at()
+            # Cold partitions are created before any order is moved into their range; one created after its rows
+            # had landed in the default partition would fail.
+            years = list(range(oldest.year, cutoff.year + 1)) if oldest is not None and oldest < cutoff else []
+            current = partitions.month_start(now)
+            months = [partitions.add_months(current, i) for i in range(self.months_ahead + 1)]
+            if created := await partitions.ensure_partitions(db, months, years):
+                logger.info(f"Order archiver created partitions {', '.join(created)}")
+            await db.commit()
+
+        archived = 0
+        while True:
+            async with self.session_factory() as db:
+                batch = await OrderCRUD(db).archive(cutoff, self.batch_size)
+                await db.commit()
+            archived += batch
+            if batch < self.batch_size:
+                break
+            # Let request handlers run between batches.
+            await asyncio.sleep(0)
+
+        async with self.session_factory() as db:
+            if await partitions.lock_partition_maintenance(db):
+                expired = [month for month in await partitions.hot_months(db)
+                           if partitions.add_months(month, 1) <= cutoff]
+                for month in expired:
+                    if await partitions.drop_hot_month_if_empty(db, month):
+                        logger.info(f"Order archiver dropped the empty hot partitions of {month:%Y-%m}")
+                await db.commit()
+        return archived
+
+    async def run(self):
+        while True:
+            try:
+                if archived := await self.maintain():
+                    logger.info(f"Order archiver moved {archived} finished orders to the cold partitions")
+            except Exception:
+                logger.exception("Order archiving failed")
+            await asyncio.sleep(self.interval_seconds)
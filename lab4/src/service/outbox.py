@@ -0,0 +1,131 @@
+import asyncio
+import math
+import random
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime, timedelta, UTC
+
+from src.config import settings
+from src.crud import OutboxCRUD
+from src.db.db import SessionLocal
+from src.db.models import OutboxEvent
+from src.logger import logger
+
+
+class OutboxHandler(ABC):
+    @abstractmethod
+    async def handle(self, event: OutboxEvent):
+        """
+        Runs the side effect of one event; raising schedules a retry. Delivery is at least once, so a handler
+        must be idempotent per `event.id`, e.g. by passing it to the downstream as the idempotency key.
+        """
+
+
+class StubOutboxHandler(OutboxHandler):
+    """Offline stand-in for the payment gateway and mailer: logs and remembers the events it was given."""
+
+    def __init__(self, delay_seconds: float = 0, history_size: int = 1000):
+        self.delay_seconds = delay_seconds
+        self.handled: deque[tuple[str, dict]] = deque(maxlen=history_size)
+
+    async def handle(self, event: OutboxEvent):
+        if self.delay_seconds:
+            await asyncio.sleep(self.delay_seconds)
+        logger.info(f"Outbox stub handled {event.topic} #{event.id}: {event.payload}")
+        self.handled.append((event.topic, event.payload))
+
+
+class OutboxWorker:
+    """
+    Drains the outbox with `workers` concurrent loops. Each loop claims a batch in its own short transaction,
+    runs the handlers with at most `concurrency` of them in flight across the pool, then settles the whole
+    batch in one more transaction: handled events are deleted, failed ones are retried with jittered
+    exponential backoff until `max_attempts`, after which they are parked with `failed_at` set.
+    """
+
+    def __init__(self, handler: OutboxHandler, *,
+                 session_factory=SessionLocal,
+                 workers: int = settings.OUTBOX_WORKERS,
+                 batch_size: int = settings.OUTBOX_BATCH_SIZE,
+                 concurrency: int = settings.OUTBOX_MAX_CONCURRENCY,
+                 poll_interval_seconds: float = settings.OUTBOX_POLL_INTERVAL_SECONDS,
+                 handler_timeout_seconds: float = settings.OUTBOX_HANDLER_TIMEOUT_SECONDS,
+                 max_attempts: int = settings.OUTBOX_MAX_ATTEMPTS,
+                 retry_base_seconds: float = settings.OUTBOX_RETRY_BASE_SECONDS,
+                 retry_max_seconds: float = settings.OUTBOX_RETRY_MAX_SECONDS):
+        self.handler = handler
+        self.session_factory = session_factory
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval_seconds = poll_interval_seconds
+        self.handler_timeout_seconds = handler_timeout_seconds
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Long enough for every claimed event of the pool to queue for the semaphore and then time out.
+        self.lease = timedelta(seconds=handler_timeout_seconds * (math.ceil(batch_size * workers / concurrency) + 1))
+
+    async def run(self):
+        await asyncio.gather(*(self._work() for _ in range(self.workers)))
+
+    async def _work(self):
+        while True:
+            try:
+                claimed = await self.process_batch()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval_seconds)
+
+    async def process_batch(self) -> int:
+        now = _utcnow()
+        async with self.session_factory() as db:
+            events = await OutboxCRUD(db).claim(self.batch_size, now, now + self.lease)
+            await db.commit()
+        if not events:
+            return 0
+
+        errors = await asyncio.gather(*(self._handle(event) for event in events))
+
+        now = _utcnow()
+        async with self.session_factory() as db:
+            outbox_crud = OutboxCRUD(db)
+            if handled := [event.id for event, error in zip(events, errors) if error is None]:
+                await outbox_crud.complete(handled)
+            for event, error in zip(events, errors):
+                if error is None:
+                    continue
+                if event.attempts >= self.max_attempts:
+                    logger.error(f"Outbox event {event.topic} #{event.id} failed for good: {error}")
+                    await outbox_crud.fail(event.id, now, error)
+                else:
+                    await outbox_crud.reschedule(event.id, now + self._backoff(event.attempts), error)
+            await db.commit()
+        return len(events)
+
+    async def _handle(self, event: OutboxEvent) -> str | None:
+        async with self._semaphore:
+            try:
+                await asyncio.wait_for(self.handler.handle(event), self.handler_timeout_seconds)
+                return None
+            except Exception as e:
+                logger.warning(f"Outbox event {event.topic} #{event.id} attempt {event.attempts} failed: {e!r}")
+                return f"{type(e).__name__}: {e}"[:1000]
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+        return timedelta(seconds=delay * random.uniform(0.5, 1))
+
+
+outbox_handler: OutboxHandler = StubOutboxHandler()
+
+
+def set_outbox_handler(handler: OutboxHandler):
+    global outbox_handler
+    outbox_handler = handler
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
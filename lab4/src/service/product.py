@@ -1,15 +1,72 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from src.cache import TTLCache
+from src.config import settings
 from src.crud import ProductCRUD
 from src.db.models import Product
-from src.schemas.filtration import PaginationParams
-from src.schemas.product import ProductUpdate, ProductIn
+from src.schemas.filtration import PaginationParams, ProductFilter
+from src.schemas.product import ProductUpdate, ProductIn, CatalogPage
+from src.serialization import dump_products
+from src.utils import make_etag
+
+catalog_cache = TTLCache('catalog', settings.CATALOG_CACHE_MAX_SIZE, settings.CATALOG_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Product, 'after_insert')
+@event.listens_for(Product, 'after_update')
+@event.listens_for(Product, 'after_delete')
+def _on_product_changed(_mapper, _connection, product: Product):
+    mark_catalog_changed(object_session(product))
+
+
+def mark_catalog_changed(session: Session):
+    session.info['catalog_changed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_catalog_cache(session: Session):
+    # Invalidating only once the change is visible keeps concurrent readers from re-caching the old rows.
+    if session.info.pop('catalog_changed', False):
+        catalog_cache.clear()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_change(session: Session):
+    session.info.pop('catalog_changed', None)
 
 
 class ProductService:
     def __init__(self, product_crud: ProductCRUD):
         self.product_crud = product_crud
 
-    async def get_products(self, pagination: PaginationParams = None, is_active: bool = None):
-        return await self.product_crud.get_all(pagination=pagination, is_active=is_active)
+    async def get_products(self, pagination: PaginationParams = None, is_active: bool = None,
+                           filter: ProductFilter = None):
+        return await self.product_crud.get_all(pagination=pagination, is_active=is_active, filter=filter)
+
+    async def get_catalog_page(self, pagination: PaginationParams, is_active: bool = None,
+                               filter: ProductFilter = None) -> CatalogPage:
+        filter = filter or ProductFilter()
+        key = (is_active, tuple(filter.model_dump().values()),
+               pagination.limit, None if pagination.cursor else pagination.offset, pagination.cursor)
+        if (page := catalog_cache.get(key)) is None:
+            version = catalog_cache.version
+            products = await self.get_products(pagination=pagination, is_active=is_active, filter=filter)
+            content = dump_products(products)
+            page = CatalogPage(content=content,
+                               etag=make_etag(content),
+                               next_cursor=self.get_next_cursor(products, pagination, filter))
+            if catalog_cache.version == version:
+                catalog_cache.set(key, page)
+        return page
+
+    async def search_products(self, query: str, pagination: PaginationParams) -> tuple[list[Product], str | None]:
+        rows = await self.product_crud.search(query, pagination, settings.PRODUCT_SEARCH_MAX_CANDIDATES)
+        return [row[0] for row in rows], self.product_crud.next_search_cursor(rows, pagination)
+
+    def get_next_cursor(self, products: list[Product], pagination: PaginationParams = None,
+                        filter: ProductFilter = None) -> str | None:
+        return self.product_crud.next_cursor(products, pagination, filter)
 
     async def create_product(self, product: ProductIn):
         return await self.product_crud.create(Product(
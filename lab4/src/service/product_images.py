@@ -0,0 +1,116 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import AsyncIterator
+
+import anyio.to_thread
+
+from src.config import settings
+from src.crud import ProductCRUD
+from src.custom_exceptions import FileTooLargeError, NotSupportedFileTypeError
+from src.db.models import Product
+from src.imaging import sniff_image_type, render_variants, SNIFF_BYTES
+
+_image_executor: ProcessPoolExecutor | None = None
+
+
+def _get_image_executor() -> ProcessPoolExecutor:
+    # Decoding and resizing hold the GIL, so they run in worker processes; spawned ones never inherit
+    # the event loop's threads or open connections.
+    global _image_executor
+    if _image_executor is None:
+        _image_executor = ProcessPoolExecutor(max_workers=settings.IMAGE_PROCESS_WORKERS,
+                                              mp_context=multiprocessing.get_context('spawn'))
+    return _image_executor
+
+
+def shutdown_image_executor():
+    global _image_executor
+    if _image_executor is not None:
+        _image_executor.shutdown(cancel_futures=True)
+        _image_executor = None
+
+
+def image_path(filename: str) -> Path:
+    """Content-addressed location of a stored file: fanned out by the first two hex digits of its hash."""
+    return Path(settings.IMAGES_DIR) / filename[:2] / filename
+
+
+class ProductImageService:
+    def __init__(self, product_crud: ProductCRUD):
+        self.product_crud = product_crud
+
+    async def add_image(self, product_id: int, chunks: AsyncIterator[bytes], content_length: int | None) -> Product:
+        if content_length is not None and content_length > settings.IMAGE_MAX_SIZE_BYTES:
+            raise FileTooLargeError(f"Images may be at most {settings.IMAGE_MAX_SIZE_BYTES} bytes")
+
+        # Checked before anything reaches the disk; ending the read transaction right after returns the
+        # connection to the pool, so a slow upload never holds one.
+        await self.product_crud.ensure_exists(product_id)
+        await self.product_crud.db.commit()
+
+        filename, upload = await _receive(chunks)
+        try:
+            path = image_path(filename)
+            if not await anyio.to_thread.run_sync(path.exists):
+                await anyio.to_thread.run_sync(partial(path.parent.mkdir, parents=True, exist_ok=True))
+                try:
+                    await asyncio.get_running_loop().run_in_executor(
+                        _get_image_executor(), render_variants, str(upload), str(path.parent), filename,
+                        settings.IMAGE_VARIANT_WIDTHS, settings.IMAGE_MAX_PIXELS)
+                except ValueError:
+                    raise NotSupportedFileTypeError("The file is not a valid image")
+                await anyio.to_thread.run_sync(os.replace, upload, path)
+        finally:
+            await anyio.to_thread.run_sync(partial(upload.unlink, missing_ok=True))
+
+        product = await self.product_crud.get(product_id)
+        if filename not in product.images:
+            product.images = [*product.images, filename]
+            await self.product_crud.db.flush()
+            await self.product_crud.db.refresh(product)
+        return product
+
+
+async def _receive(chunks: AsyncIterator[bytes]) -> tuple[str, Path]:
+    """
+    Streams the body into a temporary file, hashing it on the way. Gives up as soon as the size limit is
+    crossed or the first bytes do not belong to an accepted format, without reading the rest.
+    """
+    fd, name = await anyio.to_thread.run_sync(_create_upload_file)
+    upload = Path(name)
+
+    digest, size, header, extension = hashlib.sha256(), 0, b'', None
+    # Every disk write runs in a worker thread; only hashing and the checks stay on the event loop.
+    file = os.fdopen(fd, 'wb')
+    try:
+        try:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > settings.IMAGE_MAX_SIZE_BYTES:
+                    raise FileTooLargeError(f"Images may be at most {settings.IMAGE_MAX_SIZE_BYTES} bytes")
+                if extension is None:
+                    header += chunk[:SNIFF_BYTES - len(header)]
+                    if len(header) == SNIFF_BYTES and (extension := sniff_image_type(header)) is None:
+                        raise NotSupportedFileTypeError("Only JPEG, PNG, GIF and WebP images are supported")
+                digest.update(chunk)
+                await anyio.to_thread.run_sync(file.write, chunk)
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+        if extension is None and (extension := sniff_image_type(header)) is None:
+            raise NotSupportedFileTypeError("Only JPEG, PNG, GIF and WebP images are supported")
+    except BaseException:
+        await anyio.to_thread.run_sync(partial(upload.unlink, missing_ok=True))
+        raise
+    return f"{digest.hexdigest()}.{extension}", upload
+
+
+def _create_upload_file() -> tuple[int, str]:
+    upload_dir = Path(settings.IMAGES_DIR) / 'tmp'
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    return tempfile.mkstemp(dir=upload_dir)
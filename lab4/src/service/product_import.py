@@ -0,0 +1,117 @@
+import asyncio
+import csv
+import json
+from itertools import islice, count
+from typing import Iterator, Literal, TextIO
+
+from pydantic import ValidationError
+from sqlalchemy.exc import DBAPIError
+from asyncpg import PostgresError
+
+from src.config import settings
+from src.crud import ProductCRUD
+from src.logger import logger
+from src.schemas.product import ProductImportRow, ImportRowError, ImportChunkReport, ProductImportReport
+from src.service.product import mark_catalog_changed
+
+ImportFormat = Literal['csv', 'jsonl']
+
+
+class ProductImportService:
+    def __init__(self, product_crud: ProductCRUD):
+        self.product_crud = product_crud
+
+    async def import_products(self, file: TextIO, fmt: ImportFormat) -> ProductImportReport:
+        """
+        Streams rows from the file in chunks of PRODUCT_IMPORT_CHUNK_SIZE. Each chunk is validated against the
+        ProductIn rules off the event loop and merged in its own savepoint, so a failing chunk is reported
+        without discarding the others and only one chunk is held in memory at a time.
+        """
+        report = ProductImportReport()
+        rows = _read_rows(file, fmt)
+        await self.product_crud.prepare_import()
+        mark_catalog_changed(self.product_crud.db.sync_session)
+
+        for number in count(1):
+            chunk = await asyncio.to_thread(_validate_chunk, number, rows, settings.PRODUCT_IMPORT_CHUNK_SIZE)
+            if chunk is None:
+                break
+            chunk_report, records = chunk
+
+            if records:
+                try:
+                    async with self.product_crud.db.begin_nested():
+                        inserted, updated, missing_lines = await self.product_crud.import_chunk(records)
+                except (DBAPIError, PostgresError) as e:
+                    logger.error(f"Product import chunk {number} failed: {e}")
+                    chunk_report.failed += len(records)
+                    _add_error(chunk_report, ImportRowError(line=chunk_report.first_line,
+                                                            detail=f"Chunk rejected by the database: {e}"))
+                else:
+                    chunk_report.inserted, chunk_report.updated = inserted, updated
+                    chunk_report.failed += len(missing_lines)
+                    for line in missing_lines:
+                        _add_error(chunk_report, ImportRowError(line=line, detail="Product with the given id "
+                                                                                  "does not exist"))
+
+            report.inserted += chunk_report.inserted
+            report.updated += chunk_report.updated
+            report.failed += chunk_report.failed
+            report.chunks.append(chunk_report)
+
+        return report
+
+
+def _read_rows(file: TextIO, fmt: ImportFormat) -> Iterator[tuple[int, dict | str]]:
+    """Yields (line, row) pairs, where row is a dict of raw values or an error message for unparsable lines."""
+    if fmt == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for line, text in enumerate(file, start=1):
+        if not text.strip():
+            continue
+        try:
+            row = json.loads(text)
+        except json.JSONDecodeError as e:
+            yield line, f"Invalid JSON: {e.msg}"
+            continue
+        yield line, row if isinstance(row, dict) else "Expected a JSON object"
+
+
+def _validate_chunk(number: int,
+                    rows: Iterator[tuple[int, dict | str]],
+                    size: int) -> tuple[ImportChunkReport, list[tuple]] | None:
+    try:
+        batch = list(islice(rows, size))
+    except (csv.Error, UnicodeDecodeError) as e:
+        return ImportChunkReport(chunk=number, first_line=0, last_line=0, failed=1,
+                                 errors=[ImportRowError(line=0, detail=f"Unreadable input: {e}")]), []
+    if not batch:
+        return None
+
+    report = ImportChunkReport(chunk=number, first_line=batch[0][0], last_line=batch[-1][0])
+    records = []
+    for line, row in batch:
+        if isinstance(row, str):
+            report.failed += 1
+            _add_error(report, ImportRowError(line=line, detail=row))
+            continue
+        try:
+            product = ProductImportRow.model_validate({k: v for k, v in row.items() if v not in ('', None)})
+        except ValidationError as e:
+            report.failed += 1
+            _add_error(report, ImportRowError(line=line, detail='; '.join(
+                f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in e.errors())))
+            continue
+        data = product.model_dump()
+        records.append((line, data['id'], data['title'], data['description'], data['full_price'], data['quantity']))
+
+    return report, records
+
+
+def _add_error(report: ImportChunkReport, error: ImportRowError):
+    if len(report.errors) < settings.PRODUCT_IMPORT_MAX_ERRORS_PER_CHUNK:
+        report.errors.append(error)
@@ -1,29 +1,30 @@
-from src.crud import RefreshTokenCRUD, RecoveryTokenCRUD
+from datetime import datetime
+
+from src.service.token_store import TokenStore
 
 
 class TokenService:
-    def __init__(self, refresh_token_crud: RefreshTokenCRUD, recovery_token_crud: RecoveryTokenCRUD):
-        self.refresh_token_crud = refresh_token_crud
-        self.recovery_token_crud = recovery_token_crud
+    def __init__(self, refresh_tokens: TokenStore, recovery_tokens: TokenStore):
+        self.refresh_tokens = refresh_tokens
+        self.recovery_tokens = recovery_tokens
+
+    async def upsert_refresh_token(self, user_id: int, token: str, expires_at: datetime):
+        await self.refresh_tokens.save(user_id, token, expires_at)
 
-    async def upsert_refresh_token(self, user_id: int, token: str):
-        await self.refresh_token_crud.upsert(user_id, token)
+    async def upsert_recovery_token(self, user_id: int, token: str, expires_at: datetime):
+        await self.recovery_tokens.save(user_id, token, expires_at)
 
-    async def upsert_recovery_token(self, user_id: int, token: str):
-        await self.recovery_token_crud.upsert(user_id, token)
+    async def rotate_refresh_token(self, user_id: int, token: str, new_token: str, expires_at: datetime) -> bool:
+        return await self.refresh_tokens.rotate(user_id, token, new_token, expires_at)
 
     async def revoke_refresh_token(self, user_id: int):
-        await self.refresh_token_crud.delete(user_id)
+        await self.refresh_tokens.revoke(user_id)
 
     async def revoke_recovery_token(self, user_id: int):
-        await self.recovery_token_crud.delete(user_id)
+        await self.recovery_tokens.revoke(user_id)
 
     async def is_recovery_token_valid(self, user_id: int, token: str) -> bool:
-        db_token = await self.recovery_token_crud.get(user_id, on_not_found='return-none')
-
-        return db_token and db_token.token == token
+        return await self.recovery_tokens.is_valid(user_id, token)
 
     async def is_refresh_token_valid(self, user_id: int, token: str) -> bool:
-        db_token = await self.refresh_token_crud.get(user_id, on_not_found='return-none')
-
-        return db_token and db_token.token == token
+        return await self.refresh_tokens.is_valid(user_id, token)
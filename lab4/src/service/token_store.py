@@ -0,0 +1,158 @@
+import asyncio
+import hashlib
+import heapq
+import hmac
+from abc import ABC, abstractmethod
+from datetime import datetime, UTC
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.config import settings
+from src.crud import RefreshTokenCRUD, RecoveryTokenCRUD
+from src.crud.tokens import TokenCRUD
+from src.db.db import SessionLocal
+from src.logger import logger
+
+
+class TokenStore(ABC):
+    """
+    One token per user, kept only as a SHA-256 digest next to its expiry. Expired tokens are never valid,
+    whether or not the sweeper has removed them yet.
+    """
+
+    @abstractmethod
+    async def save(self, user_id: int, token: str, expires_at: datetime):
+        ...
+
+    @abstractmethod
+    async def is_valid(self, user_id: int, token: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def rotate(self, user_id: int, token: str, new_token: str, expires_at: datetime) -> bool:
+        """Replaces `token` with `new_token` if it is the user's current, unexpired one."""
+
+    @abstractmethod
+    async def revoke(self, user_id: int):
+        ...
+
+    @abstractmethod
+    async def delete_expired(self, limit: int) -> int:
+        """Removes at most `limit` expired tokens and returns how many were removed."""
+
+
+class SQLTokenStore(TokenStore):
+    def __init__(self, token_crud: TokenCRUD):
+        self.token_crud = token_crud
+
+    async def save(self, user_id: int, token: str, expires_at: datetime):
+        await self.token_crud.upsert(user_id, _digest(token), _naive_utc(expires_at))
+
+    async def is_valid(self, user_id: int, token: str) -> bool:
+        return await self.token_crud.exists_valid(user_id, _digest(token), _utcnow())
+
+    async def rotate(self, user_id: int, token: str, new_token: str, expires_at: datetime) -> bool:
+        return await self.token_crud.replace_valid(user_id, _digest(token), _digest(new_token),
+                                                   _naive_utc(expires_at), _utcnow())
+
+    async def revoke(self, user_id: int):
+        await self.token_crud.delete_by_user(user_id)
+
+    async def delete_expired(self, limit: int) -> int:
+        return await self.token_crud.delete_expired(_utcnow(), limit)
+
+
+class MemoryTokenStore(TokenStore):
+    """Process-local store for tests and single-worker deployments; tokens do not survive a restart."""
+
+    def __init__(self):
+        self._tokens: dict[int, tuple[bytes, datetime]] = {}
+        # (expires_at, user_id) in expiry order; entries left behind by a re-issued token are skipped when popped.
+        self._expiry_heap: list[tuple[datetime, int]] = []
+
+    async def save(self, user_id: int, token: str, expires_at: datetime):
+        expires_at = _naive_utc(expires_at)
+        self._tokens[user_id] = (_digest(token), expires_at)
+        heapq.heappush(self._expiry_heap, (expires_at, user_id))
+
+    async def is_valid(self, user_id: int, token: str) -> bool:
+        if (entry := self._tokens.get(user_id)) is None:
+            return False
+        token_hash, expires_at = entry
+        return expires_at > _utcnow() and hmac.compare_digest(token_hash, _digest(token))
+
+    async def rotate(self, user_id: int, token: str, new_token: str, expires_at: datetime) -> bool:
+        if not await self.is_valid(user_id, token):
+            return False
+        await self.save(user_id, new_token, expires_at)
+        return True
+
+    async def revoke(self, user_id: int):
+        self._tokens.pop(user_id, None)
+
+    async def delete_expired(self, limit: int) -> int:
+        now, deleted = _utcnow(), 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now and deleted < limit:
+            expires_at, user_id = heapq.heappop(self._expiry_heap)
+            if (entry := self._tokens.get(user_id)) is not None and entry[1] == expires_at:
+                del self._tokens[user_id]
+                deleted += 1
+        return deleted
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+memory_refresh_tokens = MemoryTokenStore()
+memory_recovery_tokens = MemoryTokenStore()
+
+
+def get_token_stores(db: AsyncSession) -> tuple[TokenStore, TokenStore]:
+    """The (refresh, recovery) stores of the configured backend."""
+    if settings.TOKEN_STORE_BACKEND == 'memory':
+        return memory_refresh_tokens, memory_recovery_tokens
+    return SQLTokenStore(RefreshTokenCRUD(db)), SQLTokenStore(RecoveryTokenCRUD(db))
+
+
+class TokenSweeper:
+    """Periodically deletes expired refresh and recovery tokens, one short transaction per bounded batch."""
+
+    def __init__(self, interval_seconds: float, batch_size: int, session_factory=SessionLocal):
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+
+    async def sweep(self) -> int:
+        deleted = 0
+        for store_index in range(2):
+            while True:
+                async with self.session_factory() as db:
+                    batch = await get_token_stores(db)[store_index].delete_expired(self.batch_size)
+                    await db.commit()
+                deleted += batch
+                if batch < self.batch_size:
+                    break
+                # Let request handlers run between batches.
+                await asyncio.sleep(0)
+        return deleted
+
+    async def run(self):
+        while True:
+            try:
+                if deleted := await self.sweep():
+                    logger.info(f"Token sweeper deleted {deleted} expired tokens")
+            except Exception:
+                logger.exception("Token sweep failed")
+            await asyncio.sleep(self.interval_seconds)
+
+
+def _digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(UTC).replace(tzinfo=None)
+
+
+def _naive_utc(moment: datetime) -> datetime:
+    return moment.astimezone(UTC).replace(tzinfo=None) if moment.tzinfo is not None else moment
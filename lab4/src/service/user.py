@@ -1,6 +1,36 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from src.cache import TTLCache
+from src.config import settings
 from src.crud import UserCRUD
 from src.db.models import User
-from src.schemas.user import UserIn
+from src.schemas.user import UserIn, CurrentUser
+from src.utils import hash_pass
+
+user_cache = TTLCache('current_user', settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _on_user_changed(_mapper, _connection, user: User):
+    mark_user_changed(object_session(user), user.id)
+
+
+def mark_user_changed(session: Session, user_id: int):
+    session.info.setdefault('changed_user_ids', set()).add(user_id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cached_users(session: Session):
+    # Invalidating only once the change is visible keeps concurrent requests from re-caching the old row.
+    for user_id in session.info.pop('changed_user_ids', ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_user_changes(session: Session):
+    session.info.pop('changed_user_ids', None)
 
 
 class UserService:
@@ -8,7 +38,8 @@ class UserService:
         self.user_crud = user_crud
 
     async def register_user(self, user: UserIn):
-        return await self.user_crud.create(User(**user.model_dump()))
+        return await self.user_crud.create(User(**user.model_dump(exclude={'password'}),
+                                                password=await hash_pass(user.password)))
 
     async def get_user_by_identity_provider_id(self, identity_provider_id: str):
         return await self.user_crud.get_by_idp_id(identity_provider_id)
@@ -16,5 +47,11 @@ class UserService:
     async def get_user_by_id(self, user_id: int):
         return await self.user_crud.get(user_id)
 
+    async def get_current_user(self, user_id: int) -> CurrentUser:
+        if (user := user_cache.get(user_id)) is None:
+            user = CurrentUser.model_validate(await self.user_crud.get(user_id))
+            user_cache.set(user_id, user)
+        return user
+
     async def get_user_by_email(self, email: str):
         return await self.user_crud.get_by_email(email)
@@ -1,8 +1,14 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, UTC
 
 from passlib.context import CryptContext
 from jose import JWTError, ExpiredSignatureError, jwt
 
+from src.cache import TTLCache
 from src.config import settings
 from src.custom_exceptions import InvalidTokenError
 
@@ -16,12 +22,29 @@ pwd_context = CryptContext(
 )
 
 
-def hash_pass(password: str):
-    return pwd_context.hash(password)
+# argon2-cffi releases the GIL while hashing, so threads are enough to keep the event loop free;
+# the semaphore caps in-flight hashes so login bursts queue here instead of on the executor.
+_hashing_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASHING_WORKERS, thread_name_prefix="argon2")
+_hashing_semaphore = asyncio.Semaphore(settings.PASSWORD_HASHING_MAX_CONCURRENCY
+                                       or settings.PASSWORD_HASHING_WORKERS)
 
 
-def verify_password(raw_password: str, hashed_password: str):
-    return pwd_context.verify(raw_password, hashed_password)
+async def _run_hashing(func, *args):
+    async with _hashing_semaphore:
+        return await asyncio.get_running_loop().run_in_executor(_hashing_executor, func, *args)
+
+
+async def hash_pass(password: str) -> str:
+    return await _run_hashing(pwd_context.hash, password)
+
+
+async def verify_password(raw_password: str, hashed_password: str) -> bool:
+    return await _run_hashing(pwd_context.verify, raw_password, hashed_password)
+
+
+# Verified tokens mapped to (user id, exp); only tokens with an `exp` claim are cached.
+jwt_cache = TTLCache('jwt', settings.JWT_CACHE_MAX_SIZE, settings.JWT_CACHE_TTL_SECONDS)
+_jwt_cache_lock = threading.Lock()
 
 
 def create_jwt_token(*, user_id: int, expires_in: timedelta):
@@ -33,6 +56,34 @@ def create_jwt_token(*, user_id: int, expires_in: timedelta):
 
 
 def get_user_id_from_jwt(token: str) -> int:
+    # Sync dependencies run in the threadpool, so the cache is only touched under the lock.
+    with _jwt_cache_lock:
+        cached = jwt_cache.get(token)
+    if cached is not None:
+        user_id, expires_at = cached
+        # The cache TTL runs on the monotonic clock, so `exp` is re-checked the way jose does it: whole
+        # wall-clock seconds, valid up to and including the `exp` second.
+        if int(time.time()) <= expires_at:
+            return user_id
+        raise InvalidTokenError("The token has expired", {"WWW-Authenticate": "Bearer"})
+
+    user_id, expires_at = _verify_jwt(token)
+    if expires_at is not None:
+        with _jwt_cache_lock:
+            jwt_cache.set(token, (user_id, expires_at), ttl_seconds=expires_at - time.time())
+    return user_id
+
+
+def get_cached_user_id_from_jwt(token: str) -> int | None:
+    """User id of a token that was already verified and has not expired; never verifies a signature itself."""
+    with _jwt_cache_lock:
+        cached = jwt_cache.get(token)
+    if cached is not None and int(time.time()) <= cached[1]:
+        return cached[0]
+    return None
+
+
+def _verify_jwt(token: str) -> tuple[int, float | None]:
     try:
         payload = jwt.decode(token, settings.TOKEN_SECRET_KEY, algorithms=[settings.ALGORITHM])
         user_id: str = payload.get('sub')
@@ -42,4 +93,16 @@ def get_user_id_from_jwt(token: str) -> int:
         raise InvalidTokenError("The token has expired", {"WWW-Authenticate": "Bearer"})
     except JWTError:
         raise InvalidTokenError("Could not validate the token", {"WWW-Authenticate": "Bearer {}"})
-    return int(user_id)
+    return int(user_id), payload.get('exp')
+
+
+def make_etag(content: bytes) -> str:
+    return f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(candidate.strip().removeprefix('W/') == etag for candidate in if_none_match.split(','))
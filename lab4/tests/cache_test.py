@@ -0,0 +1,45 @@
+import time
+
+from src.cache import TTLCache, caches
+
+
+def test_cache_hit_miss_and_lru_eviction():
+    cache = TTLCache("test_lru", max_size=2, ttl_seconds=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"  # 1 becomes most recently used
+
+    cache.set(3, "c")
+
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    assert cache.stats() == {
+        "size": 2, "max_size": 2, "ttl_seconds": 60, "hits": 3, "misses": 1, "evictions": 1, "version": 0
+    }
+    assert caches["test_lru"] is cache
+
+
+def test_cache_entries_expire(monkeypatch):
+    cache = TTLCache("test_ttl", max_size=10, ttl_seconds=5)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.set("short", 1, ttl_seconds=1)
+    cache.set("long", 2)
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 2)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+
+
+def test_cache_invalidate_and_clear():
+    cache = TTLCache("test_invalidate", max_size=10, ttl_seconds=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    cache.invalidate(1)
+    assert cache.get(1) is None
+
+    cache.clear()
+    assert cache.get(2) is None
+    assert cache.version == 1
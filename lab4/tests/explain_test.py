@@ -0,0 +1,203 @@
+"""
+Plan regression tests: the statements the CRUD classes emit are captured, EXPLAINed against a seeded
+dataset large enough for the planner to prefer indexes, and any sequential scan over a big table fails the test.
+"""
+import contextlib
+from datetime import datetime, UTC
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.crud import UserCRUD, ProductCRUD, CartItemCRUD, OrderCRUD
+from src.custom_types import OrderStatus, ProductSort
+from src.db import partitions
+from src.schemas.filtration import PaginationParams, OrderFilter, ProductFilter
+
+from tests.fixtures import *
+
+USERS = 10_000
+PRODUCTS = 100_000
+ORDERS = 100_000
+ITEMS_PER_ORDER = 2
+CART_ITEMS_PER_USER = 2
+
+LARGE_TABLES = {'users', 'products', 'orders', 'order_items', 'cart_items'}
+
+SEED_STATEMENTS = (
+    f"""
+    INSERT INTO users (email, name, is_admin, created_at)
+    SELECT 'explain' || g || '@example.com', 'explain' || g, false, now()
+    FROM generate_series(1, {USERS}) g
+    """,
+    f"""
+    INSERT INTO products (title, description, quantity, full_price, discount, created_at, is_active, images)
+    SELECT 'product ' || g, 'description ' || g, 1000, 100 + g % 1000, g % 50, now(), g % 10 <> 0, '[]'
+    FROM generate_series(1, {PRODUCTS}) g
+    """,
+    f"""
+    INSERT INTO orders (status, user_id, is_paid, created_at, is_archived)
+    SELECT (enum_range(NULL::orderstatus))[g % 5 + 1], u.first_id + g % {USERS}, false,
+           now() AT TIME ZONE 'UTC' - g * interval '1 minute', false
+    FROM generate_series(1, {ORDERS}) g,
+         (SELECT min(id) AS first_id FROM users WHERE email LIKE 'explain%') u
+    """,
+    f"""
+    INSERT INTO order_items (order_id, order_created_at, order_is_archived, total_price, product_id, quantity)
+    SELECT o.id, o.created_at, o.is_archived, 100, p.first_id + (o.id * {ITEMS_PER_ORDER} + k) % {PRODUCTS}, 1
+    FROM orders o,
+         generate_series(0, {ITEMS_PER_ORDER - 1}) k,
+         (SELECT min(id) AS first_id FROM products WHERE title LIKE 'product %') p
+    """,
+    f"""
+    INSERT INTO cart_items (user_id, product_id, quantity)
+    SELECT u.id, p.first_id + (u.id * 7 + k) % {PRODUCTS}, 1
+    FROM users u,
+         generate_series(0, {CART_ITEMS_PER_USER - 1}) k,
+         (SELECT min(id) AS first_id FROM products WHERE title LIKE 'product %') p
+    WHERE u.email LIKE 'explain%'
+    """,
+    f"ANALYZE {', '.join(sorted(LARGE_TABLES))}",
+)
+
+
+@pytest_asyncio.fixture(scope="module", loop_scope="session")
+async def large_db(async_engine):
+    async with async_engine.connect() as connection:
+        async with connection.begin() as transaction:
+            session = AsyncSession(connection, expire_on_commit=False)
+            # Seeded orders go back ORDERS minutes; give each of those months its hot partition.
+            current = partitions.month_start(datetime.now(UTC))
+            await partitions.ensure_partitions(session, [partitions.add_months(current, -i) for i in range(4)], [])
+            for statement in SEED_STATEMENTS:
+                await connection.execute(text(statement))
+
+            yield session
+
+            await session.close()
+            await transaction.rollback()
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def ids(large_db: AsyncSession) -> dict:
+    row = (await large_db.execute(text("""
+        SELECT (SELECT min(id) FROM users WHERE email LIKE 'explain%') AS user_id,
+               (SELECT min(id) FROM products WHERE title LIKE 'product %') AS product_id
+    """))).one()
+    return row._asdict()
+
+
+@contextlib.contextmanager
+def capture_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def _node_types(plan: dict) -> list[str]:
+    return [plan['Node Type'], *(node for child in plan.get('Plans', ()) for node in _node_types(child))]
+
+
+def _seq_scans(plan: dict, large: set[str]) -> list[str]:
+    found = []
+    if plan['Node Type'] == 'Seq Scan' and plan['Relation Name'] in large:
+        found.append(plan['Relation Name'])
+    for child in plan.get('Plans', ()):
+        found.extend(_seq_scans(child, large))
+    return found
+
+
+async def _large_relations(connection) -> set[str]:
+    """LARGE_TABLES and every non-empty partition of them; scanning an empty partition costs nothing."""
+    result = await connection.execute(text("""
+        SELECT relname
+        FROM pg_class
+        WHERE relkind = 'r' AND pg_partition_root(oid)::regclass::text = ANY(:tables)
+          AND (NOT relispartition OR reltuples > 0)
+    """), {'tables': sorted(LARGE_TABLES)})
+    return set(result.scalars())
+
+
+async def assert_no_seq_scans(db: AsyncSession, statements: list[tuple], allow_sort: bool = True):
+    assert statements, "no statements were captured"
+    connection = await db.connection()
+    large = await _large_relations(connection)
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar()[0]['Plan']
+        assert not _seq_scans(plan, large), f"sequential scan on {_seq_scans(plan, large)} in:\n{statement}"
+        assert allow_sort or 'Sort' not in _node_types(plan), f"sort instead of an ordered index scan in:\n{statement}"
+
+
+async def run_captured(async_engine, db: AsyncSession, call, allow_sort: bool = True):
+    with capture_statements(async_engine) as statements:
+        result = await call()
+    await assert_no_seq_scans(db, statements, allow_sort)
+    return result
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_explain_product_queries(async_engine, large_db, ids):
+    crud = ProductCRUD(large_db)
+    first_page_params = PaginationParams(limit=20)
+
+    await run_captured(async_engine, large_db, lambda: crud.get(ids['product_id'] + 500))
+    await run_captured(async_engine, large_db, lambda: crud.get_all(list(range(ids['product_id'], ids['product_id'] + 10))))
+    first_page = await run_captured(async_engine, large_db,
+                                    lambda: crud.get_all(pagination=first_page_params, is_active=True))
+    cursor = crud.next_cursor(first_page, first_page_params)
+    await run_captured(async_engine, large_db,
+                       lambda: crud.get_all(pagination=PaginationParams(limit=20, cursor=cursor), is_active=True))
+    await run_captured(async_engine, large_db,
+                       lambda: crud.decrement_stock({ids['product_id']: 1, ids['product_id'] + 1: 2}))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize('filter', [
+    ProductFilter(sort=ProductSort.PRICE),
+    ProductFilter(sort=ProductSort.PRICE_DESC, in_stock=True),
+    ProductFilter(sort=ProductSort.PRICE, min_price=2, max_price=3),
+    ProductFilter(sort=ProductSort.DISCOUNT_DESC, min_discount=20),
+    ProductFilter(sort=ProductSort.DISCOUNT, max_price=5, in_stock=True),
+    ProductFilter(min_price=9, max_discount=10),
+])
+@pytest.mark.parametrize('is_active', [True, None])  # the public catalog, the admin listing of every product
+async def test_explain_product_catalog_filters_and_sorts(async_engine, large_db, filter, is_active):
+    crud = ProductCRUD(large_db)
+    first_page_params = PaginationParams(limit=20)
+
+    first_page = await run_captured(async_engine, large_db, lambda: crud.get_all(
+        pagination=first_page_params, is_active=is_active, filter=filter), allow_sort=False)
+    cursor = crud.next_cursor(first_page, first_page_params, filter)
+    await run_captured(async_engine, large_db, lambda: crud.get_all(
+        pagination=PaginationParams(limit=20, cursor=cursor), is_active=is_active, filter=filter), allow_sort=False)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_explain_user_and_cart_queries(async_engine, large_db, ids):
+    await run_captured(async_engine, large_db, lambda: UserCRUD(large_db).get_by_email('explain42@example.com'))
+    await run_captured(async_engine, large_db, lambda: CartItemCRUD(large_db).get_lines(ids['user_id'] + 42))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_explain_order_queries(async_engine, large_db, ids):
+    crud = OrderCRUD(large_db)
+    user_id = ids['user_id'] + 42
+    first_page_params = PaginationParams(limit=20)
+
+    await run_captured(async_engine, large_db, lambda: crud.get_by_user(user_id))
+    first_page = await run_captured(async_engine, large_db, lambda: crud.get_all(first_page_params))
+    cursor = crud.next_cursor(first_page, first_page_params)
+    await run_captured(async_engine, large_db, lambda: crud.get_all(
+        PaginationParams(limit=20, cursor=cursor), OrderFilter(status=OrderStatus.SHIPPED)))
+    await run_captured(async_engine, large_db, lambda: crud.get_summaries(first_page_params, user_id=user_id))
+    await run_captured(async_engine, large_db, lambda: crud.get_summaries(
+        PaginationParams(limit=20, cursor=cursor), OrderFilter(status=OrderStatus.PENDING)))
@@ -4,8 +4,11 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from testcontainers.postgres import PostgresContainer
 
-from src.crud import UserCRUD, ProductCRUD, CartItemCRUD
-from src.db.models import Base
+from src.crud import UserCRUD, ProductCRUD, CartItemCRUD, OrderCRUD, OutboxCRUD
+from src.db.db_init import run_migrations
+from src.service.cart import CartService
+from src.service.order import OrderService
+from src.service.product import ProductService
 
 
 @pytest.fixture(scope="session")
@@ -19,8 +22,7 @@ async def async_engine(postgres_container):
     db_url = postgres_container.get_connection_url()
     engine = create_async_engine(db_url, echo=False)
 
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    await run_migrations(engine)
 
     yield engine
 
@@ -52,3 +54,20 @@ async def product_crud(async_session: AsyncSession) -> ProductCRUD:
 @pytest_asyncio.fixture(scope="function")
 async def cart_item_crud(async_session: AsyncSession) -> CartItemCRUD:
     return CartItemCRUD(async_session)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def cart_service(cart_item_crud: CartItemCRUD, product_crud: ProductCRUD) -> CartService:
+    return CartService(cart_item_crud, product_crud)
+
+
+@pytest_asyncio.fixture(scope="function")
+async def order_service(async_session: AsyncSession,
+                        cart_item_crud: CartItemCRUD,
+                        product_crud: ProductCRUD) -> OrderService:
+    return OrderService(OrderCRUD(async_session), cart_item_crud, product_crud, OutboxCRUD(async_session))
+
+
+@pytest_asyncio.fixture(scope="function")
+async def product_service(product_crud: ProductCRUD) -> ProductService:
+    return ProductService(product_crud)
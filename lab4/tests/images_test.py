@@ -0,0 +1,106 @@
+import hashlib
+import os
+
+import httpx
+import pytest
+
+from src.config import settings
+from src.main import app
+from src.service.product_images import image_path
+from src.static_files import ImmutableFileResponse, parse_range
+
+DATA = bytes(range(256)) * 4
+NAME = hashlib.sha256(DATA).hexdigest()
+
+
+@pytest.fixture
+def image(tmp_path, monkeypatch) -> str:
+    monkeypatch.setattr(settings, 'IMAGES_DIR', str(tmp_path))
+    path = image_path(f'{NAME}.png')
+    path.parent.mkdir()
+    path.write_bytes(DATA)
+    return f'/images/7/{NAME}.png'
+
+
+async def _get(url: str, method: str = 'GET', **headers) -> httpx.Response:
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        return await client.request(method, url, headers={k.replace('_', '-'): v for k, v in headers.items()})
+
+
+def test_parse_range():
+    assert parse_range(None, 100) is None
+    assert parse_range('bytes=10-19', 100) == (10, 20)
+    assert parse_range('bytes=90-', 100) == (90, 100)
+    assert parse_range('bytes=-30', 100) == (70, 100)
+    assert parse_range('bytes=50-500', 100) == (50, 100)
+    assert parse_range('bytes=-500', 100) == (0, 100)
+    for ignored in ('bytes=0-1,5-6', 'items=0-1', 'bytes=-', 'bytes=9-3', 'bytes=a-b'):
+        assert parse_range(ignored, 100) is None
+    for unsatisfiable in ('bytes=100-', 'bytes=-0'):
+        with pytest.raises(ValueError):
+            parse_range(unsatisfiable, 100)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_image_is_served_with_immutable_caching_and_revalidation(image):
+    response = await _get(image)
+    assert response.status_code == 200 and response.content == DATA
+    assert response.headers['content-type'] == 'image/png'
+    assert response.headers['content-length'] == str(len(DATA))
+    assert response.headers['etag'] == f'"{NAME}"'
+    assert response.headers['cache-control'] == 'public, max-age=31536000, immutable'
+
+    revalidated = await _get(image, if_none_match=f'W/"{NAME}"')
+    assert revalidated.status_code == 304 and revalidated.content == b''
+    assert revalidated.headers['etag'] == f'"{NAME}"'
+
+    head = await _get(image, 'HEAD')
+    assert head.status_code == 200 and head.headers['content-length'] == str(len(DATA))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_image_ranges(image):
+    partial = await _get(image, range='bytes=1000-')
+    assert partial.status_code == 206 and partial.content == DATA[1000:]
+    assert partial.headers['content-range'] == f'bytes 1000-1023/{len(DATA)}'
+
+    assert (await _get(image, range='bytes=-4', if_range=f'"{NAME}"')).content == DATA[-4:]
+    stale = await _get(image, range='bytes=-4', if_range='"something-else"')
+    assert stale.status_code == 200 and stale.content == DATA
+
+    unsatisfiable = await _get(image, range='bytes=5000-')
+    assert unsatisfiable.status_code == 416
+    assert unsatisfiable.headers['content-range'] == f'bytes */{len(DATA)}'
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_unknown_or_malformed_image_names_are_not_found(image):
+    assert (await _get(image.replace('.png', '.jpg'))).status_code == 404
+    assert (await _get('/images/7/..%2F..%2Fpyproject.toml')).status_code == 404
+    assert (await _get(f'/images/7/{NAME[:-1]}.png')).status_code == 404
+
+
+@pytest.mark.asyncio(loop_scope="session")
+@pytest.mark.parametrize('extension, headers, expected', [
+    ('http.response.zerocopy', [(b'range', b'bytes=2-5')], ('http.response.zerocopy', 2, 4)),
+    ('http.response.pathsend', [], ('http.response.pathsend', None, None)),
+    ('http.response.pathsend', [(b'range', b'bytes=2-5')], ('http.response.body', None, None)),
+])
+async def test_body_uses_server_zero_copy_extensions(image, extension, headers, expected):
+    path = image_path(f'{NAME}.png')
+    sent = []
+
+    async def send(message):
+        if message['type'] == 'http.response.zerocopy':
+            message = {**message, 'file': os.pread(message['file'].fileno(), message['count'], message['offset'])}
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'headers': headers, 'extensions': {extension: {}}}
+    await ImmutableFileResponse(path, len(DATA), f'"{NAME}"', 'image/png')(scope, None, send)
+
+    body = sent[1]
+    assert (body['type'], body.get('offset'), body.get('count')) == expected
+    if body['type'] == 'http.response.pathsend':
+        assert body['path'] == str(path)
+    else:
+        assert body.get('file', body.get('body')) == DATA[2:6]
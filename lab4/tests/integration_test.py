@@ -1,11 +1,31 @@
+import io
+import json
+
 import pytest
-from src.db.models import User, Product, CartItem
+from sqlalchemy import select, text
+
+from src.custom_types import ProductSort, OrderStatus, OrderStatusOutcome
+from src.db.models import User, Product, CartItem, Order
 from src.schemas.base import ObjUpdate
 from src.custom_exceptions import (
                                    ResourceAlreadyExistsError,
-                                   DependentEntityExistsError)
-from src.schemas.filtration import PaginationParams
+                                   DependentEntityExistsError,
+                                   InvalidCursorError,
+                                   ResourceDoesNotExistError,
+                                   InsufficientStockError,
+                                   InvalidOrderStatusError,
+                                   NotEnoughRightsError)
+from src.schemas.filtration import PaginationParams, ProductFilter, OrderFilter
+from src.schemas.item import ItemIn
+from src.schemas.order import OrderStatusChangeIn
+from src.schemas.product import ProductIn
+from src.schemas.user import CurrentUser
 from src.crud import UserCRUD, ProductCRUD, CartItemCRUD
+from src.service.cart import CartService
+from src.service.order import OrderService
+from src.service.product import ProductService, catalog_cache
+from src.service.product_import import ProductImportService
+from src.service.user import UserService, user_cache
 
 from tests.fixtures import *
 
@@ -48,6 +68,24 @@ async def test_user_get_by_email_found(user_crud: UserCRUD):
     assert found_user.name == "Finder"
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_current_user_cache_is_invalidated_on_update(user_crud: UserCRUD):
+    user = await user_crud.create(User(email="cached@example.com", name="Cached"))
+    user_service = UserService(user_crud)
+
+    assert (await user_service.get_current_user(user.id)).name == "Cached"
+    assert (await user_service.get_current_user(user.id)).name == "Cached"
+    assert user_cache.hits >= 1
+
+    user.name = "Renamed"
+    await user_crud.db.flush()
+    assert (await user_service.get_current_user(user.id)).name == "Cached"
+
+    await user_crud.db.commit()
+
+    assert (await user_service.get_current_user(user.id)).name == "Renamed"
+
+
 # endregion
 
 
@@ -109,6 +147,128 @@ async def test_product_get_all_with_filters(product_crud: ProductCRUD):
     assert active_products[0].title == "Z Active"
 
 
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_get_all_with_cursor_pagination(product_crud: ProductCRUD):
+    """Test that walking the catalog by cursor yields the same rows as offset pagination."""
+    for i in range(5):
+        await product_crud.create(Product(title=f"Cursor {i}", description="Desc", quantity=1, full_price=100))
+
+    by_offset = await product_crud.get_all(pagination=PaginationParams(limit=100, offset=0))
+
+    walked, pagination = [], PaginationParams(limit=2)
+    while page := await product_crud.get_all(pagination=pagination):
+        walked.extend(page)
+        if (cursor := product_crud.next_cursor(page, pagination)) is None:
+            break
+        pagination = PaginationParams(limit=2, cursor=cursor, offset=1000)
+
+    assert [p.id for p in walked] == [p.id for p in by_offset]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_get_all_filters_and_sorts_by_final_price(product_crud: ProductCRUD):
+    """Test that price/discount/stock filters apply to the discounted price and sorted cursor pages line up."""
+    for full_price, discount, quantity in [(1_000_000, 0, 1), (1_200_000, 25, 1), (1_100_000, 10, 0),
+                                           (1_300_000, 50, 1), (2_000_000, 0, 1), (1_000_000, 5, 1)]:
+        await product_crud.create(Product(title="Priced", description="Desc", quantity=quantity,
+                                          full_price=full_price, discount=discount))
+
+    walked, pagination = [], PaginationParams(limit=2)
+    filter = ProductFilter(min_price=9000, max_price=15000, in_stock=True, sort=ProductSort.PRICE_DESC)
+    while page := await product_crud.get_all(pagination=pagination, is_active=True, filter=filter):
+        walked.extend(page)
+        if (cursor := product_crud.next_cursor(page, pagination, filter)) is None:
+            break
+        pagination = PaginationParams(limit=2, cursor=cursor)
+
+    assert [(p.final_price, p.discount) for p in walked] == [(1_000_000, 0), (950_000, 5), (900_000, 25)]
+    discounted = await product_crud.get_all(is_active=True, filter=ProductFilter(min_discount=10, max_discount=50,
+                                                                                 sort=ProductSort.DISCOUNT_DESC))
+    assert [p.discount for p in discounted if p.title == "Priced"] == [50, 25, 10]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_get_all_with_malformed_cursor_raises_error(product_crud: ProductCRUD):
+    with pytest.raises(InvalidCursorError):
+        await product_crud.get_all(pagination=PaginationParams(cursor="not-a-cursor"))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_catalog_page_is_cached_until_a_product_change_commits(product_service: ProductService):
+    catalog_cache.clear()
+    await product_service.create_product(ProductIn(title="Cached", description="Desc", full_price=1.5, quantity=1))
+    pagination = PaginationParams(limit=100)
+
+    page = await product_service.get_catalog_page(pagination, is_active=True)
+    hits = catalog_cache.hits
+    assert await product_service.get_catalog_page(pagination, is_active=True) is page
+    assert catalog_cache.hits == hits + 1
+    assert json.loads(page.content)[-1]["full_price"] == 1.5
+
+    await product_service.create_product(ProductIn(title="Fresh", description="Desc", full_price=2, quantity=1))
+    await product_service.product_crud.db.commit()
+
+    page = await product_service.get_catalog_page(pagination, is_active=True)
+    assert json.loads(page.content)[-1]["title"] == "Fresh"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_import_merges_rows_and_reports_errors(product_crud: ProductCRUD):
+    existing = await product_crud.create(Product(title="Old", description="Desc", quantity=1, full_price=100))
+    feed = io.StringIO(
+        "id,title,description,full_price,quantity\n"
+        f"{existing.id},New,Desc,2.5,7\n"
+        ",Imported,Desc,1.25,3\n"
+        ",Too expensive?,Desc,-1,3\n"
+        "999999,Ghost,Desc,1,1\n"
+    )
+
+    report = await ProductImportService(product_crud).import_products(feed, 'csv')
+
+    assert (report.inserted, report.updated, report.failed) == (1, 1, 2)
+    assert sorted(error.line for error in report.chunks[0].errors) == [4, 5]
+    await product_crud.db.refresh(existing)
+    assert (existing.title, existing.full_price, existing.quantity) == ("New", 250, 7)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_search_ranks_prefix_matches_and_pages_by_cursor(product_crud: ProductCRUD,
+                                                                       product_service: ProductService):
+    in_title = await product_crud.create(Product(title="Walnut desk", description="Solid wood",
+                                                 quantity=1, full_price=100))
+    in_description = await product_crud.create(Product(title="Plain desk", description="Walnut veneer top",
+                                                       quantity=1, full_price=100))
+    in_both = await product_crud.create(Product(title="Walnut shelf", description="Walnut shelving unit",
+                                                quantity=1, full_price=100))
+    await product_crud.create(Product(title="Walnut stool", description="Hidden", quantity=1, full_price=100,
+                                      is_active=False))
+    await product_crud.create(Product(title="Oak desk", description="Solid wood", quantity=1, full_price=100))
+
+    products, cursor = await product_service.search_products("walnu", PaginationParams(limit=2))
+    assert [p.id for p in products] == [in_both.id, in_title.id]
+    products, cursor = await product_service.search_products("walnu", PaginationParams(limit=2, cursor=cursor))
+    assert [p.id for p in products] == [in_description.id]
+    assert cursor is None
+
+    products, _ = await product_service.search_products("desks walnut", PaginationParams())
+    assert {p.id for p in products} == {in_title.id, in_description.id}
+    assert await product_crud.search("&|!:*", PaginationParams()) == []
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_product_search_ranks_the_same_lowest_id_candidates_on_every_page(product_crud: ProductCRUD):
+    products = [await product_crud.create(Product(title=f"Maple {'maple ' * (i % 3)}chair", description="Chair",
+                                                  quantity=1, full_price=100)) for i in range(6)]
+    candidates = sorted(product.id for product in products)[:4]
+
+    rows = await product_crud.search("maple", PaginationParams(limit=3), max_candidates=4)
+    cursor = product_crud.next_search_cursor(rows, PaginationParams(limit=3))
+    rows += await product_crud.search("maple", PaginationParams(limit=3, cursor=cursor), max_candidates=4)
+
+    assert sorted(row[0].id for row in rows) == candidates
+    assert [row.rank for row in rows] == sorted((row.rank for row in rows), reverse=True)
+
+
 # endregion
 
 # region --- CartItemCRUD Tests ---
@@ -171,3 +331,227 @@ async def test_cartitem_delete_all_by_user_id(
     assert len(items_user2) == 1
 
 # endregion
+
+# region --- CartService Tests ---
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cart_add_and_remove_items_return_updated_cart(
+        user_crud: UserCRUD, product_crud: ProductCRUD, cart_service: CartService):
+    user = await user_crud.create(User(email="upsert@test.com", name="Upsert User"))
+    p1 = await product_crud.create(Product(title="P1", description="Desc", quantity=10, full_price=100, discount=10))
+    p2 = await product_crud.create(Product(title="P2", description="Desc", quantity=10, full_price=250))
+
+    await cart_service.add_item(user.id, ItemIn(product_id=p1.id, quantity=1))
+    await cart_service.add_item(user.id, ItemIn(product_id=p2.id, quantity=1))
+    cart = await cart_service.add_item(user.id, ItemIn(product_id=p1.id, quantity=2))
+
+    assert [(i.product_id, i.quantity, i.total_price) for i in cart.items] == [(p1.id, 3, 270), (p2.id, 1, 250)]
+    assert cart.total_price == 520
+    assert cart == await cart_service.get_cart(user.id)
+
+    cart = await cart_service.remove_item(user.id, ItemIn(product_id=p1.id, quantity=1))
+    assert [(i.product_id, i.quantity) for i in cart.items] == [(p1.id, 2), (p2.id, 1)]
+
+    cart = await cart_service.remove_item(user.id, ItemIn(product_id=p2.id, quantity=5))
+    assert [(i.product_id, i.quantity) for i in cart.items] == [(p1.id, 2)]
+    assert cart == await cart_service.get_cart(user.id)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_cart_add_nonexistent_product_raises_error(user_crud: UserCRUD, cart_service: CartService):
+    user = await user_crud.create(User(email="missing_product@test.com", name="Missing"))
+
+    with pytest.raises(ResourceDoesNotExistError):
+        await cart_service.add_item(user.id, ItemIn(product_id=999_999, quantity=1))
+
+# endregion
+
+
+# region --- OrderService Tests ---
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_order_decrements_stock_and_inserts_items(
+        user_crud: UserCRUD, product_crud: ProductCRUD, cart_service: CartService, order_service: OrderService):
+    user = await user_crud.create(User(email="checkout@test.com", name="Checkout"))
+    p1 = await product_crud.create(Product(title="P1", description="Desc", quantity=5, full_price=100))
+    p2 = await product_crud.create(Product(title="P2", description="Desc", quantity=1, full_price=300))
+    await cart_service.add_item(user.id, ItemIn(product_id=p1.id, quantity=2))
+    cart = await cart_service.add_item(user.id, ItemIn(product_id=p2.id, quantity=1))
+
+    order = await order_service.create_order(user.id, cart)
+
+    assert order.total_price == 500
+    assert sorted((i.product_id, i.quantity) for i in order.items) == [(p1.id, 2), (p2.id, 1)]
+    assert [(p.id, p.quantity) for p in await product_crud.get_all([p1.id, p2.id])] == [(p1.id, 3), (p2.id, 0)]
+
+    fetched = await order_service.get_order(order.id)
+    assert sorted((i.product_id, i.total_price) for i in fetched.items) == [(p1.id, 200), (p2.id, 300)]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_checkout_of_the_last_unit_drops_the_product_from_cached_in_stock_pages(
+        user_crud: UserCRUD, product_crud: ProductCRUD, cart_service: CartService, order_service: OrderService,
+        product_service: ProductService):
+    catalog_cache.clear()
+    user = await user_crud.create(User(email="sold-out@test.com", name="Sold Out"))
+    product = await product_crud.create(Product(title="Last", description="Desc", quantity=1, full_price=100))
+    await product_crud.db.commit()
+    pagination, filter = PaginationParams(limit=100), ProductFilter(in_stock=True)
+
+    page = await product_service.get_catalog_page(pagination, is_active=True, filter=filter)
+    assert product.id in {p["id"] for p in json.loads(page.content)}
+
+    cart = await cart_service.add_item(user.id, ItemIn(product_id=product.id, quantity=1))
+    await order_service.create_order(user.id, cart)
+    await product_crud.db.commit()
+
+    page = await product_service.get_catalog_page(pagination, is_active=True, filter=filter)
+    assert product.id not in {p["id"] for p in json.loads(page.content)}
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_create_order_with_insufficient_stock_raises_error(
+        user_crud: UserCRUD, product_crud: ProductCRUD, cart_service: CartService, order_service: OrderService):
+    user = await user_crud.create(User(email="no_stock@test.com", name="No Stock"))
+    product = await product_crud.create(Product(title="Scarce", description="Desc", quantity=1, full_price=100))
+    cart = await cart_service.add_item(user.id, ItemIn(product_id=product.id, quantity=2))
+
+    with pytest.raises(InsufficientStockError, match=f"Insufficient stock for product ID {product.id}"):
+        await order_service.create_order(user.id, cart)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_order_summaries_aggregate_items_in_sql(
+        user_crud: UserCRUD, product_crud: ProductCRUD, cart_service: CartService, order_service: OrderService):
+    user = await user_crud.create(User(email="summary@test.com", name="Summary"))
+    p1 = await product_crud.create(Product(title="P1", description="Desc", quantity=5, full_price=100))
+    p2 = await product_crud.create(Product(title="P2", description="Desc", quantity=5, full_price=300))
+    await cart_service.add_item(user.id, ItemIn(product_id=p1.id, quantity=2))
+    cart = await cart_service.add_item(user.id, ItemIn(product_id=p2.id, quantity=1))
+    order = await order_service.create_order(user.id, cart)
+
+    summaries = await order_service.get_order_summaries(user_id=user.id)
+
+    assert [(s.id, s.item_count, s.total_price) for s in summaries] == [(order.id, 2, 500)]
+    total_price = await order_service.order_crud.db.scalar(
+        select(Order.total_price).where(Order.id == order.id))
+    assert total_price == 500
+
+
+async def _order_in_status(order_service: OrderService, user_id: int, status: OrderStatus) -> Order:
+    order = await order_service.order_crud.create(Order(user_id=user_id, items=[]))
+    order.status = status
+    await order_service.order_crud.db.flush()
+    return order
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_change_order_statuses_reports_outcome_per_id(user_crud: UserCRUD, order_service: OrderService):
+    user = await user_crud.create(User(email="fulfilment@test.com", name="Fulfilment"))
+    confirmed, pending, shipped = [await _order_in_status(order_service, user.id, status)
+                                   for status in (OrderStatus.CONFIRMED, OrderStatus.PENDING, OrderStatus.SHIPPED)]
+    missing = shipped.id + 1000
+
+    result = await order_service.change_statuses(OrderStatusChangeIn(
+        status=OrderStatus.SHIPPED, ids=[missing, shipped.id, pending.id, confirmed.id, confirmed.id]))
+
+    assert result.updated == 1
+    assert [(r.id, r.outcome, r.status) for r in result.results] == [
+        (confirmed.id, OrderStatusOutcome.UPDATED, OrderStatus.SHIPPED),
+        (pending.id, OrderStatusOutcome.INVALID_TRANSITION, OrderStatus.PENDING),
+        (shipped.id, OrderStatusOutcome.UNCHANGED, OrderStatus.SHIPPED),
+        (missing, OrderStatusOutcome.NOT_FOUND, None),
+    ]
+    statuses = await order_service.order_crud.db.execute(
+        select(Order.id, Order.status).where(Order.user_id == user.id).order_by(Order.id))
+    assert statuses.all() == [(confirmed.id, OrderStatus.SHIPPED), (pending.id, OrderStatus.PENDING),
+                              (shipped.id, OrderStatus.SHIPPED)]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_change_order_statuses_by_filter_moves_only_allowed_orders_up_to_limit(
+        user_crud: UserCRUD, order_service: OrderService):
+    user = await user_crud.create(User(email="warehouse@test.com", name="Warehouse"))
+    orders = [await _order_in_status(order_service, user.id, status)
+              for status in (OrderStatus.SHIPPED, OrderStatus.SHIPPED, OrderStatus.SHIPPED, OrderStatus.PENDING)]
+    change = OrderStatusChangeIn(status=OrderStatus.DELIVERED, filter=OrderFilter(), limit=2)
+
+    first = await order_service.change_statuses(change)
+    second = await order_service.change_statuses(change)
+
+    assert [r.id for r in first.results] == [orders[0].id, orders[1].id]
+    assert [r.id for r in second.results] == [orders[2].id]
+    assert (await order_service.change_statuses(change)).updated == 0
+    with pytest.raises(InvalidOrderStatusError):
+        await order_service.change_statuses(OrderStatusChangeIn(status=OrderStatus.CANCELLED, ids=[orders[3].id]))
+    with pytest.raises(ValueError, match="Exactly one of ids and filter"):
+        OrderStatusChangeIn(status=OrderStatus.SHIPPED)
+
+# endregion
+
+
+# region --- Read-only sessions ---
+@pytest.mark.asyncio(loop_scope="session")
+async def test_read_db_falls_back_to_primary_and_refuses_writes(async_engine, monkeypatch):
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+    from sqlalchemy.exc import DBAPIError
+    import src.db.db as db_module
+
+    unreachable = create_async_engine("postgresql+asyncpg://nobody@127.0.0.1:1/none")
+    monkeypatch.setattr(db_module, 'ReplicaSessionLocal', async_sessionmaker(unreachable))
+    monkeypatch.setattr(db_module, 'ReadOnlySessionLocal',
+                        async_sessionmaker(async_engine.execution_options(postgresql_readonly=True)))
+    monkeypatch.setattr(db_module, '_replica_down_until', 0.0)
+
+    sessions = db_module.get_read_db()
+    db = await anext(sessions)
+    assert db.bind.url == async_engine.url
+    assert db_module._replica_down_until > 0
+    with pytest.raises(DBAPIError, match="read-only transaction"):
+        await db.execute(text("CREATE TEMPORARY TABLE read_only_probe (id int)"))
+    await sessions.aclose()
+    await unreachable.dispose()
+
+
+def test_cached_catalog_and_order_lookup_never_read_from_the_replica():
+    from fastapi.routing import APIRoute
+    from src.db.db import get_read_db
+    from src.main import app
+
+    def calls(dependant) -> set:
+        return {dependant.call, *(call for sub in dependant.dependencies for call in calls(sub))}
+
+    routes = {(route.path, method): route for route in app.routes if isinstance(route, APIRoute)
+              for method in route.methods}
+    for path in ('/products', '/products/all', '/orders/{order_id}'):
+        assert get_read_db not in calls(routes[(path, 'GET')].dependant), path
+    assert get_read_db in calls(routes[('/products/search', 'GET')].dependant)
+
+
+def test_single_order_lookup_requires_the_current_user():
+    from fastapi.routing import APIRoute
+    from src.deps import get_current_user_id
+    from src.main import app
+
+    route = next(route for route in app.routes
+                 if isinstance(route, APIRoute) and route.path == '/orders/{order_id}' and 'GET' in route.methods)
+    assert get_current_user_id in {dependency.call for dependency in route.dependant.dependencies}
+
+
+def test_cache_stats_are_only_served_to_admins():
+    from fastapi.routing import APIRoute
+    from src.deps import get_current_admin
+    from src.main import app
+
+    route = next(route for route in app.routes if isinstance(route, APIRoute) and route.path == '/internal/caches')
+    assert get_current_admin in {dependency.call for dependency in route.dependant.dependencies}
+
+    user = CurrentUser(id=1, email="user@example.com", name="User", is_admin=False)
+    with pytest.raises(NotEnoughRightsError):
+        get_current_admin(user)
+    admin = user.model_copy(update={'is_admin': True})
+    assert get_current_admin(admin) is admin
+
+# endregion
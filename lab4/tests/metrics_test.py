@@ -0,0 +1,42 @@
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from src.metrics import Histogram, RequestMetricsMiddleware, instrument_engine, render_metrics
+
+from tests.fixtures import *
+
+
+def test_histogram_buckets_are_inclusive_upper_bounds():
+    histogram = Histogram((0, 1, 5))
+    for value in (0, 1, 2, 5, 6):
+        histogram.observe(value)
+
+    assert histogram.counts == [1, 1, 2, 1]
+    assert histogram.count == 5
+    assert histogram.sum == 14
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_request_metrics_count_queries_per_route(async_engine):
+    instrument_engine(async_engine)
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware)
+
+    @app.get('/things/{thing_id}')
+    async def get_thing(thing_id: int):
+        async with async_engine.connect() as conn:
+            for _ in range(3):
+                await conn.execute(text('SELECT 1'))
+        return {"id": thing_id}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get('/things/1')
+        await client.get('/things/2')
+
+    assert response.headers['Server-Timing'].startswith('db;dur=')
+    assert 'desc="3 queries"' in response.headers['Server-Timing']
+    metrics = render_metrics()
+    assert 'http_requests_total{method="GET",route="/things/{thing_id}",status="200"} 2' in metrics
+    assert 'http_request_db_queries_bucket{method="GET",route="/things/{thing_id}",le="3"} 2' in metrics
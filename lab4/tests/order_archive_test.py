@@ -0,0 +1,104 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.crud import UserCRUD, ProductCRUD, OrderCRUD
+from src.custom_types import OrderStatus
+from src.db import partitions
+from src.db.models import User, Product, Order
+from src.schemas.filtration import OrderFilter
+from src.schemas.item import Item
+from src.service.order_archive import OrderArchiver
+
+from tests.fixtures import *
+
+NOW = datetime(2031, 6, 15)
+
+
+async def _archiver(async_session, **kwargs) -> OrderArchiver:
+    # Commits inside the archiver become savepoints of the test transaction, which also rolls its DDL back.
+    session_factory = async_sessionmaker(await async_session.connection(), expire_on_commit=False,
+                                         join_transaction_mode='create_savepoint')
+    return OrderArchiver(interval_seconds=60, retention_days=90, months_ahead=2, batch_size=2,
+                         session_factory=session_factory, **kwargs)
+
+
+async def _order(async_session, user_id: int, product_id: int, created_at: datetime, status: OrderStatus) -> Order:
+    order = Order(user_id=user_id, items=[Item(product_id=product_id, quantity=1, total_price=100)])
+    order.created_at = created_at
+    order.status = status
+    async_session.add(order)
+    await async_session.flush()
+    return order
+
+
+async def _count(async_session, table: str) -> int:
+    return await async_session.scalar(text(f"SELECT count(*) FROM {table}"))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_archiver_moves_finished_orders_with_their_items_to_the_cold_tier(
+        async_session, user_crud: UserCRUD, product_crud: ProductCRUD):
+    user = await user_crud.create(User(email="archive@test.com", name="Archive"))
+    product = await product_crud.create(Product(title="Archived", description="Desc", quantity=5, full_price=100))
+    january, february = datetime(2031, 1, 1), datetime(2031, 2, 1)
+    await partitions.ensure_partitions(async_session, [january, february, datetime(2031, 6, 1)], [])
+
+    finished = [await _order(async_session, user.id, product.id, datetime(2031, 1, day), status)
+                for day, status in ((3, OrderStatus.DELIVERED), (4, OrderStatus.CANCELLED),
+                                    (5, OrderStatus.DELIVERED))]
+    pending = await _order(async_session, user.id, product.id, datetime(2031, 1, 6), OrderStatus.PENDING)
+    recent = await _order(async_session, user.id, product.id, datetime(2031, 6, 1), OrderStatus.DELIVERED)
+
+    assert await (await _archiver(async_session)).maintain(NOW) == 3
+
+    assert await _count(async_session, 'orders_cold_2031') == 3
+    assert await _count(async_session, 'order_items_cold_2031') == 3
+    assert await _count(async_session, 'orders_hot_2031_01') == 1
+    assert await _count(async_session, 'order_items_hot_2031_01') == 1
+
+    crud = OrderCRUD(async_session)
+    archived = await crud.get_all(filter=OrderFilter(archived=True))
+    assert sorted(order.id for order in archived) == sorted(order.id for order in finished)
+    assert all(len(order.items) == 1 for order in archived)
+    active = {order.id for order in await crud.get_all(filter=OrderFilter(archived=False))}
+    assert {pending.id, recent.id} <= active
+
+    # February was left empty behind the retention window; January still holds the pending order.
+    months = await partitions.hot_months(async_session)
+    assert february not in months and january in months
+    assert [datetime(2031, month, 1) for month in (6, 7, 8)] == [m for m in months if m >= datetime(2031, 6, 1)]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_archiver_is_idempotent_without_finished_orders(async_session):
+    archiver = await _archiver(async_session)
+
+    assert await archiver.maintain(NOW) == 0
+    assert await archiver.maintain(NOW) == 0
+    assert datetime(2031, 8, 1) in await partitions.hot_months(async_session)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_archiver_moves_rows_stranded_in_the_default_partitions(
+        async_session, user_crud: UserCRUD, product_crud: ProductCRUD):
+    user = await user_crud.create(User(email="stranded@test.com", name="Stranded"))
+    product = await product_crud.create(Product(title="Stranded", description="Desc", quantity=5, full_price=100))
+    # Neither month has a partition yet, as after the archiver was down for longer than it creates ahead.
+    upcoming = await _order(async_session, user.id, product.id, datetime(2031, 7, 2), OrderStatus.PENDING)
+    await _order(async_session, user.id, product.id, datetime(2031, 1, 3), OrderStatus.DELIVERED)
+    assert await _count(async_session, 'orders_hot_default') == 2
+
+    assert await (await _archiver(async_session)).maintain(NOW) == 1
+
+    for table in ('orders', 'order_items'):
+        assert await _count(async_session, f'{table}_hot_default') == 0
+        assert await _count(async_session, f'{table}_hot_2031_07') == 1
+        assert await _count(async_session, f'{table}_cold_2031') == 1
+    assert await async_session.scalar(text("""
+        SELECT i.product_id FROM orders o
+        JOIN order_items i ON (i.order_id, i.order_created_at, i.order_is_archived) = (o.id, o.created_at, o.is_archived)
+        WHERE o.id = :id
+    """), {'id': upcoming.id}) == product.id
@@ -0,0 +1,107 @@
+import asyncio
+from datetime import datetime, UTC
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.crud import UserCRUD, ProductCRUD, OutboxCRUD
+from src.custom_exceptions import PaymentGatewayError
+from src.custom_types import OutboxTopic
+from src.db.models import User, Product, OutboxEvent
+from src.schemas.item import ItemIn
+from src.service.cart import CartService
+from src.service.order import OrderService
+from src.service.outbox import OutboxWorker, StubOutboxHandler
+
+from tests.fixtures import *
+
+
+class FlakyHandler(StubOutboxHandler):
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def handle(self, event: OutboxEvent):
+        if self.failures:
+            self.failures -= 1
+            raise PaymentGatewayError("gateway unavailable")
+        await super().handle(event)
+
+
+async def _worker(async_session, handler, **kwargs) -> OutboxWorker:
+    # Commits inside the worker become savepoints of the test transaction.
+    session_factory = async_sessionmaker(await async_session.connection(), expire_on_commit=False,
+                                         join_transaction_mode='create_savepoint')
+    return OutboxWorker(handler, session_factory=session_factory, **kwargs)
+
+
+async def _events(async_session) -> list[OutboxEvent]:
+    result = await async_session.execute(select(OutboxEvent).order_by(OutboxEvent.id).execution_options(
+        populate_existing=True))
+    return list(result.scalars())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_order_side_effects_are_queued_in_the_order_transaction(
+        user_crud: UserCRUD, product_crud: ProductCRUD, cart_service: CartService, order_service: OrderService):
+    user = await user_crud.create(User(email="outbox@test.com", name="Outbox"))
+    product = await product_crud.create(Product(title="Queued", description="Desc", quantity=5, full_price=250))
+    cart = await cart_service.add_item(user.id, ItemIn(product_id=product.id, quantity=2))
+
+    order = await order_service.create_order(user.id, cart)
+    await order_service.cancel_order(order.id)
+
+    payload = {'order_id': order.id, 'user_id': user.id, 'amount': 500}
+    assert [(e.topic, e.payload) for e in await _events(user_crud.db)] == [
+        (OutboxTopic.PAYMENT_CAPTURE.value, payload), (OutboxTopic.ORDER_CONFIRMATION_EMAIL.value, payload),
+        (OutboxTopic.PAYMENT_RELEASE.value, payload), (OutboxTopic.ORDER_CANCELLATION_EMAIL.value, payload),
+    ]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_worker_deletes_handled_events_and_backs_off_failed_ones(async_session):
+    await OutboxCRUD(async_session).add([(OutboxTopic.PAYMENT_CAPTURE, {'order_id': i}) for i in range(3)])
+    handler = FlakyHandler(failures=1)
+    worker = await _worker(async_session, handler, batch_size=10, retry_base_seconds=60)
+
+    assert await worker.process_batch() == 3
+    assert await worker.process_batch() == 0
+
+    [retried] = await _events(async_session)
+    assert retried.attempts == 1 and retried.last_error == "PaymentGatewayError: gateway unavailable"
+    assert retried.available_at > datetime.now(UTC).replace(tzinfo=None)
+    assert sorted(payload['order_id'] for _, payload in handler.handled) == [1, 2]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_worker_parks_events_after_max_attempts_and_times_out_slow_handlers(async_session):
+    await OutboxCRUD(async_session).add([(OutboxTopic.ORDER_CONFIRMATION_EMAIL, {'order_id': 1})])
+    worker = await _worker(async_session, StubOutboxHandler(delay_seconds=1), max_attempts=2,
+                           handler_timeout_seconds=0.05, retry_base_seconds=0)
+
+    for _ in range(2):
+        assert await worker.process_batch() == 1
+    assert await worker.process_batch() == 0
+
+    [parked] = await _events(async_session)
+    assert parked.attempts == 2 and parked.failed_at is not None
+    assert parked.last_error.startswith("TimeoutError")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_worker_limits_handlers_in_flight(async_session):
+    await OutboxCRUD(async_session).add([(OutboxTopic.PAYMENT_CAPTURE, {'order_id': i}) for i in range(6)])
+    in_flight, peak = 0, 0
+
+    class CountingHandler(StubOutboxHandler):
+        async def handle(self, event: OutboxEvent):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+
+    worker = await _worker(async_session, CountingHandler(), batch_size=10, concurrency=2)
+    assert await worker.process_batch() == 6
+    assert peak == 2 and await _events(async_session) == []
@@ -0,0 +1,98 @@
+import io
+
+import pytest
+from PIL import Image
+
+from src.config import settings
+from src.crud import ProductCRUD
+from src.custom_exceptions import FileTooLargeError, NotSupportedFileTypeError, ResourceDoesNotExistError
+from src.db.models import Product
+from src.imaging import sniff_image_type, variant_name
+from src.service.product_images import ProductImageService, image_path
+
+from tests.fixtures import *
+
+
+def _png(width: int, height: int) -> bytes:
+    buffer = io.BytesIO()
+    Image.new('RGBA', (width, height), (200, 30, 30, 128)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+async def _chunks(data: bytes, size: int = 1000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+@pytest.fixture
+def images_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, 'IMAGES_DIR', str(tmp_path))
+    monkeypatch.setattr(settings, 'IMAGE_VARIANT_WIDTHS', [64])
+    return tmp_path
+
+
+def test_sniff_image_type_reads_magic_bytes():
+    assert sniff_image_type(_png(1, 1)[:12]) == 'png'
+    assert sniff_image_type(b'\xff\xd8\xff\xe0\x00\x10JFIF\x00\x01') == 'jpg'
+    assert sniff_image_type(b'GIF89a\x01\x00\x01\x00\x00\x00') == 'gif'
+    assert sniff_image_type(b'RIFF\x24\x00\x00\x00WEBP') == 'webp'
+    assert sniff_image_type(b'<svg xmlns="') is None
+    assert sniff_image_type(b'') is None
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_stores_content_addressed_file_once_with_variants(product_crud: ProductCRUD, images_dir):
+    product = await product_crud.create(Product(title="Pictured", description="Desc", quantity=1, full_price=100))
+    service = ProductImageService(product_crud)
+    data = _png(300, 150)
+
+    await service.add_image(product.id, _chunks(data), len(data))
+    product = await service.add_image(product.id, _chunks(data), None)
+
+    [filename] = product.images
+    assert product.final_price == 100
+    assert filename.endswith('.png') and image_path(filename).read_bytes() == data
+    with Image.open(image_path(filename).parent / variant_name(filename, 64)) as variant:
+        assert (variant.format, variant.size) == ('WEBP', (64, 32))
+    assert not any((images_dir / 'tmp').iterdir())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_rejects_oversized_and_non_image_bodies_early(product_crud: ProductCRUD, images_dir,
+                                                                   monkeypatch):
+    monkeypatch.setattr(settings, 'IMAGE_MAX_SIZE_BYTES', 5000)
+    product = await product_crud.create(Product(title="Rejected", description="Desc", quantity=1, full_price=100))
+    service = ProductImageService(product_crud)
+    consumed = []
+
+    async def endless_png():
+        header = _png(10, 10)
+        consumed.append(len(header))
+        yield header
+        while True:
+            consumed.append(1000)
+            yield b'\x00' * 1000
+
+    with pytest.raises(FileTooLargeError):
+        await service.add_image(product.id, _chunks(b'x'), 10_000)
+    with pytest.raises(FileTooLargeError):
+        await service.add_image(product.id, endless_png(), None)
+    assert sum(consumed) < 6000
+    with pytest.raises(NotSupportedFileTypeError):
+        await service.add_image(product.id, _chunks(b'%PDF-1.7 ' * 100), None)
+    with pytest.raises(NotSupportedFileTypeError, match="not a valid image"):
+        await service.add_image(product.id, _chunks(_png(10, 10)[:40]), None)
+    assert not any((images_dir / 'tmp').iterdir())
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_upload_to_a_missing_product_writes_nothing(product_crud: ProductCRUD, images_dir):
+    consumed = []
+
+    async def body():
+        consumed.append(True)
+        yield _png(10, 10)
+
+    with pytest.raises(ResourceDoesNotExistError):
+        await ProductImageService(product_crud).add_image(2 ** 31 - 1, body(), None)
+    assert not consumed and not any(images_dir.iterdir())
@@ -0,0 +1,75 @@
+import time
+from datetime import timedelta
+
+import pytest
+from starlette.requests import Request
+
+from src.custom_exceptions import LimitExceededError
+from src.rate_limit import Budget, ShardedMemoryRateLimitStore, RateLimit, set_rate_limit_store
+import src.utils
+from src.utils import create_jwt_token, get_user_id_from_jwt
+
+
+def _request(client_ip: str, token: str = None) -> Request:
+    headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+    return Request({'type': 'http', 'method': 'POST', 'path': '/', 'headers': headers, 'client': (client_ip, 1234)})
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bucket_allows_a_burst_then_refills_at_the_budget_rate(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    store, budget = ShardedMemoryRateLimitStore(shards=4), Budget(burst=3, per_minute=60)
+
+    assert [await store.acquire('client', budget) for _ in range(4)] == [0, 0, 0, pytest.approx(1)]
+    assert await store.acquire('other client', budget) == 0
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 1.5)
+    assert await store.acquire('client', budget) == 0
+    assert await store.acquire('client', budget) == pytest.approx(0.5)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_refilled_and_overflowing_buckets_are_dropped_lazily(monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    store, budget = ShardedMemoryRateLimitStore(shards=1, max_keys_per_shard=3), Budget(burst=2, per_minute=60)
+    for client in range(5):
+        await store.acquire(client, budget)
+    assert len(store) == 3
+
+    monkeypatch.setattr(time, "monotonic", lambda: now + 2)
+    await store.acquire('late', budget)
+    await store.acquire('late', budget)
+    assert len(store) == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_rate_limit_keys_by_user_when_authenticated_and_by_ip_otherwise():
+    set_rate_limit_store(ShardedMemoryRateLimitStore())
+    limit = RateLimit('test', Budget(burst=1, per_minute=1))
+    token = create_jwt_token(user_id=7, expires_in=timedelta(minutes=5))
+    get_user_id_from_jwt(token)  # verified by the auth dependency of an earlier request
+
+    await limit(_request('10.0.0.1'))
+    await limit(_request('10.0.0.1', token))
+    await limit(_request('10.0.0.2', 'not-a-jwt'))
+    with pytest.raises(LimitExceededError) as exc_info:
+        await limit(_request('10.0.0.9', token))
+    assert int(exc_info.value.headers['Retry-After']) == 60
+    with pytest.raises(LimitExceededError):
+        await limit(_request('10.0.0.1'))
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_rate_limit_never_verifies_unknown_tokens(monkeypatch):
+    set_rate_limit_store(ShardedMemoryRateLimitStore())
+    limit = RateLimit('test', Budget(burst=1, per_minute=1))
+
+    def verify(token):
+        raise AssertionError("signature checked on the rate limit path")
+
+    monkeypatch.setattr(src.utils, '_verify_jwt', verify)
+    await limit(_request('10.0.0.3', create_jwt_token(user_id=8, expires_in=timedelta(minutes=5))))
+    with pytest.raises(LimitExceededError):
+        await limit(_request('10.0.0.3', 'forged.token.value'))
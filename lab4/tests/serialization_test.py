@@ -0,0 +1,42 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+from pydantic import TypeAdapter
+
+from src.custom_types import OrderStatus
+from src.db.models import Product, Order
+from src.schemas.item import Item
+from src.schemas.order import OrderOut, OrderSummaryOut
+from src.schemas.product import ProductOut
+from src.serialization import dump_products, dump_orders, dump_order_summaries
+
+
+def pydantic_dump(model, rows) -> bytes:
+    adapter = TypeAdapter(list[model])
+    return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+
+def test_products_fast_path_matches_pydantic_output():
+    products = [
+        Product(id=i, title=f"Ñame {i} \"quoted\"", description="línea\nnext", quantity=i,
+                full_price=i * 137, discount=i % 100, final_price=i * 137 * (100 - i % 100) // 100, images=[])
+        for i in range(1, 101)
+    ]
+
+    assert dump_products(products) == pydantic_dump(ProductOut, products)
+
+
+def test_orders_fast_path_matches_pydantic_output():
+    orders = []
+    for i in range(1, 51):
+        order = Order(user_id=1, items=[Item(product_id=j, quantity=j, total_price=i * j * 333) for j in range(1, 4)])
+        order.id = i
+        order.status = list(OrderStatus)[i % len(OrderStatus)]
+        order.created_at = datetime(2025, 1, i % 28 + 1, 12, 30, i, i * 1000 if i % 2 else 0)
+        orders.append(order)
+    summaries = [SimpleNamespace(id=o.id, status=o.status, created_at=o.created_at,
+                                 item_count=len(o.items), total_price=o.total_price) for o in orders]
+
+    assert dump_orders(orders) == pydantic_dump(OrderOut, orders)
+    assert dump_order_summaries(summaries) == pydantic_dump(OrderSummaryOut, summaries)
+    assert dump_orders([]) == b"[]"
@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta, UTC
+
+import pytest
+from sqlalchemy import select
+
+from src.config import settings
+from src.crud import RefreshTokenCRUD, UserCRUD
+from src.db.models import User, RefreshToken
+from src.service.token_store import SQLTokenStore, MemoryTokenStore, TokenSweeper, memory_refresh_tokens
+
+from tests.fixtures import *
+
+
+def _in(**kwargs) -> datetime:
+    return datetime.now(UTC) + timedelta(**kwargs)
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_sql_token_store_keeps_digests_and_rotates_once(user_crud: UserCRUD):
+    user = await user_crud.create(User(email="tokens@example.com", name="Tokens"))
+    store = SQLTokenStore(RefreshTokenCRUD(user_crud.db))
+
+    await store.save(user.id, "first", _in(days=1))
+    await store.save(user.id, "second", _in(days=1))
+
+    stored = (await user_crud.db.execute(select(RefreshToken).filter(RefreshToken.user_id == user.id))).scalar_one()
+    assert b"second" not in stored.token_hash and len(stored.token_hash) == 32
+    assert not await store.is_valid(user.id, "first")
+    assert await store.rotate(user.id, "second", "third", _in(days=1))
+    assert not await store.rotate(user.id, "second", "fourth", _in(days=1))
+    assert await store.is_valid(user.id, "third")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_sql_token_store_ignores_and_sweeps_expired_tokens_in_batches(user_crud: UserCRUD):
+    store = SQLTokenStore(RefreshTokenCRUD(user_crud.db))
+    users = [await user_crud.create(User(email=f"expired{i}@example.com", name=f"Expired {i}")) for i in range(5)]
+    for user in users[:4]:
+        await store.save(user.id, "expired", _in(seconds=-1))
+    await store.save(users[4].id, "live", _in(days=1))
+
+    assert not await store.is_valid(users[0].id, "expired")
+    assert not await store.rotate(users[0].id, "expired", "new", _in(days=1))
+    assert [await store.delete_expired(limit=3), await store.delete_expired(limit=3)] == [3, 1]
+    assert await store.is_valid(users[4].id, "live")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_memory_token_store_sweeps_only_tokens_that_are_still_expired():
+    store = MemoryTokenStore()
+    await store.save(1, "old", _in(seconds=-1))
+    await store.save(2, "old", _in(seconds=-1))
+    await store.save(2, "reissued", _in(days=1))
+    await store.save(3, "old", _in(seconds=-1))
+
+    assert await store.delete_expired(limit=1) == 1
+    assert await store.delete_expired(limit=10) == 1
+    assert len(store) == 1 and await store.is_valid(2, "reissued")
+    assert not await store.is_valid(2, "old")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_sweeper_repeats_batches_until_nothing_is_expired(monkeypatch):
+    monkeypatch.setattr(settings, 'TOKEN_STORE_BACKEND', 'memory')
+    for user_id in range(1, 8):
+        await memory_refresh_tokens.save(user_id, "old", _in(seconds=-1))
+
+    assert await TokenSweeper(interval_seconds=60, batch_size=3).sweep() == 7
+    assert len(memory_refresh_tokens) == 0
@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from src import utils
+from src.custom_exceptions import InvalidTokenError
+from src.utils import make_etag, etag_matches, create_jwt_token, get_user_id_from_jwt, jwt_cache
+
+
+def test_etag_matches_if_none_match_lists():
+    etag = make_etag(b"content")
+
+    assert etag == make_etag(b"content")
+    assert etag != make_etag(b"other content")
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"stale", W/{etag}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"stale"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_verified_jwt_is_cached_until_its_exp_second_passes(monkeypatch):
+    jwt_cache.clear()
+    decode_calls = []
+    decode = utils.jwt.decode
+    monkeypatch.setattr(utils.jwt, "decode", lambda *args, **kwargs: decode_calls.append(1) or decode(*args, **kwargs))
+    token = create_jwt_token(user_id=42, expires_in=timedelta(seconds=30))
+    expires_at = utils.jwt.get_unverified_claims(token)["exp"]
+
+    assert [get_user_id_from_jwt(token) for _ in range(3)] == [42, 42, 42]
+    assert len(decode_calls) == 1
+
+    monkeypatch.setattr(time, "time", lambda: expires_at + 0.999)
+    assert get_user_id_from_jwt(token) == 42
+    monkeypatch.setattr(time, "time", lambda: expires_at + 1)
+    with pytest.raises(InvalidTokenError, match="expired"):
+        get_user_id_from_jwt(token)
+    assert len(decode_calls) == 1
+
+
+def test_rejected_jwt_is_not_cached():
+    jwt_cache.clear()
+    token = create_jwt_token(user_id=42, expires_in=timedelta(minutes=5))
+    forged = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+    for _ in range(2):
+        with pytest.raises(InvalidTokenError):
+            get_user_id_from_jwt(forged)
+    assert jwt_cache.stats()["size"] == 0